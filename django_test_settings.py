@@ -7,6 +7,7 @@ sys.path.insert(0, ROOT_PATH + '/examples/')
 SECRET_KEY = 1
 
 INSTALLED_APPS = [
+    'django.contrib.contenttypes',
     'graphene_django',
     'graphene_django.rest_framework',
     'graphene_django.tests',
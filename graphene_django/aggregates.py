@@ -0,0 +1,138 @@
+from collections import OrderedDict
+from copy import copy
+
+from django.db import models
+from django.db.models import Count, Max, Min, Sum
+from django.db.models.query import QuerySet
+from graphene import Field, Float, Int, ObjectType
+
+from .converter import convert_django_field
+from .optimization import QueryOptimizer
+from .utils import maybe_queryset
+
+AGGREGATE_FUNCTIONS = OrderedDict([
+    ('sum', Sum),
+    ('min', Min),
+    ('max', Max),
+])
+
+NUMERIC_FIELDS = (models.IntegerField, models.FloatField, models.DecimalField)
+
+
+def get_aggregate_columns(model, aggregate_fields):
+    if aggregate_fields == '__all__':
+        return [
+            field.name for field in model._meta.concrete_fields
+            if isinstance(field, NUMERIC_FIELDS) and not field.is_relation and not field.primary_key
+        ]
+
+    for name in aggregate_fields:
+        field = model._meta.get_field(name)
+        assert isinstance(field, NUMERIC_FIELDS), (
+            'The aggregate field {} of {} is not a numeric field.'
+        ).format(name, model.__name__)
+    return list(aggregate_fields)
+
+
+def construct_aggregates_type(name, model, columns, registry=None):
+    """
+    Creates the type of the `aggregates` field of a connection:
+    the count of its rows, and the sum, min and max of the columns.
+    """
+    fields = OrderedDict([('count', Int(description='The number of rows.'))])
+    for function_name in AGGREGATE_FUNCTIONS:
+        function_fields = OrderedDict()
+        for column in columns:
+            model_field = copy(model._meta.get_field(column))
+            # Aggregates over no rows are null
+            model_field.null = True
+            if function_name == 'sum':
+                # Sums of integers may not fit in a GraphQL Int
+                function_fields[column] = Float(description=model_field.help_text)
+            else:
+                function_fields[column] = convert_django_field(model_field, registry)
+        function_type = type('{}{}'.format(name, function_name.capitalize()), (ObjectType, ), function_fields)
+        fields[function_name] = Field(function_type)
+    return type(name, (ObjectType, ), fields)
+
+
+def get_selected_aggregates(info, aggregates_type):
+    """
+    Returns the names of the aggregate functions and columns
+    in the selection, like ('count', None) or ('sum', 'price').
+    """
+    optimizer = QueryOptimizer(info)
+    selected = []
+    type_fields = optimizer.get_graphene_fields(aggregates_type)
+    for field_ast in info.field_asts:
+        for function_ast in optimizer.get_fields(field_ast.selection_set):
+            function_name = type_fields.get(function_ast.name.value, (None, None))[0]
+            if function_name == 'count':
+                selected.append(('count', None))
+            if function_name not in AGGREGATE_FUNCTIONS or function_ast.selection_set is None:
+                continue
+
+            function_type = type_fields[function_ast.name.value][1].type
+            column_fields = optimizer.get_graphene_fields(function_type)
+            for column_ast in optimizer.get_fields(function_ast.selection_set):
+                column = column_fields.get(column_ast.name.value, (None, None))[0]
+                if column is not None:
+                    selected.append((function_name, column))
+    return selected
+
+
+def get_alias(function_name, column):
+    if function_name == 'count':
+        return 'count'
+    return '{}__{}'.format(column, function_name)
+
+
+def aggregate_queryset(queryset, selected):
+    expressions = {}
+    for function_name, column in selected:
+        if function_name == 'count':
+            expressions['count'] = Count('pk')
+        else:
+            expressions[get_alias(function_name, column)] = AGGREGATE_FUNCTIONS[function_name](column)
+    if not expressions:
+        return {}
+    return queryset.order_by().aggregate(**expressions)
+
+
+def aggregate_objects(objects, selected):
+    objects = list(objects)
+    results = {}
+    for function_name, column in selected:
+        if function_name == 'count':
+            results['count'] = len(objects)
+            continue
+        values = [getattr(obj, column) for obj in objects if getattr(obj, column) is not None]
+        if not values:
+            results[get_alias(function_name, column)] = None
+        elif function_name == 'sum':
+            results[get_alias(function_name, column)] = sum(values)
+        else:
+            function = min if function_name == 'min' else max
+            results[get_alias(function_name, column)] = function(values)
+    return results
+
+
+def resolve_aggregates(aggregates_type, root, info):
+    """
+    Computes the aggregates selected on the connection with a single
+    aggregate() over its queryset, without the pagination.
+    """
+    selected = get_selected_aggregates(info, aggregates_type)
+    iterable = maybe_queryset(root.iterable)
+    if isinstance(iterable, QuerySet):
+        results = aggregate_queryset(iterable, selected)
+    else:
+        results = aggregate_objects(iterable, selected)
+
+    aggregates = {'count': results.get('count')}
+    for function_name in AGGREGATE_FUNCTIONS:
+        aggregates[function_name] = {
+            column: results.get(get_alias(function_name, column))
+            for selected_function, column in selected if selected_function == function_name
+        }
+    return aggregates
@@ -0,0 +1,183 @@
+import asyncio
+import inspect
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from functools import partial
+from threading import Lock, local
+
+from django.db import close_old_connections
+from django.http import HttpResponseNotAllowed
+from django.middleware.csrf import get_token
+from django.utils.decorators import classonlymethod
+from graphql.execution.executors.asyncio import AsyncioExecutor
+from promise import Promise
+
+from .loaders import release_identity_map
+from .settings import graphene_settings
+from .views import GraphQLView, HttpError
+
+thread_pool = None
+thread_pool_lock = Lock()
+
+
+def get_thread_pool():
+    global thread_pool
+    with thread_pool_lock:
+        if thread_pool is None:
+            thread_pool = ThreadPoolExecutor(graphene_settings.ASYNC_MAX_WORKERS)
+        return thread_pool
+
+
+def run_and_close_old_connections(fn, *args, **kwargs):
+    try:
+        return fn(*args, **kwargs)
+    finally:
+        close_old_connections()
+
+
+async def wait_for(awaitable):
+    return await awaitable
+
+
+class DjangoAsyncioExecutor(AsyncioExecutor):
+    """
+    An asyncio executor for the operations that the AsyncGraphQLView runs
+    in its thread pool: the synchronous resolvers (and the ORM work of the
+    Django fields) run in the worker thread, while the coroutines of the
+    async resolvers run on the event loop of the request.
+    """
+
+    def __init__(self, loop=None):
+        # The entries of a batch run in their own worker threads,
+        # each waiting for the coroutines of its resolvers
+        self.local = local()
+        super(DjangoAsyncioExecutor, self).__init__(loop=loop)
+
+    @property
+    def futures(self):
+        return self.local.__dict__.setdefault('futures', [])
+
+    @futures.setter
+    def futures(self, futures):
+        self.local.futures = futures
+
+    def wait_until_finished(self):
+        # The promises are settled in the worker thread, so the
+        # resolvers of the fields they return run in it too
+        while self.futures:
+            futures, self.futures = self.futures, []
+            done, _ = wait([future for future, _ in futures], return_when=FIRST_COMPLETED)
+            pending = []
+            for future, promise in futures:
+                if future not in done:
+                    pending.append((future, promise))
+                elif future.exception() is not None:
+                    promise.do_reject(future.exception())
+                else:
+                    promise.do_resolve(future.result())
+            self.futures = pending + self.futures
+
+    def await_value(self, value):
+        """
+        Returns a promise of the value when it's a coroutine or
+        a future, which is awaited on the event loop.
+        """
+        if not (asyncio.iscoroutine(value) or isinstance(value, asyncio.Future)):
+            return value
+        promise = Promise()
+        self.futures.append((asyncio.run_coroutine_threadsafe(wait_for(value), self.loop), promise))
+        return promise
+
+    def execute(self, fn, *args, **kwargs):
+        return self.await_value(fn(*args, **kwargs))
+
+    def resolve_awaitable(self, value, on_resolve):
+        """
+        Waits for the value when it's a coroutine, a future or
+        a promise, then passes it to on_resolve.
+        """
+        value = self.await_value(value)
+        if Promise.is_thenable(value):
+            return Promise.resolve(value).then(on_resolve)
+        return on_resolve(value)
+
+
+def mark_coroutine_function(view):
+    # What asyncio.iscoroutinefunction and inspect.iscoroutinefunction
+    # check, which the request handlers use to await async views
+    markcoroutinefunction = getattr(inspect, 'markcoroutinefunction', None)
+    if markcoroutinefunction is not None:
+        view = markcoroutinefunction(view)
+    view._is_coroutine = asyncio.coroutines._is_coroutine
+    return view
+
+
+class AsyncGraphQLView(GraphQLView):
+    """
+    A GraphQLView executing the queries with an asyncio executor.
+    Its view function is a coroutine function, awaited by the request
+    handlers that support async views.
+    """
+    view_is_async = True
+
+    @classonlymethod
+    def as_view(cls, **initkwargs):
+        # View.as_view only returns a coroutine function for
+        # view_is_async from Django 4.1, so the view is marked here
+        return mark_coroutine_function(super(AsyncGraphQLView, cls).as_view(**initkwargs))
+
+    async def dispatch(self, request, *args, **kwargs):
+        # ensure_csrf_cookie only decorates synchronous views
+        get_token(request)
+        request.async_executor = DjangoAsyncioExecutor()
+        self.start_timing(request)
+        try:
+            if request.method.lower() not in ('get', 'post'):
+                raise HttpError(HttpResponseNotAllowed(
+                    ['GET', 'POST'], 'GraphQL only supports GET and POST requests.'))
+
+            with self.measure('parse_body'):
+                data = self.parse_body(request)
+            show_graphiql = self.graphiql and self.can_display_graphiql(
+                request, data)
+
+            if self.batch:
+                # The mutations of a batch run in order
+                if await self.run_in_thread_pool(self.can_execute_concurrently, request, data):
+                    responses = await asyncio.gather(*[
+                        self.get_response_data(request, entry) for entry in data
+                    ])
+                else:
+                    responses = [await self.get_response_data(request, entry) for entry in data]
+                response_data = [response[0] for response in responses]
+                status_code = responses and max(responses, key=lambda response: response[1])[1] or 200
+            else:
+                response_data, status_code = await self.get_response_data(
+                    request, data, show_graphiql)
+
+            response = self.get_http_response(request, data, response_data, status_code, show_graphiql)
+
+        except HttpError as e:
+            response = self.get_error_response(request, e)
+
+        release_identity_map(self.get_context(request))
+        return self.finish_timing(request, response)
+
+    def run_in_thread_pool(self, fn, *args, **kwargs):
+        return asyncio.get_event_loop().run_in_executor(
+            get_thread_pool(),
+            partial(run_and_close_old_connections, fn, *args, **kwargs)
+        )
+
+    def can_execute_concurrently(self, request, data):
+        # The entries that can't be parsed only return their errors
+        return all(self.get_entry_operation_type(request, entry) in ('query', None) for entry in data)
+
+    async def get_response_data(self, request, data, show_graphiql=False):
+        # Like sync_to_async, the persisted queries, the response cache
+        # and the resolvers that aren't coroutine functions (with the
+        # ORM work they do) don't block the event loop
+        return await self.run_in_thread_pool(
+            super(AsyncGraphQLView, self).get_response_data, request, data, show_graphiql)
+
+    def get_execute_options(self, request):
+        return {'executor': request.async_executor}
@@ -1,3 +1,7 @@
+import django
+from django.db.models import query
+
+
 class MissingType(object):
     pass
 
@@ -15,3 +19,37 @@ try:
     from django.contrib.postgres.fields import JSONField
 except ImportError:
     JSONField = MissingType
+
+
+try:
+    # Django 1.11+
+    from django.core.exceptions import EmptyResultSet
+except ImportError:
+    from django.db.models.sql.datastructures import EmptyResultSet  # noqa
+
+
+try:
+    # Django 1.9+
+    from django.db.models.query import ValuesIterable
+except ImportError:
+    ValuesIterable = MissingType
+
+
+def prefetch_related_objects(model_instances, *related_lookups):
+    if django.VERSION < (1, 10):
+        # The lookups are passed as a list
+        return query.prefetch_related_objects(model_instances, list(related_lookups))
+    return query.prefetch_related_objects(model_instances, *related_lookups)
+
+
+try:
+    # Django 1.9+, the descriptors of the many to many
+    # and the generic relations inherit from it
+    from django.db.models.fields.related_descriptors import ReverseManyToOneDescriptor
+    MANY_RELATION_DESCRIPTORS = (ReverseManyToOneDescriptor, )
+except ImportError:
+    from django.db.models.fields.related import (ForeignRelatedObjectsDescriptor, ManyRelatedObjectsDescriptor,
+                                                 ReverseManyRelatedObjectsDescriptor)
+    MANY_RELATION_DESCRIPTORS = (
+        ForeignRelatedObjectsDescriptor, ManyRelatedObjectsDescriptor, ReverseManyRelatedObjectsDescriptor
+    )
@@ -1,14 +1,14 @@
 from django.db import models
 from django.utils.encoding import force_text
 
-from graphene import (ID, Boolean, Dynamic, Enum, Field, Float, Int, List,
+from graphene import (ID, Boolean, Dynamic, Enum, Float, Int, List,
                       NonNull, String, UUID, DateTime, Date, Time)
 from graphene.types.json import JSONString
 from graphene.utils.str_converters import to_camel_case, to_const
 from graphql import assert_valid_name
 
 from .compat import ArrayField, HStoreField, JSONField, RangeField
-from .fields import DjangoListField, DjangoConnectionField
+from .fields import DjangoListField, DjangoConnectionField, DjangoRelatedObjectField
 from .utils import import_single_dispatch
 
 singledispatch = import_single_dispatch()
@@ -148,7 +148,7 @@ def convert_onetoone_field_to_djangomodel(field, registry=None):
         # We do this for a bug in Django 1.8, where null attr
         # is not available in the OneToOneRel instance
         null = getattr(field, 'null', True)
-        return Field(_type, required=not null)
+        return DjangoRelatedObjectField(_type, field, required=not null)
 
     return Dynamic(dynamic_type)
 
@@ -190,7 +190,7 @@ def convert_field_to_djangomodel(field, registry=None):
         if not _type:
             return
 
-        return Field(_type, description=field.help_text, required=not field.null)
+        return DjangoRelatedObjectField(_type, field, description=field.help_text, required=not field.null)
 
     return Dynamic(dynamic_type)
 
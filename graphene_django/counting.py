@@ -0,0 +1,124 @@
+import inspect
+import json
+from hashlib import sha256
+
+from django.core.cache import caches
+from django.db import connections
+
+from .compat import EmptyResultSet
+from .settings import graphene_settings
+
+
+class CountStrategy(object):
+    """
+    Computes the length of a connection queryset.
+    `count` returns the length and whether it is exact.
+    """
+
+    def count(self, queryset):
+        raise NotImplementedError('count method not implemented in {}.'.format(self.__class__.__name__))
+
+
+class ExactCount(CountStrategy):
+
+    def count(self, queryset):
+        return queryset.count(), True
+
+
+class CappedCount(CountStrategy):
+    """
+    Counts up to `limit` rows, so clients can show "10,000+"
+    without the database scanning the whole table.
+    """
+
+    def __init__(self, limit=10000):
+        self.limit = limit
+
+    def count(self, queryset):
+        # Counting a sliced queryset counts a subquery limited to limit + 1 rows
+        length = queryset.order_by()[:self.limit + 1].count()
+        if length > self.limit:
+            return self.limit, False
+        return length, True
+
+
+class PostgresEstimateCount(CountStrategy):
+    """
+    Uses the row estimate of the planner statistics for unfiltered querysets
+    of large PostgreSQL tables, and the fallback strategy otherwise.
+    """
+
+    def __init__(self, threshold=10000, fallback=None):
+        self.threshold = threshold
+        self.fallback = fallback or ExactCount()
+
+    def can_estimate(self, queryset):
+        query = queryset.query
+        return (
+            connections[queryset.db].vendor == 'postgresql' and
+            not query.where and
+            not query.distinct and
+            not getattr(query, 'combinator', None) and
+            not (query.low_mark or query.high_mark)
+        )
+
+    def get_estimate(self, queryset):
+        with connections[queryset.db].cursor() as cursor:
+            cursor.execute(
+                'SELECT reltuples FROM pg_class WHERE oid = %s::regclass',
+                [queryset.model._meta.db_table]
+            )
+            row = cursor.fetchone()
+        return int(row[0]) if row else None
+
+    def count(self, queryset):
+        if self.can_estimate(queryset):
+            estimate = self.get_estimate(queryset)
+            # Small or never analyzed tables are counted
+            if estimate is not None and estimate >= self.threshold:
+                return estimate, False
+        return self.fallback.count(queryset)
+
+
+class CachedCount(CountStrategy):
+    """
+    Caches the lengths computed by another strategy, by default the exact
+    count, in a Django cache. The key is built from the SQL of the queryset,
+    so it includes the filter arguments.
+    """
+
+    def __init__(self, strategy=None, timeout=60, cache_alias='default', key_prefix='graphene:count:'):
+        self.strategy = strategy or ExactCount()
+        self.timeout = timeout
+        self.cache_alias = cache_alias
+        self.key_prefix = key_prefix
+
+    @property
+    def cache(self):
+        return caches[self.cache_alias]
+
+    def get_key(self, queryset):
+        query = queryset.values('pk').order_by().query
+        sql, params = query.get_compiler(using=queryset.db).as_sql()
+        key_parts = json.dumps([queryset.db, sql, [str(param) for param in params]])
+        return self.key_prefix + sha256(key_parts.encode('utf-8')).hexdigest()
+
+    def count(self, queryset):
+        try:
+            key = self.get_key(queryset)
+        except EmptyResultSet:
+            # The queryset can't match any row, like filter(pk__in=[])
+            return 0, True
+        length = self.cache.get(key)
+        if length is None:
+            length = self.strategy.count(queryset)
+            self.cache.set(key, length, self.timeout)
+        return tuple(length)
+
+
+def get_count_strategy(strategy=None):
+    if strategy is None:
+        strategy = graphene_settings.RELAY_CONNECTION_COUNT_STRATEGY or ExactCount
+    if inspect.isclass(strategy):
+        strategy = strategy()
+    return strategy
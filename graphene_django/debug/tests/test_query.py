@@ -161,9 +161,10 @@ def test_should_query_connection():
     result = schema.execute(query, context_value=context(), middleware=[DjangoDebugMiddleware()])
     assert not result.errors
     assert result.data['allReporters'] == expected['allReporters']
-    assert 'COUNT' in result.data['__debug']['sql'][0]['rawSql']
-    query = str(Reporter.objects.all()[:1].query)
-    assert result.data['__debug']['sql'][1]['rawSql'] == query
+    # The rows are not counted, one more row is fetched to know if there is a next page
+    assert len(result.data['__debug']['sql']) == 1
+    query = str(Reporter.objects.all()[:2].query)
+    assert result.data['__debug']['sql'][0]['rawSql'] == query
 
 
 def test_should_query_connectionfilter():
@@ -217,6 +218,7 @@ def test_should_query_connectionfilter():
     result = schema.execute(query, context_value=context(), middleware=[DjangoDebugMiddleware()])
     assert not result.errors
     assert result.data['allReporters'] == expected['allReporters']
-    assert 'COUNT' in result.data['__debug']['sql'][0]['rawSql']
-    query = str(Reporter.objects.all()[:1].query)
-    assert result.data['__debug']['sql'][1]['rawSql'] == query
+    # The rows are not counted, one more row is fetched to know if there is a next page
+    assert len(result.data['__debug']['sql']) == 1
+    query = str(Reporter.objects.all()[:2].query)
+    assert result.data['__debug']['sql'][0]['rawSql'] == query
@@ -0,0 +1,98 @@
+from collections import OrderedDict
+from functools import partial
+from hashlib import sha256
+from threading import Lock
+
+from graphql.backend import GraphQLCoreBackend, GraphQLDocument
+from graphql.execution import ExecutionResult
+from graphql.validation import validate
+
+from .settings import graphene_settings
+
+
+def get_query_hash(query):
+    return sha256(query.encode('utf-8')).hexdigest()
+
+
+def invalid_document_result(errors, *args, **kwargs):
+    return ExecutionResult(errors=errors, invalid=True)
+
+
+class DocumentCache(object):
+    """
+    A bounded, thread-safe LRU cache of parsed and validated documents,
+    keyed by the backend, the schema and the hash of the query string.
+    """
+
+    def __init__(self, maxsize=1000):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._documents = OrderedDict()
+        self._lock = Lock()
+
+    def __len__(self):
+        return len(self._documents)
+
+    def get_key(self, backend, schema, query):
+        return (backend, schema, get_query_hash(query))
+
+    def get_document(self, backend, schema, query):
+        key = self.get_key(backend, schema, query)
+        with self._lock:
+            document = self._documents.pop(key, None)
+            if document is not None:
+                # Re-inserting moves the entry to the most recently used end
+                self._documents[key] = document
+                self.hits += 1
+                return document
+            self.misses += 1
+
+        # Parsing happens outside of the lock: two concurrent misses for the
+        # same query may both parse it, but they never block other requests.
+        document = self.build_document(backend, schema, query)
+
+        with self._lock:
+            self._documents[key] = document
+            while len(self._documents) > self.maxsize:
+                self._documents.popitem(last=False)
+        return document
+
+    def build_document(self, backend, schema, query):
+        document = backend.document_from_string(schema, query)
+        if not isinstance(backend, GraphQLCoreBackend):
+            # Other backends are free to validate on their own terms,
+            # so we only skip the parsing for them.
+            return document
+
+        validation_errors = validate(schema, document.document_ast)
+        if validation_errors:
+            execute = partial(invalid_document_result, validation_errors)
+        else:
+            execute = partial(document.execute, validate=False)
+
+        return GraphQLDocument(
+            schema=schema,
+            document_string=document.document_string,
+            document_ast=document.document_ast,
+            execute=execute,
+        )
+
+    def clear(self):
+        with self._lock:
+            self._documents.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+document_cache = None
+
+
+def get_default_document_cache():
+    global document_cache
+    maxsize = graphene_settings.DOCUMENT_CACHE_SIZE
+    if not maxsize:
+        return None
+    if document_cache is None or document_cache.maxsize != maxsize:
+        document_cache = DocumentCache(maxsize)
+    return document_cache
@@ -0,0 +1,96 @@
+from __future__ import absolute_import
+
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+# DjangoJSONEncoder takes care of the Decimal, datetime, date,
+# time, timedelta, UUID and lazy translation values.
+default_encoder = DjangoJSONEncoder()
+
+
+def stdlib_json_encode(data, pretty=False):
+    if not pretty:
+        return json.dumps(data, separators=(',', ':'), cls=DjangoJSONEncoder)
+
+    return json.dumps(data, sort_keys=True,
+                      indent=2, separators=(',', ': '), cls=DjangoJSONEncoder)
+
+
+def orjson_encode(data, pretty=False):
+    # Dates are left to the DjangoJSONEncoder, so the output
+    # doesn't depend on which encoder is installed
+    option = orjson.OPT_PASSTHROUGH_DATETIME
+    if pretty:
+        option |= orjson.OPT_INDENT_2 | orjson.OPT_SORT_KEYS
+    return orjson.dumps(data, default=default_encoder.default, option=option).decode('utf-8')
+
+
+def json_encode(data, pretty=False):
+    if orjson is not None:
+        try:
+            return orjson_encode(data, pretty=pretty)
+        except TypeError:
+            # orjson rejects some values the json module accepts,
+            # like integers bigger than 64 bits
+            pass
+    return stdlib_json_encode(data, pretty=pretty)
+
+
+def json_decode(string):
+    if orjson is not None:
+        return orjson.loads(string)
+    return json.loads(string)
+
+
+def iter_json_encode(data, encode):
+    if isinstance(data, dict):
+        # Objects only holding scalars (like most of the connection
+        # nodes) are encoded at once, that is a lot faster.
+        if not any(isinstance(value, (dict, list, tuple)) for value in data.values()):
+            yield encode(data)
+            return
+
+        yield '{'
+        for index, (key, value) in enumerate(data.items()):
+            yield (',' if index else '') + encode(key) + ':'
+            for chunk in iter_json_encode(value, encode):
+                yield chunk
+        yield '}'
+
+    elif isinstance(data, (list, tuple)):
+        yield '['
+        for index, value in enumerate(data):
+            if index:
+                yield ','
+            for chunk in iter_json_encode(value, encode):
+                yield chunk
+        yield ']'
+
+    else:
+        yield encode(data)
+
+
+def json_encode_iter(data, encode=json_encode, chunk_size=64 * 1024):
+    """
+    Encodes the data incrementally, yielding chunks of about chunk_size
+    characters, so the whole encoded response never lives in memory.
+    """
+    buffer = []
+    buffer_size = 0
+    for chunk in iter_json_encode(data, encode):
+        buffer.append(chunk)
+        buffer_size += len(chunk)
+        if buffer_size >= chunk_size:
+            yield ''.join(buffer)
+            buffer = []
+            buffer_size = 0
+
+    if buffer:
+        yield ''.join(buffer)
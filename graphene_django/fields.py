@@ -1,20 +1,209 @@
 from functools import partial
+from itertools import islice
 
+from django.core.exceptions import FieldDoesNotExist
+from django.db import connections
+from django.db.models.constants import LOOKUP_SEP
+from django.db.models.manager import Manager
 from django.db.models.query import QuerySet
 
 from promise import Promise
 
 from graphene.types import Field, List
-from graphene.relay import ConnectionField, PageInfo
-from graphql_relay.connection.arrayconnection import connection_from_list_slice
+from graphene.types.utils import get_type
+from graphene.types.resolver import attr_resolver, dict_or_attr_resolver
+from graphene.relay import ConnectionField, Node, PageInfo
+from graphene.relay.node import NodeField
+from graphql_relay.connection.arrayconnection import connection_from_list_slice, get_offset_with_default
 
+from .compat import MANY_RELATION_DESCRIPTORS, EmptyResultSet, prefetch_related_objects
+from .counting import ExactCount, get_count_strategy
+from .loaders import (RelatedConnectionLoader, RelatedListLoader, RelatedObjectLoader, get_identity_map,
+                      get_loader, is_related_cached, set_related_cache, supports_window_functions)
+from .optimization import QueryOptimizer, optimize_queryset, values_queryset
+from .pagination import connection_from_keyset, get_keyset_ordering
 from .settings import graphene_settings
-from .utils import maybe_queryset
+from .utils import is_valid_django_model, maybe_queryset
+
+
+# Connection fields that can be resolved without counting the rows
+COUNTLESS_CONNECTION_FIELDS = ('edges', 'pageInfo', 'aggregates', '__typename')
+
+
+def get_async_executor(info):
+    # The AsyncGraphQLView sets its executor in the request (the default context)
+    return getattr(info.context, 'async_executor', None)
+
+
+def map_instances(info, instances):
+    """
+    Replaces the instances of the rows already loaded during
+    the request by the ones in its identity map.
+    """
+    identity_map = get_identity_map(info.context) if info is not None else None
+    if identity_map is None:
+        return instances
+    return [
+        identity_map.add(instance) if is_valid_django_model(type(instance)) else instance
+        for instance in instances
+    ]
+
+
+def map_connection_nodes(info, connection):
+    for edge, node in zip(connection.edges, map_instances(info, [edge.node for edge in connection.edges])):
+        edge.node = node
+    return connection
+
+
+def iterate_in_chunks(queryset, chunk_size):
+    """
+    Iterates over the rows of the queryset with a server-side cursor where
+    the database supports it, so only `chunk_size` rows are held at once.
+    """
+    try:
+        rows = queryset.iterator(chunk_size=chunk_size)
+    except TypeError:
+        # Django < 2.0
+        rows = queryset.iterator()
+
+    # iterator() skips the prefetch_related lookups, they are applied per chunk
+    lookups = queryset._prefetch_related_lookups
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return
+        if lookups:
+            prefetch_related_objects(chunk, *lookups)
+        for row in chunk:
+            yield row
+
+
+def is_default_resolver(resolver):
+    return isinstance(resolver, partial) and resolver.func in (attr_resolver, dict_or_attr_resolver)
+
+
+def get_target_field(field):
+    # ForeignKey.target_field only exists from Django 1.9
+    return field.foreign_related_fields[0]
+
+
+def get_related_manager_field(manager):
+    field = getattr(manager, 'field', None)
+    core_filters = getattr(manager, 'core_filters', None)
+    if field is None and isinstance(core_filters, dict) and len(core_filters) == 1:
+        # The reverse ForeignKey managers of Django < 1.9 only keep their filter
+        try:
+            field = manager.model._meta.get_field(next(iter(core_filters)))
+        except FieldDoesNotExist:
+            return None
+    return field
+
+
+def load_node_from_global_id(info, global_id, only_type=None, node_type=Node):
+    """
+    Like Node.get_node_from_global_id, but returns a promise of the object
+    loaded along with the other objects of its type requested in the same
+    execution tick, when its type has a load_node method.
+    """
+    try:
+        _type, _id = node_type.from_global_id(global_id)
+        graphene_type = info.schema.get_type(_type).graphene_type
+    except Exception:
+        return None
+
+    if only_type:
+        assert graphene_type == only_type, (
+            'Must receive a {} id.'
+        ).format(only_type._meta.name)
+
+    # We make sure the ObjectType implements the "Node" interface
+    if node_type not in graphene_type._meta.interfaces:
+        return None
+
+    load_node = getattr(graphene_type, 'load_node', None)
+    if load_node:
+        return load_node(info, _id)
+    get_node = getattr(graphene_type, 'get_node', None)
+    if get_node:
+        return get_node(info, _id)
+
+
+class DjangoNodeField(NodeField):
+    """
+    A Node.Field batching the objects requested by global ID
+    in one query per type: `DjangoNodeField(ReporterNode)`.
+    """
+
+    def __init__(self, type=False, node=Node, **kwargs):
+        super(DjangoNodeField, self).__init__(node, type, **kwargs)
+
+    @classmethod
+    def node_resolver(cls, node_type, only_type, root, info, id):
+        return load_node_from_global_id(info, id, only_type=only_type, node_type=node_type)
+
+    def get_resolver(self, parent_resolver):
+        return partial(self.node_resolver, self.node_type, get_type(self.field_type))
+
+
+class DjangoRelatedObjectField(Field):
+    """
+    A field resolving a ForeignKey, a OneToOneField or a reverse one to one
+    relation with a request-scoped loader, so the related objects of all
+    the rows are fetched with one query per model.
+    """
+
+    def __init__(self, _type, model_field, *args, **kwargs):
+        self.model_field = model_field
+        super(DjangoRelatedObjectField, self).__init__(_type, *args, **kwargs)
+
+    @classmethod
+    def get_loader_lookup(cls, model_field, root):
+        """
+        Returns the key of the related object in the row and
+        the field it matches in the related model.
+        """
+        if model_field.concrete:
+            # ForeignKeys to other fields than the primary key are left to Django
+            if get_target_field(model_field) != model_field.related_model._meta.pk:
+                return None, None
+            return getattr(root, model_field.attname), 'pk'
+
+        remote_field = model_field.field
+        return getattr(root, get_target_field(remote_field).attname), remote_field.name
+
+    @classmethod
+    def related_resolver(cls, resolver, model_field, root, info, **args):
+        if (not graphene_settings.BATCH_RELATED_OBJECTS or not is_default_resolver(resolver) or
+                not is_valid_django_model(type(root)) or is_related_cached(model_field, root)):
+            return resolver(root, info, **args)
+
+        key, field_name = cls.get_loader_lookup(model_field, root)
+        if field_name is None:
+            return resolver(root, info, **args)
+        if key is None:
+            return None
+
+        related_model = model_field.related_model
+        loader = get_loader(
+            info,
+            ('related_object', related_model, field_name),
+            RelatedObjectLoader,
+            related_model._base_manager.all(),
+            field_name,
+            identity_map=get_identity_map(info.context)
+        )
+        if loader is None:
+            return resolver(root, info, **args)
+        return loader.load(key).then(partial(set_related_cache, model_field, root))
+
+    def get_resolver(self, parent_resolver):
+        return partial(self.related_resolver, parent_resolver, self.model_field)
 
 
 class DjangoListField(Field):
 
     def __init__(self, _type, *args, **kwargs):
+        self.chunk_size = kwargs.pop('chunk_size', graphene_settings.LIST_FIELD_CHUNK_SIZE)
         super(DjangoListField, self).__init__(List(_type), *args, **kwargs)
 
     @property
@@ -22,11 +211,70 @@ class DjangoListField(Field):
         return self.type.of_type._meta.node._meta.model
 
     @staticmethod
-    def list_resolver(resolver, root, info, **args):
-        return maybe_queryset(resolver(root, info, **args))
+    def evaluate_queryset(info, iterable):
+        iterable = maybe_queryset(iterable)
+        if isinstance(iterable, QuerySet):
+            return map_instances(info, list(iterable))
+        return iterable
+
+    @classmethod
+    def create_related_list_loader(cls, lookup, model, info, **kwargs):
+        return RelatedListLoader(lookup, optimize_queryset(model._default_manager.all(), info), **kwargs)
+
+    @classmethod
+    def load_related_list(cls, resolver, root, info):
+        """
+        Loads the many relation resolved by the default resolver along with
+        the ones of the other parents resolved in the same execution tick,
+        or returns None when it can't be batched.
+        """
+        if not (graphene_settings.BATCH_RELATED_LISTS and is_default_resolver(resolver) and
+                is_valid_django_model(type(root)) and root.pk is not None):
+            return None
+        lookup = resolver.args[0]
+        if not isinstance(getattr(type(root), lookup, None), MANY_RELATION_DESCRIPTORS):
+            return None
+        manager = getattr(root, lookup)
+        # Prefetched relations are resolved from their results
+        if manager.get_queryset()._result_cache is not None:
+            return None
+
+        # The relations of all the parents are selected alike, so the
+        # queryset is only optimized when the loader of the field is created
+        loader = get_loader(
+            info,
+            ('related_list', type(root), lookup, info.parent_type, tuple(info.field_asts)),
+            cls.create_related_list_loader,
+            lookup,
+            manager.model,
+            info,
+            identity_map=get_identity_map(info.context)
+        )
+        if loader is None:
+            return None
+        return loader.load(root)
+
+    @classmethod
+    def list_resolver(cls, resolver, chunk_size, root, info, **args):
+        loaded_list = cls.load_related_list(resolver, root, info)
+        if loaded_list is not None:
+            return loaded_list
+
+        iterable = values_queryset(optimize_queryset(maybe_queryset(resolver(root, info, **args)), info), info)
+
+        async_executor = get_async_executor(info)
+        if async_executor is not None:
+            return async_executor.resolve_awaitable(iterable, partial(cls.evaluate_queryset, info))
+
+        if chunk_size and isinstance(iterable, QuerySet) and iterable._result_cache is None:
+            return iterate_in_chunks(iterable, chunk_size)
+
+        if get_identity_map(info.context) is not None:
+            return cls.evaluate_queryset(info, iterable)
+        return maybe_queryset(iterable)
 
     def get_resolver(self, parent_resolver):
-        return partial(self.list_resolver, parent_resolver)
+        return partial(self.list_resolver, parent_resolver, self.chunk_size)
 
 
 class DjangoConnectionField(ConnectionField):
@@ -41,6 +289,11 @@ class DjangoConnectionField(ConnectionField):
             'enforce_first_or_last',
             graphene_settings.RELAY_CONNECTION_ENFORCE_FIRST_OR_LAST
         )
+        self.keyset_pagination = kwargs.pop(
+            'keyset_pagination',
+            graphene_settings.RELAY_CONNECTION_KEYSET_PAGINATION
+        )
+        self.count_strategy = kwargs.pop('count_strategy', None)
         super(DjangoConnectionField, self).__init__(*args, **kwargs)
 
     @property
@@ -74,34 +327,219 @@ class DjangoConnectionField(ConnectionField):
         return queryset & default_queryset
 
     @classmethod
-    def resolve_connection(cls, connection, default_manager, args, iterable):
+    def paginates_backwards(cls, args):
+        # Paginating backwards needs the position of the last row
+        return args.get('last') is not None or bool(args.get('before'))
+
+    @classmethod
+    def selects_length(cls, info):
+        optimizer = QueryOptimizer(info)
+        return any(
+            field.name.value not in COUNTLESS_CONNECTION_FIELDS
+            for field_ast in info.field_asts if field_ast.selection_set
+            for field in optimizer.get_fields(field_ast.selection_set)
+        )
+
+    @classmethod
+    def resolve_connection(cls, connection, default_manager, args, iterable, info=None, keyset_pagination=False,
+                           count_strategy=None):
         if iterable is None:
             iterable = default_manager
         iterable = maybe_queryset(iterable)
-        if isinstance(iterable, QuerySet):
+        list_slice = iterable
+        slice_start = 0
+        length = None
+        length_is_exact = True
+        if isinstance(iterable, QuerySet) and iterable._result_cache is not None:
+            # Prefetched querysets are sliced from their results
+            _len = list_slice_length = length = len(iterable)
+        elif isinstance(iterable, QuerySet):
             if iterable is not default_manager:
                 default_queryset = maybe_queryset(default_manager)
                 iterable = cls.merge_querysets(default_queryset, iterable)
-            _len = iterable.count()
+            if info is not None:
+                iterable = optimize_queryset(iterable, info)
+
+            ordering = get_keyset_ordering(iterable) if keyset_pagination else None
+            # Sliced querysets can't be filtered by the cursors
+            if ordering is not None and not (iterable.query.low_mark or iterable.query.high_mark):
+                return cls.resolve_keyset_connection(connection, args, iterable, ordering, info, count_strategy)
+
+            if info is not None:
+                iterable = values_queryset(iterable, info)
+
+            if info is not None and not cls.paginates_backwards(args):
+                # Fetch one more row than requested instead of counting them,
+                # which is enough to know if there is a next page
+                first = args.get('first')
+                slice_start = get_offset_with_default(args.get('after'), -1) + 1
+                slice_end = slice_start + first + 1 if first is not None else None
+                list_slice = list(iterable[slice_start:slice_end])
+                list_slice_length = len(list_slice)
+                _len = slice_start + list_slice_length
+                if cls.selects_length(info):
+                    length, length_is_exact = get_count_strategy(count_strategy).count(iterable)
+            else:
+                # The merged and optimized queryset is the one that's sliced
+                list_slice = iterable
+                _len = list_slice_length = length = iterable.count()
         else:
-            _len = len(iterable)
+            _len = list_slice_length = length = len(iterable)
         connection = connection_from_list_slice(
-            iterable,
+            list_slice,
             args,
-            slice_start=0,
+            slice_start=slice_start,
             list_length=_len,
-            list_slice_length=_len,
+            list_slice_length=list_slice_length,
             connection_type=connection,
             edge_type=connection.Edge,
             pageinfo_type=PageInfo,
         )
         connection.iterable = iterable
-        connection.length = _len
+        # The length is None when the rows were not counted, and
+        # may be approximate depending on the count strategy
+        connection.length = length
+        connection.length_is_exact = length_is_exact
+        return map_connection_nodes(info, connection)
+
+    @classmethod
+    def resolve_keyset_connection(cls, connection, args, iterable, ordering, info=None, count_strategy=None):
+        # The cursors are built from the ordering columns
+        immediate_loading, defer = iterable.query.deferred_loading
+        if immediate_loading and not defer:
+            ordering_columns = {name for name, _, _ in ordering if LOOKUP_SEP not in name}
+            iterable = iterable.only(*(set(immediate_loading) | ordering_columns))
+
+        keyset_connection = connection_from_keyset(
+            iterable,
+            ordering,
+            args,
+            connection_type=connection,
+            edge_type=connection.Edge,
+            pageinfo_type=PageInfo,
+        )
+        keyset_connection.iterable = iterable
+        keyset_connection.length = None
+        keyset_connection.length_is_exact = True
+        if info is None or cls.selects_length(info):
+            keyset_connection.length, keyset_connection.length_is_exact = \
+                get_count_strategy(count_strategy).count(iterable)
+        return map_connection_nodes(info, keyset_connection)
+
+    @classmethod
+    def get_batch_ordering(cls, queryset):
+        """
+        Returns the ordering of the rows when the connections of
+        several parents can be loaded with a window function.
+        """
+        query = queryset.query
+        if query.distinct or getattr(query, 'combinator', None) or query.low_mark or query.high_mark:
+            return None
+        if not supports_window_functions(connections[queryset.db]):
+            return None
+        # The rows are numbered by the database, which orders the nulls
+        ordering = get_keyset_ordering(queryset, allow_null=True)
+        if ordering is None or any(LOOKUP_SEP in name for name, _, _ in ordering):
+            return None
+        return ordering
+
+    @classmethod
+    def load_related_connection(cls, connection, default_manager, args, iterable, info, count_strategy=None):
+        """
+        Loads the connection of a reverse ForeignKey along with the ones of the
+        other parents resolved in the same execution tick, or returns None
+        when it can't be batched.
+        """
+        field = get_related_manager_field(iterable)
+        instance = getattr(iterable, 'instance', None)
+        if not (graphene_settings.BATCH_RELATED_CONNECTIONS and isinstance(iterable, Manager) and
+                getattr(field, 'many_to_one', False) and is_valid_django_model(type(instance))):
+            return None
+        # Prefetched connections are sliced from their results
+        if cls.paginates_backwards(args) or iterable.get_queryset()._result_cache is not None:
+            return None
+
+        key = getattr(instance, get_target_field(field).attname)
+        if key is None:
+            return None
+
+        first = args.get('first')
+        start = get_offset_with_default(args.get('after'), -1) + 1
+        # One more row than requested tells if there is a next page
+        end = start + first + 1 if first is not None else None
+
+        # The connections of all the parents are selected alike, so the
+        # loader of the field and its queryset are only created once
+        loader = get_loader(
+            info,
+            ('related_connection', field.model, field.name, info.parent_type, tuple(info.field_asts), start, end),
+            cls.create_related_connection_loader,
+            connection,
+            default_manager,
+            field,
+            info,
+            start,
+            end,
+            count_strategy,
+            identity_map=get_identity_map(info.context)
+        )
+        if loader is None:
+            return None
+        return loader.load(key).then(
+            partial(cls.resolve_loaded_connection, connection, args, loader.queryset, instance, field, start)
+        )
+
+    @classmethod
+    def create_related_connection_loader(cls, connection, default_manager, field, info, start, end,
+                                         count_strategy=None, **kwargs):
+        """
+        Returns the loader of the connections of the parents,
+        or None when they can't be batched.
+        """
+        queryset = maybe_queryset(default_manager)
+        ordering = cls.get_batch_ordering(queryset)
+        if ordering is None:
+            return None
+
+        count = cls.selects_length(info)
+        if count and not isinstance(get_count_strategy(count_strategy), ExactCount):
+            return None
+        annotations = {}
+        if graphene_settings.OPTIMIZE_QUERIES:
+            annotations = QueryOptimizer(info).get_annotations(queryset, connection, info.field_asts)
+
+        # The rows are fetched with raw SQL, which can't be built for querysets matching no row
+        try:
+            queryset.annotate(**annotations).query.get_compiler(using=queryset.db).as_sql()
+        except EmptyResultSet:
+            return None
+        return RelatedConnectionLoader(queryset, field, ordering, start, end, count, annotations, **kwargs)
+
+    @classmethod
+    def resolve_loaded_connection(cls, connection, args, queryset, instance, field, start, loaded):
+        rows, length = loaded
+        for row in rows:
+            set_related_cache(field, row, instance)
+
+        connection = connection_from_list_slice(
+            rows,
+            args,
+            slice_start=start,
+            list_length=length if length is not None else start + len(rows),
+            list_slice_length=len(rows),
+            connection_type=connection,
+            edge_type=connection.Edge,
+            pageinfo_type=PageInfo,
+        )
+        # Like for the other connections, the iterable isn't paginated
+        connection.iterable = queryset.filter(**{field.name: instance})
+        connection.length = length
+        connection.length_is_exact = True
         return connection
 
     @classmethod
     def connection_resolver(cls, resolver, connection, default_manager, max_limit,
-                            enforce_first_or_last, root, info, **args):
+                            enforce_first_or_last, root, info, keyset_pagination=False, count_strategy=None, **args):
         first = args.get('first')
         last = args.get('last')
 
@@ -124,7 +562,21 @@ class DjangoConnectionField(ConnectionField):
                 args['last'] = min(last, max_limit)
 
         iterable = resolver(root, info, **args)
-        on_resolve = partial(cls.resolve_connection, connection, default_manager, args)
+        if not keyset_pagination:
+            loaded_connection = cls.load_related_connection(
+                connection, default_manager, args, iterable, info, count_strategy
+            )
+            if loaded_connection is not None:
+                return loaded_connection
+
+        on_resolve = partial(
+            cls.resolve_connection, connection, default_manager, args,
+            info=info, keyset_pagination=keyset_pagination, count_strategy=count_strategy
+        )
+
+        async_executor = get_async_executor(info)
+        if async_executor is not None:
+            return async_executor.resolve_awaitable(iterable, on_resolve)
 
         if Promise.is_thenable(iterable):
             return Promise.resolve(iterable).then(on_resolve)
@@ -138,5 +590,7 @@ class DjangoConnectionField(ConnectionField):
             self.type,
             self.get_manager(),
             self.max_limit,
-            self.enforce_first_or_last
+            self.enforce_first_or_last,
+            keyset_pagination=self.keyset_pagination,
+            count_strategy=self.count_strategy
         )
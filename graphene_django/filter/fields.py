@@ -96,5 +96,7 @@ class DjangoFilterConnectionField(DjangoConnectionField):
             self.max_limit,
             self.enforce_first_or_last,
             self.filterset_class,
-            self.filtering_args
+            self.filtering_args,
+            keyset_pagination=self.keyset_pagination,
+            count_strategy=self.count_strategy
         )
@@ -714,3 +714,46 @@ def test_annotation_is_perserved():
 
     assert not result.errors
     assert result.data == expected
+
+
+def test_filter_connection_keyset_pagination():
+    class ReporterType(DjangoObjectType):
+        class Meta:
+            model = Reporter
+            interfaces = (Node, )
+            filter_fields = ('last_name', )
+
+    class Query(ObjectType):
+        all_reporters = DjangoFilterConnectionField(ReporterType, keyset_pagination=True)
+
+        def resolve_all_reporters(self, info, **args):
+            return Reporter.objects.order_by('first_name').reverse()
+
+    for first_name in ('a', 'b', 'c', 'd'):
+        Reporter.objects.create(first_name=first_name, last_name='Doe')
+    Reporter.objects.create(first_name='e', last_name='Roe')
+
+    schema = Schema(query=Query)
+    query = '''
+        query NodeFilteringQuery($after: String) {
+            allReporters(first: 2, after: $after, lastName: "Doe") {
+                pageInfo {
+                    endCursor
+                }
+                edges {
+                    node {
+                        firstName
+                    }
+                }
+            }
+        }
+    '''
+
+    result = schema.execute(query)
+    assert not result.errors
+    assert [edge['node']['firstName'] for edge in result.data['allReporters']['edges']] == ['d', 'c']
+
+    after = result.data['allReporters']['pageInfo']['endCursor']
+    result = schema.execute(query, variable_values={'after': after})
+    assert not result.errors
+    assert [edge['node']['firstName'] for edge in result.data['allReporters']['edges']] == ['b', 'a']
@@ -0,0 +1,133 @@
+from collections import OrderedDict
+from functools import partial
+
+from django.contrib.contenttypes.fields import GenericForeignKey, GenericRelation
+from django.contrib.contenttypes.models import ContentType
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from graphene import Dynamic, Field, Union
+from graphene.utils.str_converters import to_camel_case
+
+from .converter import convert_django_field, convert_field_to_list_or_connection
+from .fields import is_default_resolver
+from .loaders import NodeLoader, get_identity_map, get_loader, is_related_cached, set_related_cache
+from .registry import get_global_registry
+from .settings import graphene_settings
+from .utils import is_valid_django_model
+
+# This module imports the contenttypes models, so it is only
+# imported once the apps are loaded, by get_model_fields.
+# The GenericForeignKeys are only converted when declared in generic_types
+GENERIC_FIELDS = (GenericRelation, )
+
+
+class DjangoGenericForeignKeyField(Field):
+    """
+    A field resolving a GenericForeignKey with request-scoped loaders, so the
+    related objects of all the rows are fetched with one in_bulk query
+    per content type.
+    """
+
+    def __init__(self, _type, model_field, *args, **kwargs):
+        self.model_field = model_field
+        # The objects of the models outside of the union resolve to null
+        self.models = frozenset(member._meta.model._meta.concrete_model for member in _type._meta.types)
+        super(DjangoGenericForeignKeyField, self).__init__(_type, *args, **kwargs)
+
+    @classmethod
+    def generic_resolver(cls, resolver, model_field, models, root, info, **args):
+        if (not graphene_settings.BATCH_RELATED_OBJECTS or not is_default_resolver(resolver) or
+                not is_valid_django_model(type(root)) or is_related_cached(model_field, root)):
+            value = resolver(root, info, **args)
+            if is_valid_django_model(type(value)) and value._meta.concrete_model not in models:
+                return None
+            return value
+
+        content_type_id = getattr(root, root._meta.get_field(model_field.ct_field).attname)
+        object_id = getattr(root, model_field.fk_field)
+        if content_type_id is None or object_id is None:
+            return None
+
+        # The content types are cached by their manager
+        model = ContentType.objects.db_manager(root._state.db).get_for_id(content_type_id).model_class()
+        if model is None or model._meta.concrete_model not in models:
+            return None
+        try:
+            pk = model._meta.pk.to_python(object_id)
+        except ValidationError:
+            return None
+
+        loader = get_loader(
+            info,
+            ('generic_object', model),
+            NodeLoader,
+            model._base_manager.db_manager(root._state.db).all(),
+            identity_map=get_identity_map(info.context)
+        )
+        if loader is None:
+            return getattr(root, model_field.name)
+        return loader.load(pk).then(partial(set_related_cache, model_field, root))
+
+    def get_resolver(self, parent_resolver):
+        return partial(self.generic_resolver, parent_resolver, self.model_field, self.models)
+
+
+def create_generic_union(name, registry, types):
+    if callable(types):
+        types = types()
+    types = tuple(types)
+    if not types:
+        return None
+
+    def resolve_type(cls, instance, info):
+        model = type(instance)
+        return registry.get_type_for_model(model) or registry.get_type_for_model(model._meta.concrete_model)
+
+    return type(name, (Union, ), {
+        'Meta': type('Meta', (), {'types': types}),
+        'resolve_type': classmethod(resolve_type),
+    })
+
+
+def convert_generic_foreign_key(field, types, registry=None):
+    """
+    Converts the field to a union of the types of the models it can point to,
+    declared in the generic_types Meta option of DjangoObjectType.
+    """
+    registry = registry or get_global_registry()
+    union = []
+
+    def dynamic_type():
+        # The union is created once all the types are declared
+        if not union:
+            union.append(create_generic_union(
+                '{}{}'.format(field.model._meta.object_name, to_camel_case('_' + field.name)),
+                registry,
+                types
+            ))
+        if union[0] is None:
+            return
+
+        return DjangoGenericForeignKeyField(union[0], field)
+
+    return Dynamic(dynamic_type)
+
+
+def get_generic_foreign_key(model, name):
+    try:
+        field = model._meta.get_field(name)
+    except FieldDoesNotExist:
+        field = None
+    assert isinstance(field, GenericForeignKey), (
+        'The generic_types of {} must be GenericForeignKey fields, received "{}".'
+    ).format(model.__name__, name)
+    return field
+
+
+def construct_generic_fields(model, generic_types, registry):
+    fields = OrderedDict()
+    for name, types in generic_types.items():
+        fields[name] = convert_generic_foreign_key(get_generic_foreign_key(model, name), types, registry)
+    return fields
+
+
+convert_django_field.register(GenericRelation, convert_field_to_list_or_connection)
@@ -0,0 +1,96 @@
+from hashlib import md5
+
+from django.http import HttpResponseNotModified
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from graphql.language.visitor import TypeInfoVisitor, Visitor, visit
+from graphql.type import get_named_type
+from graphql.utils.type_info import TypeInfo
+
+
+class SelectedTypesVisitor(Visitor):
+    __slots__ = 'type_info', 'type_names'
+
+    def __init__(self, type_info):
+        self.type_info = type_info
+        self.type_names = set()
+
+    def enter_Field(self, node, key, parent, path, ancestors):
+        field_type = self.type_info.get_type()
+        if field_type is not None:
+            self.type_names.add(get_named_type(field_type).name)
+
+    def enter_InlineFragment(self, node, key, parent, path, ancestors):
+        if node.type_condition is not None:
+            self.type_names.add(node.type_condition.name.value)
+
+    def enter_FragmentDefinition(self, node, key, parent, path, ancestors):
+        self.type_names.add(node.type_condition.name.value)
+
+
+def get_selected_type_names(schema, document_ast):
+    type_info = TypeInfo(schema)
+    visitor = SelectedTypesVisitor(type_info)
+    visit(document_ast, TypeInfoVisitor(type_info, visitor))
+    return visitor.type_names
+
+
+def get_cache_max_age(document, operation_name, default=0, by_operation=None, by_type=None):
+    """
+    Returns the max-age of the operation, or else the lowest
+    max-age of the types it selects, or else the default.
+    """
+    if operation_name is None and len(document.operations_map) == 1:
+        operation_name = next(iter(document.operations_map))
+
+    if by_operation and operation_name in by_operation:
+        return by_operation[operation_name]
+
+    if not by_type:
+        return default
+
+    type_max_ages = [
+        by_type[type_name]
+        for type_name in get_selected_type_names(document.schema, document.document_ast)
+        if type_name in by_type
+    ]
+    return min(type_max_ages) if type_max_ages else default
+
+
+def get_etag(content):
+    return '"{}"'.format(md5(content).hexdigest())
+
+
+def etag_matches(request, etag):
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+    if not if_none_match:
+        return False
+
+    for value in if_none_match.split(','):
+        value = value.strip()
+        if value.startswith('W/'):
+            value = value[2:]
+        if value in (etag, '*'):
+            return True
+    return False
+
+
+def patch_http_cache_headers(request, response, max_age, public=False, vary_headers=()):
+    if public:
+        patch_cache_control(response, public=True, max_age=max_age)
+    else:
+        patch_cache_control(response, private=True, max_age=max_age)
+    patch_vary_headers(response, vary_headers)
+
+    # Streaming responses have no content to build the etag from
+    if response.streaming:
+        return response
+
+    etag = get_etag(response.content)
+    response['ETag'] = etag
+    if not etag_matches(request, etag):
+        return response
+
+    not_modified = HttpResponseNotModified()
+    for header in ('ETag', 'Cache-Control', 'Vary'):
+        not_modified[header] = response[header]
+    return not_modified
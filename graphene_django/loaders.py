@@ -0,0 +1,311 @@
+from collections import defaultdict
+
+from django.core.exceptions import ValidationError
+from django.db import connections
+from django.db.models import Count, Prefetch
+from promise import Promise
+from promise.dataloader import DataLoader
+
+from .compat import prefetch_related_objects
+from .settings import graphene_settings
+
+LOADERS_ATTRIBUTE = 'graphene_loaders'
+IDENTITY_MAP_ATTRIBUTE = 'graphene_identity_map'
+
+
+def get_request_attribute(context, name, factory):
+    if context is None:
+        return None
+    if isinstance(context, dict):
+        if name not in context:
+            context[name] = factory()
+        return context[name]
+
+    value = getattr(context, name, None)
+    if value is None:
+        value = factory()
+        try:
+            setattr(context, name, value)
+        except AttributeError:
+            return None
+    return value
+
+
+def get_request_loaders(context):
+    """
+    Returns the loaders of the request (the default context),
+    so batches don't outlive it.
+    """
+    return get_request_attribute(context, LOADERS_ATTRIBUTE, dict)
+
+
+def get_identity_map(context):
+    if not graphene_settings.IDENTITY_MAP:
+        return None
+    return get_request_attribute(context, IDENTITY_MAP_ATTRIBUTE, IdentityMap)
+
+
+def release_identity_map(context):
+    if isinstance(context, dict):
+        context.pop(IDENTITY_MAP_ATTRIBUTE, None)
+    elif getattr(context, IDENTITY_MAP_ATTRIBUTE, None) is not None:
+        delattr(context, IDENTITY_MAP_ATTRIBUTE)
+
+
+def clear_identity_map(context):
+    # The loaders of the request keep a reference to the map, which is cleared in place
+    if isinstance(context, dict):
+        identity_map = context.get(IDENTITY_MAP_ATTRIBUTE)
+    else:
+        identity_map = getattr(context, IDENTITY_MAP_ATTRIBUTE, None)
+    if identity_map is not None:
+        identity_map.clear()
+
+
+class ClearIdentityMapMiddleware(object):
+    """
+    Clears the identity map before each field of a mutation,
+    as the previous fields may have changed the mapped rows.
+    """
+
+    def resolve(self, next, root, info, **args):
+        if info.parent_type is info.schema.get_mutation_type():
+            clear_identity_map(info.context)
+        return next(root, info, **args)
+
+
+def get_instance_model(instance):
+    model = type(instance)
+    # Django < 1.10 loads the instances with deferred fields from a proxy of their model
+    if getattr(model, '_deferred', False):
+        model = model._meta.proxy_for_model
+    return model
+
+
+class IdentityMap(object):
+    """
+    Keeps a single instance of each row loaded during a request,
+    so it is neither queried nor held in memory twice.
+    """
+
+    def __init__(self):
+        self.instances = {}
+
+    def __len__(self):
+        return len(self.instances)
+
+    def clear(self):
+        self.instances.clear()
+
+    def get(self, model, pk):
+        try:
+            pk = model._meta.pk.to_python(pk)
+        except ValidationError:
+            return None
+        instance = self.instances.get((model, pk))
+        # Instances loaded with only() or defer() would query their missing fields
+        if instance is None or instance.get_deferred_fields():
+            return None
+        return instance
+
+    def add(self, instance):
+        """
+        Returns the instance of the row already in the map, or maps this one.
+        """
+        if instance is None or instance.pk is None:
+            return instance
+        key = (get_instance_model(instance), instance.pk)
+        mapped = self.instances.get(key)
+        if mapped is None or (mapped.get_deferred_fields() and not instance.get_deferred_fields()):
+            mapped = self.instances[key] = instance
+        return mapped
+
+    def add_all(self, instances):
+        return [self.add(instance) for instance in instances]
+
+
+def get_loader(info, key, loader_class, *args, **kwargs):
+    """
+    Returns the loader of the request for the key, created by `loader_class`
+    (which may also be a function returning None when the key can't be batched).
+    The loaders only batch the keys of an execution tick and don't cache
+    the objects, which the mutations (or the next operations of a batch) may change.
+    """
+    loaders = get_request_loaders(info.context)
+    if loaders is None:
+        return None
+    if key not in loaders:
+        kwargs.setdefault('cache', False)
+        loaders[key] = loader_class(*args, **kwargs)
+    return loaders[key]
+
+
+class RelatedObjectLoader(DataLoader):
+    """
+    Loads the objects whose `field_name` is one of the keys collected
+    during an execution tick with a single query.
+    """
+
+    def __init__(self, queryset, field_name='pk', identity_map=None, **kwargs):
+        super(RelatedObjectLoader, self).__init__(**kwargs)
+        self.queryset = queryset
+        self.field_name = field_name
+        self.identity_map = identity_map
+
+    def get_key(self, obj):
+        if self.field_name == 'pk':
+            return obj.pk
+        return getattr(obj, obj._meta.get_field(self.field_name).attname)
+
+    def fetch_objects(self, keys):
+        return {
+            self.get_key(obj): obj
+            for obj in self.queryset.filter(**{'{}__in'.format(self.field_name): keys})
+        }
+
+    def fetch(self, keys):
+        objects = {}
+        if self.identity_map is not None and self.field_name == 'pk':
+            for key in keys:
+                instance = self.identity_map.get(self.queryset.model, key)
+                if instance is not None:
+                    objects[key] = instance
+
+        missing_keys = set(keys) - set(objects)
+        if missing_keys:
+            for key, obj in self.fetch_objects(missing_keys).items():
+                objects[key] = self.identity_map.add(obj) if self.identity_map is not None else obj
+        return [objects.get(key) for key in keys]
+
+    def batch_load_fn(self, keys):
+        return Promise.resolve(self.fetch(keys))
+
+
+class NodeLoader(RelatedObjectLoader):
+    """
+    Loads the objects of a model requested by global ID during an
+    execution tick with a single in_bulk query.
+    """
+
+    def fetch_objects(self, keys):
+        return self.queryset.in_bulk(keys)
+
+
+class RelatedListLoader(DataLoader):
+    """
+    Loads a many relation (a ManyToManyField, its reverse or a reverse
+    ForeignKey) of all the parents collected during an execution tick,
+    prefetching it with one query and splitting the rows by parent.
+    """
+
+    def __init__(self, lookup, queryset, identity_map=None, **kwargs):
+        super(RelatedListLoader, self).__init__(**kwargs)
+        self.lookup = lookup
+        self.queryset = queryset
+        self.identity_map = identity_map
+
+    def fetch(self, instances):
+        prefetch_related_objects(list(instances), Prefetch(self.lookup, queryset=self.queryset))
+        related_lists = [list(getattr(instance, self.lookup).all()) for instance in instances]
+        if self.identity_map is not None:
+            related_lists = [self.identity_map.add_all(related) for related in related_lists]
+        return related_lists
+
+    def batch_load_fn(self, instances):
+        return Promise.resolve(self.fetch(instances))
+
+
+def get_related_cache_name(field):
+    # Django < 2.0, where the GenericForeignKeys have their own cache attribute
+    return getattr(field, 'cache_attr', None) or field.get_cache_name()
+
+
+def is_related_cached(field, instance):
+    if hasattr(field, 'is_cached'):
+        return field.is_cached(instance)
+    return hasattr(instance, get_related_cache_name(field))
+
+
+def set_related_cache(field, instance, value):
+    if hasattr(field, 'set_cached_value'):
+        field.set_cached_value(instance, value)
+    else:
+        setattr(instance, get_related_cache_name(field), value)
+    return value
+
+
+def supports_window_functions(connection):
+    if connection.vendor == 'sqlite':
+        # Django only enables window expressions on SQLite since 2.2
+        import sqlite3
+        return sqlite3.sqlite_version_info >= (3, 25, 0)
+    return getattr(connection.features, 'supports_over_clause', False)
+
+
+class RelatedConnectionLoader(DataLoader):
+    """
+    Loads the rows of a reverse ForeignKey connection for all the parents
+    collected during an execution tick: the rows of the requested page are
+    numbered per parent with ROW_NUMBER() OVER (PARTITION BY fk), and the
+    lengths, when needed, are grouped in a single aggregate query.
+    """
+
+    def __init__(self, queryset, field, ordering, start=0, end=None, count=False, annotations=None,
+                 identity_map=None, **kwargs):
+        super(RelatedConnectionLoader, self).__init__(**kwargs)
+        self.queryset = queryset
+        self.field = field
+        self.ordering = ordering
+        self.start = start
+        self.end = end
+        self.count = count
+        self.annotations = annotations or {}
+        self.identity_map = identity_map
+
+    def get_window_sql(self, connection):
+        qn = connection.ops.quote_name
+        return 'ROW_NUMBER() OVER (PARTITION BY {} ORDER BY {})'.format(
+            qn(self.field.column),
+            ', '.join(
+                '{} {}'.format(qn(field.column), 'DESC' if descending else 'ASC')
+                for _, field, descending in self.ordering
+            )
+        )
+
+    def fetch_rows(self, queryset):
+        connection = connections[queryset.db]
+        # The rows are numbered in an outer query, after the annotations (like aggregates)
+        columns = [field.attname for field in queryset.model._meta.concrete_fields]
+        if self.annotations:
+            queryset = queryset.annotate(**self.annotations)
+            columns.extend(self.annotations)
+        sql, params = queryset.order_by().values(*columns).query.get_compiler(using=queryset.db).as_sql()
+
+        bounds = ['ranked._row_number > %s']
+        params = list(params) + [self.start]
+        if self.end is not None:
+            bounds.append('ranked._row_number <= %s')
+            params.append(self.end)
+        return list(queryset.model._default_manager.db_manager(queryset.db).raw(
+            'SELECT * FROM (SELECT base.*, {} AS _row_number FROM ({}) base) ranked '
+            'WHERE {} ORDER BY ranked._row_number'.format(self.get_window_sql(connection), sql, ' AND '.join(bounds)),
+            params
+        ))
+
+    def fetch(self, keys):
+        queryset = self.queryset.filter(**{'{}__in'.format(self.field.name): set(keys)})
+        rows = defaultdict(list)
+        for obj in self.fetch_rows(queryset):
+            if self.identity_map is not None:
+                obj = self.identity_map.add(obj)
+            rows[getattr(obj, self.field.attname)].append(obj)
+
+        counts = {}
+        if self.count:
+            counts = dict(
+                queryset.order_by().values_list(self.field.attname).annotate(count=Count('pk'))
+            )
+        return [(rows.get(key, []), counts.get(key, 0) if self.count else None) for key in keys]
+
+    def batch_load_fn(self, keys):
+        return Promise.resolve(self.fetch(keys))
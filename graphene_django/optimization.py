@@ -0,0 +1,407 @@
+from collections import OrderedDict
+
+from django.db.models import ManyToOneRel, Prefetch
+from django.db.models.query import QuerySet
+from django.utils import six
+from graphene import Dynamic
+from graphene.relay import Connection
+from graphene.utils.str_converters import to_camel_case
+from graphql.language import ast
+from graphql.type import GraphQLObjectType, get_named_type
+
+from .compat import MissingType, ValuesIterable
+from .counting import ExactCount, get_count_strategy
+from .loaders import get_request_loaders
+from .settings import graphene_settings
+from .utils import get_model_fields
+
+
+def is_connection_type(graphene_type):
+    return isinstance(graphene_type, type) and issubclass(graphene_type, Connection)
+
+
+def get_node_type(graphene_type):
+    if is_connection_type(graphene_type):
+        return graphene_type._meta.node
+    return graphene_type
+
+
+def get_field_type(field):
+    if isinstance(field, Dynamic):
+        field = field.get_type()
+    return field
+
+
+def unwrap_type(graphene_type):
+    while hasattr(graphene_type, 'of_type'):
+        graphene_type = graphene_type.of_type
+    return graphene_type
+
+
+def get_annotation_joins(model, name, expression):
+    return frozenset(model._base_manager.annotate(**{name: expression}).query.alias_map)
+
+
+def aggregate_subquery(model, name, expression):
+    """
+    Computes the aggregate in a subquery correlated to the row,
+    so it isn't multiplied by the joins of other aggregates.
+    """
+    try:
+        # Django 1.11+
+        from django.db.models import OuterRef, Subquery
+    except ImportError:
+        return expression
+
+    queryset = model._base_manager.filter(pk=OuterRef('pk')).annotate(**{name: expression})
+    output_field = queryset.query.annotations[name].output_field
+    return Subquery(queryset.values(name)[:1], output_field=output_field)
+
+
+class ModelValues(dict):
+    """
+    A row fetched with values(), resolved like an instance of its model
+    by the default resolvers and by DjangoObjectType.
+    """
+    __slots__ = ('model', )
+
+    def __init__(self, model, *args, **kwargs):
+        super(ModelValues, self).__init__(*args, **kwargs)
+        self.model = model
+
+    @property
+    def pk(self):
+        return self[self.model._meta.pk.attname]
+
+    def __getattr__(self, name):
+        try:
+            return self[name]
+        except KeyError:
+            raise AttributeError(name)
+
+
+class ModelValuesIterable(ValuesIterable):
+
+    def __iter__(self):
+        model = self.queryset.model
+        for row in super(ModelValuesIterable, self).__iter__():
+            yield ModelValues(model, row)
+
+
+class QueryOptimizer(object):
+    """
+    Plans the select_related and prefetch_related calls needed to resolve
+    the relations selected in the query, so the related objects are fetched
+    with the queryset instead of one query per row.
+    The columns are restricted with only() to the selected model fields,
+    the primary keys, the foreign keys and the `required_columns` declared
+    in the Meta of the types.
+    """
+
+    def __init__(self, info):
+        self.info = info
+        self.schema = info.schema
+        self.fragments = info.fragments or {}
+        self.auto_camelcase = getattr(info.schema, 'auto_camelcase', True)
+
+    def optimize(self, queryset, graphene_type, field_asts, required_columns=()):
+        node_type = get_node_type(graphene_type)
+        if not hasattr(node_type._meta, 'model'):
+            return queryset
+
+        selected_fields = self.get_node_fields(field_asts, is_connection_type(graphene_type), node_type)
+        select_related = []
+        prefetch_related = []
+        only = list(required_columns)
+        self.plan(node_type, selected_fields, '', select_related, prefetch_related, only)
+
+        # Columns already restricted by the resolver are left untouched
+        if graphene_settings.OPTIMIZE_COLUMNS and queryset.query.deferred_loading == (frozenset(), True):
+            queryset = queryset.only(*only)
+        if select_related:
+            queryset = queryset.select_related(*select_related)
+        # Lookups already prefetched by the resolver are left untouched
+        prefetched = {getattr(lookup, 'prefetch_to', lookup) for lookup in queryset._prefetch_related_lookups}
+        prefetch_related = [lookup for lookup in prefetch_related if lookup.prefetch_to not in prefetched]
+        if prefetch_related:
+            queryset = queryset.prefetch_related(*prefetch_related)
+        return self.annotate(queryset, graphene_type, field_asts)
+
+    def annotate(self, queryset, graphene_type, field_asts):
+        annotations = self.get_annotations(queryset, graphene_type, field_asts)
+        if annotations:
+            queryset = queryset.annotate(**annotations)
+        return queryset
+
+    def get_annotations(self, queryset, graphene_type, field_asts):
+        """
+        Returns the annotations declared in the Meta of the type for
+        the fields in the selection, which the queryset doesn't have yet.
+        """
+        node_type = get_node_type(graphene_type)
+        annotations = getattr(node_type._meta, 'annotations', None)
+        if not annotations:
+            return {}
+
+        graphene_fields = self.get_graphene_fields(node_type)
+        selected_fields = self.get_node_fields(field_asts, is_connection_type(graphene_type), node_type)
+        selected_annotations = {}
+        for field_name in self.group_fields(selected_fields):
+            name = graphene_fields.get(field_name, (None, None))[0]
+            if name in annotations and name not in queryset.query.annotations:
+                selected_annotations[name] = annotations[name]
+
+        # Aggregates over different multi-valued relations multiply each other
+        # through their joins, so each one is computed in its own subquery
+        aggregates = [
+            aggregate for aggregate, expression in selected_annotations.items()
+            if getattr(expression, 'contains_aggregate', False)
+        ]
+        model = queryset.model
+        if len({get_annotation_joins(model, name, selected_annotations[name]) for name in aggregates}) > 1:
+            for name in aggregates:
+                selected_annotations[name] = aggregate_subquery(model, name, selected_annotations[name])
+        return selected_annotations
+
+    def plan(self, graphene_type, selected_fields, prefix, select_related, prefetch_related, only):
+        model = graphene_type._meta.model
+        model_fields = dict(get_model_fields(model))
+        # The GenericForeignKeys are only fields of the types declaring them
+        for name in getattr(graphene_type._meta, 'generic_types', None) or ():
+            model_fields[name] = model._meta.get_field(name)
+        graphene_fields = self.get_graphene_fields(graphene_type)
+
+        only.append(prefix + model._meta.pk.name)
+        only.extend(prefix + name for name in self.get_required_columns(graphene_type))
+
+        for field_name, field_asts in self.group_fields(selected_fields).items():
+            if field_name not in graphene_fields:
+                continue
+            name, field = graphene_fields[field_name]
+            model_field = model_fields.get(name)
+            if model_field is None:
+                continue
+            if model_field.concrete and not model_field.many_to_many:
+                only.append(prefix + name)
+            if hasattr(model_field, 'fk_field'):
+                # The objects of a GenericForeignKey are loaded from their content type and id
+                only.extend(prefix + column for column in (model_field.ct_field, model_field.fk_field))
+                continue
+            if not model_field.is_relation or self.has_custom_resolver(graphene_type, name):
+                continue
+
+            field = get_field_type(field)
+            child_type = unwrap_type(getattr(field, 'type', None))
+            if child_type is None or not hasattr(get_node_type(child_type)._meta, 'model'):
+                continue
+
+            if model_field.one_to_one or (model_field.many_to_one and model_field.concrete):
+                # Reverse one to one relations are selected by their query name
+                lookup = prefix + (name if model_field.concrete else model_field.name)
+                select_related.append(lookup)
+                self.plan(
+                    child_type,
+                    self.get_node_fields(field_asts, False, child_type),
+                    lookup + '__',
+                    select_related,
+                    prefetch_related,
+                    only
+                )
+                if not model_field.concrete:
+                    only.append('{}__{}'.format(lookup, model_field.field.name))
+            else:
+                queryset = self.get_related_queryset(field, model_field, field_asts)
+                if queryset is not None:
+                    # The prefetched objects are matched to their parent by the foreign key
+                    if model_field.many_to_many:
+                        required_columns = ()
+                    elif hasattr(model_field, 'object_id_field_name'):
+                        required_columns = (model_field.content_type_field_name, model_field.object_id_field_name)
+                    else:
+                        required_columns = (model_field.field.name, )
+                    prefetch_related.append(Prefetch(
+                        prefix + name,
+                        queryset=self.optimize(queryset, child_type, field_asts, required_columns)
+                    ))
+
+    def get_values_columns(self, graphene_type, field_asts, annotations=()):
+        """
+        Returns the columns of the model resolving the selection when it
+        only has plain model fields or annotations of the queryset,
+        or None when it needs instances.
+        """
+        from .types import DjangoObjectType
+
+        node_type = get_node_type(graphene_type)
+        model = getattr(node_type._meta, 'model', None)
+        if model is None:
+            return None
+        model_fields = dict(get_model_fields(model))
+        graphene_fields = self.get_graphene_fields(node_type)
+
+        columns = [model._meta.pk.attname]
+        selected_fields = self.get_node_fields(field_asts, is_connection_type(graphene_type), node_type)
+        for field_name in self.group_fields(selected_fields):
+            if field_name == '__typename':
+                continue
+            if field_name not in graphene_fields:
+                return None
+            name, field = graphene_fields[field_name]
+            # The ids are resolved from the primary key
+            if name == 'id' and (six.get_unbound_function(node_type.resolve_id) is
+                                 six.get_unbound_function(DjangoObjectType.resolve_id)):
+                continue
+            if name in annotations and name in (getattr(node_type._meta, 'annotations', None) or {}):
+                columns.append(name)
+                continue
+
+            model_field = model_fields.get(name)
+            if (model_field is None or not model_field.concrete or model_field.is_relation or
+                    getattr(field, 'resolver', None) is not None or self.has_custom_resolver(node_type, name)):
+                return None
+            if model_field.attname not in columns:
+                columns.append(model_field.attname)
+        return columns
+
+    def get_required_columns(self, graphene_type):
+        required_columns = getattr(graphene_type._meta, 'required_columns', ())
+        if required_columns == '__all__':
+            return [field.name for field in graphene_type._meta.model._meta.concrete_fields]
+        return required_columns
+
+    def get_related_queryset(self, field, model_field, field_asts=()):
+        from .fields import DjangoConnectionField
+
+        # Filtered connections depend on their arguments, so they can't be prefetched
+        if getattr(field, 'filterset_class', None) is not None:
+            return None
+        if isinstance(field, DjangoConnectionField):
+            queryset = field.get_manager().get_queryset()
+            # Their pages are loaded for all the parents at once instead
+            if self.loads_connection_pages(field, model_field, queryset, field_asts):
+                return None
+            return queryset
+        return model_field.related_model._default_manager.get_queryset()
+
+    def loads_connection_pages(self, field, model_field, queryset, field_asts):
+        # Generic relations are prefetched, their rows are not numbered by a foreign key
+        if not (graphene_settings.BATCH_RELATED_CONNECTIONS and isinstance(model_field, ManyToOneRel)):
+            return False
+        # The loaders are kept in the context
+        if get_request_loaders(self.info.context) is None:
+            return False
+        if field.keyset_pagination or not isinstance(get_count_strategy(field.count_strategy), ExactCount):
+            return False
+        if any(argument.name.value in ('last', 'before')
+               for field_ast in field_asts for argument in field_ast.arguments or ()):
+            return False
+        return field.get_batch_ordering(queryset) is not None
+
+    def has_custom_resolver(self, graphene_type, name):
+        return getattr(graphene_type, 'resolve_{}'.format(name), None) is not None
+
+    def get_graphene_fields(self, graphene_type):
+        fields = {}
+        for name, field in graphene_type._meta.fields.items():
+            field_name = getattr(field, 'name', None) or (to_camel_case(name) if self.auto_camelcase else name)
+            fields[field_name] = (name, field)
+        return fields
+
+    def group_fields(self, selected_fields):
+        # The same field may be selected several times with different aliases
+        grouped = OrderedDict()
+        for field_ast in selected_fields:
+            grouped.setdefault(field_ast.name.value, []).append(field_ast)
+        return grouped
+
+    def get_node_fields(self, field_asts, connection, node_type):
+        for field_ast in field_asts:
+            if field_ast.selection_set is None:
+                continue
+            if not connection:
+                for selected in self.get_fields(field_ast.selection_set, node_type):
+                    yield selected
+                continue
+
+            for edges in self.get_fields(field_ast.selection_set):
+                if edges.name.value != 'edges' or edges.selection_set is None:
+                    continue
+                for node in self.get_fields(edges.selection_set):
+                    if node.name.value != 'node' or node.selection_set is None:
+                        continue
+                    for selected in self.get_fields(node.selection_set, node_type):
+                        yield selected
+
+    def get_fields(self, selection_set, graphene_type=None):
+        for selection in selection_set.selections:
+            if isinstance(selection, ast.Field):
+                yield selection
+                continue
+
+            if isinstance(selection, ast.FragmentSpread):
+                fragment = self.fragments.get(selection.name.value)
+                if fragment is None:
+                    continue
+            else:
+                fragment = selection
+
+            if self.matches_type_condition(fragment.type_condition, graphene_type):
+                for selected in self.get_fields(fragment.selection_set, graphene_type):
+                    yield selected
+
+    def matches_type_condition(self, type_condition, graphene_type):
+        if type_condition is None or graphene_type is None:
+            return True
+        type_name = type_condition.name.value
+        if type_name == graphene_type._meta.name:
+            return True
+        # Fragments on interfaces may apply, fragments on other objects don't
+        return not isinstance(self.schema.get_type(type_name), GraphQLObjectType)
+
+
+def can_optimize(queryset):
+    # Evaluated querysets, like the prefetched ones, are kept as they are
+    return not (queryset._result_cache is not None or getattr(queryset, '_fields', None) is not None or
+                getattr(queryset.query, 'combinator', None))
+
+
+def optimize_queryset(queryset, info):
+    """
+    Applies the select_related and prefetch_related calls needed by the
+    selection of the field being resolved, which returns the queryset.
+    """
+    if not graphene_settings.OPTIMIZE_QUERIES or not isinstance(queryset, QuerySet):
+        return queryset
+
+    if not can_optimize(queryset):
+        return queryset
+
+    graphene_type = getattr(get_named_type(info.return_type), 'graphene_type', None)
+    if graphene_type is None:
+        return queryset
+    return QueryOptimizer(info).optimize(queryset, graphene_type, info.field_asts)
+
+
+def values_queryset(queryset, info):
+    """
+    Fetches the rows as dicts when the selection of the field being
+    resolved only has plain model fields, skipping the model instances.
+    """
+    if not graphene_settings.OPTIMIZE_VALUES or not isinstance(queryset, QuerySet):
+        return queryset
+    # Django < 1.9 returns a ValuesQuerySet instead
+    if ValuesIterable is MissingType:
+        return queryset
+    if not can_optimize(queryset) or queryset._prefetch_related_lookups:
+        return queryset
+
+    graphene_type = getattr(get_named_type(info.return_type), 'graphene_type', None)
+    if graphene_type is None:
+        return queryset
+    columns = QueryOptimizer(info).get_values_columns(graphene_type, info.field_asts, queryset.query.annotations)
+    if columns is None:
+        return queryset
+
+    queryset = queryset.values(*columns)
+    queryset._iterable_class = ModelValuesIterable
+    return queryset
@@ -0,0 +1,186 @@
+import datetime
+import json
+from decimal import Decimal
+from uuid import UUID
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Q
+from django.db.models.constants import LOOKUP_SEP
+from django.utils import six
+from graphql_relay.utils import base64, unbase64
+
+KEYSET_CURSOR_PREFIX = 'keyset:'
+
+
+def get_keyset_ordering(queryset, allow_null=False):
+    """
+    Returns the (name, field, descending) of the columns ordering the queryset,
+    ending with the primary key so the ordering is unique, or None when the
+    ordering can't be used for keyset pagination (expressions, random order,
+    relations, nullable columns unless allow_null).
+    """
+    model = queryset.model
+    if queryset.query.order_by:
+        order_by = queryset.query.order_by
+    elif queryset.query.default_ordering:
+        order_by = model._meta.ordering
+    else:
+        order_by = ()
+
+    ordering = []
+    for name in order_by:
+        if not isinstance(name, six.string_types) or name == '?':
+            return None
+        # Reversed querysets keep their ordering and flip its direction
+        descending = name.startswith('-') != (not queryset.query.standard_ordering)
+        name = name.lstrip('-+')
+        field = get_ordering_field(model, name)
+        if field is None:
+            return None
+        # The position of the nulls depends on the database and they can't
+        # be compared to the cursors, so these rows are paginated by offsets
+        if not allow_null and is_nullable_ordering(model, name):
+            return None
+        ordering.append((name, field, descending))
+
+    pk = model._meta.pk
+    if not any(field == pk and LOOKUP_SEP not in name for name, field, _ in ordering):
+        ordering.append((pk.name, pk, False))
+    return ordering
+
+
+def get_ordering_field(model, name):
+    field = None
+    for part in name.split(LOOKUP_SEP):
+        if field is not None:
+            if not field.is_relation or field.many_to_many or field.one_to_many:
+                return None
+            model = field.related_model
+        try:
+            field = model._meta.pk if part == 'pk' else model._meta.get_field(part)
+        except FieldDoesNotExist:
+            return None
+    if field.is_relation or not field.concrete:
+        return None
+    return field
+
+
+def is_nullable_ordering(model, name):
+    for part in name.split(LOOKUP_SEP):
+        field = model._meta.pk if part == 'pk' else model._meta.get_field(part)
+        if field.null:
+            return True
+        if field.is_relation:
+            model = field.related_model
+    return False
+
+
+def get_ordering_value(instance, name):
+    for part in name.split(LOOKUP_SEP):
+        if instance is None:
+            return None
+        instance = getattr(instance, part)
+    return instance
+
+
+def encode_cursor_value(value):
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, (Decimal, UUID)):
+        return str(value)
+    return value
+
+
+def get_keyset_cursor(instance, ordering):
+    values = [encode_cursor_value(get_ordering_value(instance, name)) for name, _, _ in ordering]
+    return base64(KEYSET_CURSOR_PREFIX + json.dumps(values, separators=(',', ':')))
+
+
+def get_keyset_values(cursor, ordering):
+    """
+    Returns the ordering values encoded in the cursor,
+    or None if it isn't a valid cursor for this ordering.
+    """
+    if not cursor:
+        return None
+    try:
+        cursor = unbase64(cursor)
+        if not cursor.startswith(KEYSET_CURSOR_PREFIX):
+            return None
+        values = json.loads(cursor[len(KEYSET_CURSOR_PREFIX):])
+        if not isinstance(values, list) or len(values) != len(ordering) or None in values:
+            return None
+        return [field.to_python(value) for (_, field, _), value in zip(ordering, values)]
+    except Exception:
+        return None
+
+
+def get_keyset_filter(ordering, values, forward=True):
+    """
+    Returns the rows coming after the values (or before them when not
+    forward), the equivalent of `WHERE (col, pk) > (value, pk_value)` for
+    columns ordered in any direction.
+    """
+    condition = Q()
+    equal = Q()
+    for (name, _, descending), value in zip(ordering, values):
+        lookup = 'gt' if descending != forward else 'lt'
+        condition |= equal & Q(**{'{}__{}'.format(name, lookup): value})
+        equal &= Q(**{name: value})
+
+    # The bound on the first column alone lets the database use its index
+    name, _, descending = ordering[0]
+    condition &= Q(**{'{}__{}e'.format(name, 'gt' if descending != forward else 'lt'): values[0]})
+    return condition
+
+
+def connection_from_keyset(queryset, ordering, args, connection_type, edge_type, pageinfo_type):
+    """
+    Builds the connection of a queryset paginated by the values of its
+    ordering columns instead of offsets, so deep pages don't need to scan
+    the previous rows.
+    """
+    first = args.get('first')
+    last = args.get('last')
+    queryset = queryset.order_by(*[
+        '-' + name if descending else name
+        for name, _, descending in ordering
+    ])
+    if not queryset.query.standard_ordering:
+        queryset = queryset.reverse()
+
+    after = get_keyset_values(args.get('after'), ordering)
+    if after is not None:
+        queryset = queryset.filter(get_keyset_filter(ordering, after))
+    before = get_keyset_values(args.get('before'), ordering)
+    if before is not None:
+        queryset = queryset.filter(get_keyset_filter(ordering, before, forward=False))
+
+    has_previous_page = has_next_page = False
+    if first is not None:
+        nodes = list(queryset[:first + 1])
+        has_next_page = len(nodes) > first
+        nodes = nodes[:first]
+        if last is not None:
+            has_previous_page = len(nodes) > last
+            nodes = nodes[max(len(nodes) - last, 0):] if last else []
+    elif last is not None:
+        nodes = list(queryset.reverse()[:last + 1])
+        has_previous_page = len(nodes) > last
+        nodes = nodes[:last][::-1]
+    else:
+        nodes = list(queryset)
+
+    edges = [
+        edge_type(node=node, cursor=get_keyset_cursor(node, ordering))
+        for node in nodes
+    ]
+    return connection_type(
+        edges=edges,
+        page_info=pageinfo_type(
+            start_cursor=edges[0].cursor if edges else None,
+            end_cursor=edges[-1].cursor if edges else None,
+            has_previous_page=has_previous_page,
+            has_next_page=has_next_page
+        )
+    )
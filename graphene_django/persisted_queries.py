@@ -0,0 +1,122 @@
+import inspect
+import json
+from collections import OrderedDict
+from threading import Lock
+
+from django.core.cache import caches
+from graphql.error import GraphQLError
+
+from .settings import graphene_settings
+
+
+class PersistedQueryError(GraphQLError):
+    code = None
+
+    def __init__(self, message=None):
+        super(PersistedQueryError, self).__init__(message or self.default_message)
+        self.extensions = {'code': self.code}
+
+
+class PersistedQueryNotFound(PersistedQueryError):
+    code = 'PERSISTED_QUERY_NOT_FOUND'
+    default_message = 'PersistedQueryNotFound'
+
+
+class PersistedQueryHashMismatch(PersistedQueryError):
+    code = 'PERSISTED_QUERY_HASH_MISMATCH'
+    default_message = 'provided sha does not match query'
+
+
+class PersistedQueryStore(object):
+    """
+    Maps sha256 query hashes to query strings.
+    Read-only stores simply ignore the queries registered with `set`.
+    """
+
+    def get(self, query_hash):
+        raise NotImplementedError('get method not implemented in {}.'.format(self.__class__.__name__))
+
+    def set(self, query_hash, query):
+        raise NotImplementedError('set method not implemented in {}.'.format(self.__class__.__name__))
+
+
+class InMemoryPersistedQueryStore(PersistedQueryStore):
+
+    def __init__(self, maxsize=1000):
+        self.maxsize = maxsize
+        self._queries = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, query_hash):
+        with self._lock:
+            query = self._queries.pop(query_hash, None)
+            if query is not None:
+                self._queries[query_hash] = query
+            return query
+
+    def set(self, query_hash, query):
+        with self._lock:
+            self._queries.pop(query_hash, None)
+            self._queries[query_hash] = query
+            while len(self._queries) > self.maxsize:
+                self._queries.popitem(last=False)
+
+
+class DjangoCachePersistedQueryStore(PersistedQueryStore):
+
+    def __init__(self, cache_alias='default', timeout=None, key_prefix='graphene:persisted_query:'):
+        self.cache_alias = cache_alias
+        self.timeout = timeout
+        self.key_prefix = key_prefix
+
+    @property
+    def cache(self):
+        return caches[self.cache_alias]
+
+    def get_cache_key(self, query_hash):
+        return self.key_prefix + query_hash
+
+    def get(self, query_hash):
+        return self.cache.get(self.get_cache_key(query_hash))
+
+    def set(self, query_hash, query):
+        self.cache.set(self.get_cache_key(query_hash), query, self.timeout)
+
+
+class ManifestPersistedQueryStore(PersistedQueryStore):
+    """
+    Reads the queries from a JSON manifest file mapping each hash to its query,
+    defaults to the `PERSISTED_QUERY_MANIFEST` setting.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or graphene_settings.PERSISTED_QUERY_MANIFEST
+        self._queries = None
+
+    @property
+    def queries(self):
+        if self._queries is None:
+            with open(self.path) as manifest:
+                self._queries = json.load(manifest)
+        return self._queries
+
+    def get(self, query_hash):
+        return self.queries.get(query_hash)
+
+    def set(self, query_hash, query):
+        pass
+
+
+persisted_query_store = None
+
+
+def get_default_persisted_query_store():
+    # Views are instantiated on every request, so the store
+    # configured in the settings is only instantiated once
+    global persisted_query_store
+    store = graphene_settings.PERSISTED_QUERY_STORE
+    if not inspect.isclass(store):
+        return store
+    if not isinstance(persisted_query_store, store):
+        persisted_query_store = store()
+    return persisted_query_store
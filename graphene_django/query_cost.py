@@ -0,0 +1,181 @@
+from weakref import WeakKeyDictionary
+
+from graphene.utils.str_converters import to_camel_case
+from graphql.error import GraphQLError
+from graphql.language import ast
+from graphql.type import GraphQLInterfaceType, GraphQLObjectType, get_named_type
+from graphql.utils.get_operation_ast import get_operation_ast
+
+from .settings import graphene_settings
+
+PAGINATION_ARGUMENTS = ('first', 'last')
+
+
+class QueryCostError(GraphQLError):
+    pass
+
+
+def get_graphene_field(schema, parent_type, field_name):
+    graphene_type = getattr(parent_type, 'graphene_type', None)
+    fields = getattr(getattr(graphene_type, '_meta', None), 'fields', None) or {}
+    auto_camelcase = getattr(schema, 'auto_camelcase', True)
+    for name, field in fields.items():
+        name = getattr(field, 'name', None) or (to_camel_case(name) if auto_camelcase else name)
+        if name == field_name:
+            return field
+    return None
+
+
+class QueryCostAnalyzer(object):
+    """
+    Computes the depth and the cost of an operation from its AST, before
+    executing it. The cost of every field is its weight (1 for the fields
+    returning objects, 0 for the scalars) multiplied by the page sizes
+    (first or last) of all the connections it is nested in.
+    """
+
+    def __init__(self, schema, document_ast, variables=None, weights=None):
+        self.schema = schema
+        self.variables = variables or {}
+        self.weights = weights or {}
+        self.fragments = {
+            definition.name.value: definition
+            for definition in document_ast.definitions
+            if isinstance(definition, ast.FragmentDefinition)
+        }
+        self.document_ast = document_ast
+        # Whether the cost depends on the variables, so it can't be reused
+        self.uses_variables = False
+
+    def analyze(self, operation_name=None):
+        operation = get_operation_ast(self.document_ast, operation_name)
+        if operation is None:
+            return 0, 0
+
+        if operation.operation == 'mutation':
+            root_type = self.schema.get_mutation_type()
+        elif operation.operation == 'subscription':
+            root_type = self.schema.get_subscription_type()
+        else:
+            root_type = self.schema.get_query_type()
+
+        return self.analyze_selection_set(operation.selection_set, root_type, 1, 0)
+
+    def analyze_selection_set(self, selection_set, parent_type, multiplier, depth, visited_fragments=()):
+        cost = 0
+        max_depth = depth
+        for selection in selection_set.selections:
+            if isinstance(selection, ast.Field):
+                field_cost, field_depth = self.analyze_field(selection, parent_type, multiplier, depth + 1)
+            elif isinstance(selection, ast.InlineFragment):
+                field_cost, field_depth = self.analyze_selection_set(
+                    selection.selection_set,
+                    self.get_condition_type(selection.type_condition, parent_type),
+                    multiplier,
+                    depth,
+                    visited_fragments
+                )
+            else:
+                fragment = self.fragments.get(selection.name.value)
+                if fragment is None or fragment.name.value in visited_fragments:
+                    continue
+                field_cost, field_depth = self.analyze_selection_set(
+                    fragment.selection_set,
+                    self.get_condition_type(fragment.type_condition, parent_type),
+                    multiplier,
+                    depth,
+                    visited_fragments + (fragment.name.value, )
+                )
+            cost += field_cost
+            max_depth = max(max_depth, field_depth)
+        return cost, max_depth
+
+    def get_condition_type(self, type_condition, parent_type):
+        if type_condition is None:
+            return parent_type
+        return self.schema.get_type(type_condition.name.value) or parent_type
+
+    def analyze_field(self, field_ast, parent_type, multiplier, depth):
+        if not isinstance(parent_type, (GraphQLObjectType, GraphQLInterfaceType)):
+            return 0, depth
+
+        field_name = field_ast.name.value
+        field_def = parent_type.fields.get(field_name)
+        if field_def is None:
+            # Introspection fields are free
+            return 0, depth
+
+        field_type = get_named_type(field_def.type)
+        cost = multiplier * self.get_weight(parent_type, field_name, field_ast.selection_set is not None)
+        if field_ast.selection_set is None:
+            return cost, depth
+
+        if any(argument in field_def.args for argument in PAGINATION_ARGUMENTS):
+            multiplier *= self.get_page_size(field_ast, parent_type)
+
+        children_cost, children_depth = self.analyze_selection_set(
+            field_ast.selection_set, field_type, multiplier, depth
+        )
+        return cost + children_cost, children_depth
+
+    def get_weight(self, parent_type, field_name, has_selection_set):
+        key = '{}.{}'.format(parent_type.name, field_name)
+        if key in self.weights:
+            return self.weights[key]
+        return 1 if has_selection_set else 0
+
+    def get_page_size(self, field_ast, parent_type):
+        page_size = None
+        for argument in field_ast.arguments:
+            if argument.name.value not in PAGINATION_ARGUMENTS:
+                continue
+            value = argument.value
+            if isinstance(value, ast.Variable):
+                self.uses_variables = True
+                value = self.variables.get(value.name.value)
+            elif isinstance(value, ast.IntValue):
+                value = int(value.value)
+            else:
+                value = None
+            if value:
+                page_size = max(page_size or 0, value)
+
+        if page_size is None:
+            field = get_graphene_field(self.schema, parent_type, field_ast.name.value)
+            page_size = getattr(field, 'max_limit', None) or graphene_settings.RELAY_CONNECTION_MAX_LIMIT or 1
+        return page_size
+
+
+document_costs = WeakKeyDictionary()
+
+
+def get_query_cost(document, operation_name=None, variables=None, weights=None):
+    """
+    Returns the (cost, depth) of the operation, memoized for the documents
+    kept in the document cache when the cost doesn't depend on the variables.
+    """
+    costs = document_costs.get(document)
+    if costs is not None and operation_name in costs:
+        return costs[operation_name]
+
+    analyzer = QueryCostAnalyzer(document.schema, document.document_ast, variables, weights)
+    cost = analyzer.analyze(operation_name)
+    if not analyzer.uses_variables:
+        document_costs.setdefault(document, {})[operation_name] = cost
+    return cost
+
+
+def validate_query_cost(document, operation_name=None, variables=None, max_cost=None, max_depth=None,
+                        weights=None):
+    if not (max_cost or max_depth):
+        return
+
+    cost, depth = get_query_cost(document, operation_name, variables, weights)
+    if max_depth and depth > max_depth:
+        raise QueryCostError(
+            'The query has a depth of {}, which exceeds the maximum depth of {}.'.format(depth, max_depth)
+        )
+    if max_cost and cost > max_cost:
+        raise QueryCostError(
+            'The query has a cost of {}, which exceeds the maximum cost of {}.'.format(cost, max_cost)
+        )
@@ -0,0 +1,242 @@
+import inspect
+import json
+import time
+from functools import partial
+from hashlib import sha256
+from weakref import WeakKeyDictionary
+
+from django.apps import apps
+from django.core.cache import caches
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from graphene.relay import Connection
+from graphql.execution import ExecutionResult
+from graphql.type.definition import is_abstract_type
+from graphql.utils.schema_printer import print_schema
+from promise import Promise
+
+from .document_cache import get_query_hash
+from .http_cache import get_selected_type_names
+from .settings import graphene_settings
+
+document_models = WeakKeyDictionary()
+annotation_models = WeakKeyDictionary()
+schema_hashes = WeakKeyDictionary()
+
+
+def get_annotation_models(graphene_type):
+    """
+    Returns the models joined by the annotations of a DjangoObjectType,
+    like the model of the articles for Count('articles').
+    """
+    models = annotation_models.get(graphene_type)
+    if models is None:
+        meta = graphene_type._meta
+        tables = set()
+        for name, expression in (getattr(meta, 'annotations', None) or {}).items():
+            query = meta.model._base_manager.annotate(**{name: expression}).query
+            tables.update(join.table_name for join in query.alias_map.values())
+        models = {
+            model._meta.concrete_model for model in apps.get_models(include_auto_created=True)
+            if model._meta.db_table in tables
+        }
+        annotation_models[graphene_type] = models
+    return models
+
+
+def get_document_models(document):
+    """
+    Returns the models behind the DjangoObjectTypes selected in the document,
+    including the possible types of the interfaces and unions it selects,
+    the models joined by their annotations and the ones aggregated by the
+    connections, memoized for the documents that are kept in the document cache.
+    """
+    from .types import DjangoObjectType
+
+    models = document_models.get(document)
+    if models is None:
+        schema = document.schema
+        graphql_types = []
+        for type_name in get_selected_type_names(schema, document.document_ast):
+            graphql_type = schema.get_type(type_name)
+            if is_abstract_type(graphql_type):
+                graphql_types.extend(schema.get_possible_types(graphql_type))
+            elif graphql_type is not None:
+                graphql_types.append(graphql_type)
+
+        models = set()
+        for graphql_type in graphql_types:
+            graphene_type = getattr(graphql_type, 'graphene_type', None)
+            if not inspect.isclass(graphene_type):
+                continue
+            # The aggregates of a connection may be selected without its nodes
+            if issubclass(graphene_type, Connection):
+                graphene_type = graphene_type._meta.node
+            if inspect.isclass(graphene_type) and issubclass(graphene_type, DjangoObjectType):
+                models.add(graphene_type._meta.model._meta.concrete_model)
+                models.update(get_annotation_models(graphene_type))
+        document_models[document] = models
+    return models
+
+
+def get_schema_hash(schema):
+    # Views with different schemas may share the cache
+    try:
+        schema_hash = schema_hashes.get(schema)
+    except TypeError:
+        schema_hash = None
+    if schema_hash is None:
+        schema_hash = sha256(print_schema(schema).encode('utf-8')).hexdigest()
+        try:
+            schema_hashes[schema] = schema_hash
+        except TypeError:
+            pass
+    return schema_hash
+
+
+def vary_on_user(request):
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        return user.pk
+    return None
+
+
+class ResponseCache(object):
+    """
+    Caches the data of the query operations in a Django cache.
+    Each key includes a version of the models behind the selected types,
+    bumped whenever one of their instances is saved or deleted.
+    """
+
+    def __init__(self, cache_alias='default', timeout=60, key_prefix='graphene:response:',
+                 vary_on=vary_on_user, lock_timeout=10, lock_poll_interval=0.05):
+        self.cache_alias = cache_alias
+        self.timeout = timeout
+        self.key_prefix = key_prefix
+        self.vary_on = vary_on
+        self.lock_timeout = lock_timeout
+        self.lock_poll_interval = lock_poll_interval
+        self.connect_signals()
+
+    @property
+    def cache(self):
+        return caches[self.cache_alias]
+
+    def connect_signals(self):
+        dispatch_uid = '{}{}'.format(self.key_prefix, self.cache_alias)
+        post_save.connect(self.on_model_change, weak=False, dispatch_uid=dispatch_uid)
+        post_delete.connect(self.on_model_change, weak=False, dispatch_uid=dispatch_uid)
+        m2m_changed.connect(self.on_m2m_change, weak=False, dispatch_uid=dispatch_uid)
+
+    def on_model_change(self, sender, **kwargs):
+        self.invalidate_model(sender)
+
+    def on_m2m_change(self, sender, instance, model, action, **kwargs):
+        if action.startswith('post_'):
+            self.invalidate_model(type(instance))
+            self.invalidate_model(model)
+
+    def get_model_version_key(self, model):
+        meta = model._meta.concrete_model._meta
+        return '{}version:{}.{}'.format(self.key_prefix, meta.app_label, meta.model_name)
+
+    def invalidate_model(self, model):
+        from .registry import get_global_registry
+        registry = get_global_registry()
+        concrete_model = model._meta.concrete_model
+        if not (registry.get_type_for_model(model) or registry.get_type_for_model(concrete_model) or
+                any(concrete_model in get_annotation_models(graphene_type)
+                    for graphene_type in registry._registry.values())):
+            return
+
+        key = self.get_model_version_key(model)
+        try:
+            self.cache.incr(key)
+        except ValueError:
+            self.cache.add(key, self.get_initial_version(), None)
+
+    def get_initial_version(self):
+        # Versions may be evicted from the cache, so they don't restart
+        # from a fixed value that could match older cached responses
+        return int(time.time() * 1000)
+
+    def get_versions(self, version_keys):
+        versions = self.cache.get_many(version_keys)
+        for key in version_keys:
+            if key not in versions:
+                self.cache.add(key, self.get_initial_version(), None)
+                versions[key] = self.cache.get(key)
+        return versions
+
+    def get_key(self, request, document, variables, operation_name):
+        version_keys = sorted(self.get_model_version_key(model) for model in get_document_models(document))
+        versions = self.get_versions(version_keys)
+        key_parts = json.dumps([
+            get_schema_hash(document.schema),
+            get_query_hash(document.document_string),
+            operation_name,
+            variables,
+            self.vary_on(request) if self.vary_on else None,
+            [versions[key] for key in version_keys],
+        ], sort_keys=True, cls=DjangoJSONEncoder)
+        return self.key_prefix + sha256(key_parts.encode('utf-8')).hexdigest()
+
+    def get_or_execute(self, request, document, variables, operation_name, execute, wait=True):
+        key = self.get_key(request, document, variables, operation_name)
+        data = self.cache.get(key)
+        if data is not None:
+            return ExecutionResult(data=data)
+
+        # Only one request executes the operation, the others
+        # wait for its result to land in the cache (single flight)
+        lock_key = key + ':lock'
+        if not self.cache.add(lock_key, 1, self.lock_timeout):
+            data = self.wait_for(key) if wait else None
+            if data is not None:
+                return ExecutionResult(data=data)
+            return execute()
+
+        try:
+            result = execute()
+        except Exception:
+            self.cache.delete(lock_key)
+            raise
+
+        if Promise.is_thenable(result):
+            return Promise.resolve(result).then(
+                partial(self.store, key, lock_key),
+                partial(self.release, lock_key)
+            )
+        return self.store(key, lock_key, result)
+
+    def wait_for(self, key):
+        deadline = time.time() + self.lock_timeout
+        while time.time() < deadline:
+            time.sleep(self.lock_poll_interval)
+            data = self.cache.get(key)
+            if data is not None:
+                return data
+        return None
+
+    def store(self, key, lock_key, result):
+        if not result.errors and not result.invalid and result.data is not None:
+            self.cache.set(key, result.data, self.timeout)
+        self.cache.delete(lock_key)
+        return result
+
+    def release(self, lock_key, error):
+        self.cache.delete(lock_key)
+        raise error
+
+
+response_cache = None
+
+
+def get_default_response_cache():
+    global response_cache
+    cache = graphene_settings.RESPONSE_CACHE
+    if not inspect.isclass(cache):
+        return cache
+    if not isinstance(response_cache, cache):
+        response_cache = cache()
+    return response_cache
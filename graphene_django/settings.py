@@ -35,6 +35,72 @@ DEFAULTS = {
     'RELAY_CONNECTION_ENFORCE_FIRST_OR_LAST': False,
     # Max items returned in ConnectionFields / FilterConnectionFields
     'RELAY_CONNECTION_MAX_LIMIT': 100,
+    # Set to True to paginate the ConnectionFields / FilterConnectionFields
+    # with cursors holding the values of the ordering columns, instead of offsets
+    'RELAY_CONNECTION_KEYSET_PAGINATION': False,
+    # Strategy computing the length of the ConnectionFields when it is selected,
+    # for example 'graphene_django.counting.CappedCount'. Defaults to exact counts
+    'RELAY_CONNECTION_COUNT_STRATEGY': None,
+    # Rows fetched at a time by the DjangoListFields, with a server-side cursor
+    # where the database supports it. Defaults to fetching all the rows at once
+    'LIST_FIELD_CHUNK_SIZE': None,
+    # Max parsed and validated documents kept in the GraphQLView
+    # document cache, set to 0 or None to disable the cache
+    'DOCUMENT_CACHE_SIZE': 1000,
+    # Store used to look up persisted queries by their sha256 hash,
+    # for example 'graphene_django.persisted_queries.InMemoryPersistedQueryStore'
+    'PERSISTED_QUERY_STORE': None,
+    # Path of the JSON manifest read by the ManifestPersistedQueryStore
+    'PERSISTED_QUERY_MANIFEST': None,
+    # Number of threads used to execute the operations of a batch
+    # request concurrently, operations run one after another if not set
+    'BATCH_MAX_WORKERS': None,
+    # Functions used to encode the responses and decode the request bodies,
+    # the defaults use orjson when it's installed
+    'JSON_ENCODER': 'graphene_django.encoding.json_encode',
+    'JSON_DECODER': 'graphene_django.encoding.json_decode',
+    # Size of the thread pool running the operations of the AsyncGraphQLView,
+    # defaults to the concurrent.futures.ThreadPoolExecutor default
+    'ASYNC_MAX_WORKERS': None,
+    # Cache for the data of the query operations,
+    # for example 'graphene_django.response_cache.ResponseCache'
+    'RESPONSE_CACHE': None,
+    # Queries going over these limits are rejected before being executed,
+    # see graphene_django.query_cost
+    'QUERY_MAX_COST': None,
+    'QUERY_MAX_DEPTH': None,
+    # Cost of the fields, as {'TypeName.fieldName': cost}
+    'QUERY_COST_WEIGHTS': {},
+    # Set to True to add the Server-Timing header to the responses
+    'SERVER_TIMING': False,
+    # Function called with the request and its RequestTiming
+    # once the response is ready, to forward them to a metrics backend
+    'TIMING_HOOK': None,
+    # Set to False to disable the select_related and prefetch_related
+    # planning of the querysets resolved by the Django fields
+    'OPTIMIZE_QUERIES': True,
+    # Set to True to only fetch the columns of the selected model fields.
+    # Columns read outside of the selection, like in custom resolvers or
+    # model methods, must be declared in the required_columns type option
+    'OPTIMIZE_COLUMNS': False,
+    # Set to True to fetch the rows of the ConnectionFields and DjangoListFields
+    # as dicts when only plain model fields are selected, instead of instances
+    'OPTIMIZE_VALUES': False,
+    # Set to False to resolve the ForeignKey and OneToOne fields with
+    # attribute access, instead of loaders batching them in one query per model
+    'BATCH_RELATED_OBJECTS': True,
+    # Set to False to resolve the reverse ForeignKey connections one parent
+    # at a time, instead of loaders numbering their rows with window functions
+    'BATCH_RELATED_CONNECTIONS': True,
+    # Set to False to resolve the many relations of the DjangoListFields one parent
+    # at a time, instead of loaders prefetching them for all the parents at once
+    'BATCH_RELATED_LISTS': True,
+    # Set to False to fetch the objects requested through DjangoNodeField one
+    # at a time, instead of loaders batching them in one query per type
+    'BATCH_NODE_LOOKUPS': True,
+    # Set to True to keep a single instance of each row loaded during a request,
+    # reused by the loaders and get_node instead of querying the row again
+    'IDENTITY_MAP': False,
 }
 
 if settings.DEBUG:
@@ -46,6 +112,12 @@ if settings.DEBUG:
 IMPORT_STRINGS = (
     'MIDDLEWARE',
     'SCHEMA',
+    'PERSISTED_QUERY_STORE',
+    'JSON_ENCODER',
+    'JSON_DECODER',
+    'RESPONSE_CACHE',
+    'TIMING_HOOK',
+    'RELAY_CONNECTION_COUNT_STRATEGY',
 )
 
 
@@ -0,0 +1,6 @@
+import sys
+
+collect_ignore = []
+if sys.version_info < (3, 5):
+    # The async views use the async def syntax of Python 3.5
+    collect_ignore.append('test_async_views.py')
@@ -0,0 +1,47 @@
+import datetime
+
+import graphene
+from graphene.relay import Node
+
+from ..fields import DjangoConnectionField
+from ..types import DjangoObjectType
+from .models import Article, Reporter
+
+
+def create_reporters(count, articles_per_reporter=0):
+    reporters = []
+    for i in range(count):
+        reporter = Reporter.objects.create(first_name='Reporter {}'.format(i), last_name='Doe', email='')
+        for j in range(articles_per_reporter):
+            create_article(reporter, 'Article {} {}'.format(i, j))
+        reporters.append(reporter)
+    return reporters
+
+
+def create_article(reporter, headline, **kwargs):
+    # The reporter is also the editor of the article by default
+    kwargs.setdefault('editor', reporter)
+    kwargs.setdefault('pub_date', datetime.date.today())
+    kwargs.setdefault('pub_date_time', datetime.datetime.now())
+    return Article.objects.create(headline=headline, reporter=reporter, **kwargs)
+
+
+def get_relay_schema(reporter_meta=None, article_meta=None, resolve_all_articles=None, **article_connection_kwargs):
+    """
+    Returns a schema with the allReporters and allArticles connections,
+    whose Node types are extended with the given Meta options.
+    """
+    ReporterType = type('ReporterType', (DjangoObjectType, ), {
+        'Meta': type('Meta', (), dict(reporter_meta or {}, model=Reporter, interfaces=(Node, ))),
+    })
+    ArticleType = type('ArticleType', (DjangoObjectType, ), {
+        'Meta': type('Meta', (), dict(article_meta or {}, model=Article, interfaces=(Node, ))),
+    })
+
+    query_attrs = {
+        'all_reporters': DjangoConnectionField(ReporterType),
+        'all_articles': DjangoConnectionField(ArticleType, **article_connection_kwargs),
+    }
+    if resolve_all_articles is not None:
+        query_attrs['resolve_all_articles'] = resolve_all_articles
+    return graphene.Schema(query=type('Query', (graphene.ObjectType, ), query_attrs))
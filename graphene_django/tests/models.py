@@ -1,5 +1,7 @@
 from __future__ import absolute_import
 
+from django.contrib.contenttypes.fields import GenericForeignKey, GenericRelation
+from django.contrib.contenttypes.models import ContentType
 from django.db import models
 from django.utils.translation import ugettext_lazy as _
 
@@ -25,6 +27,7 @@ class Film(models.Model):
     ], default='ot')
     reporters = models.ManyToManyField('Reporter',
                                        related_name='films')
+    comments = GenericRelation('Comment')
 
 class DoeReporterManager(models.Manager):
     def get_queryset(self):
@@ -88,3 +91,10 @@ class Article(models.Model):
 
     class Meta:
         ordering = ('headline',)
+
+
+class Comment(models.Model):
+    text = models.CharField(max_length=100)
+    content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE)
+    object_id = models.PositiveIntegerField()
+    content_object = GenericForeignKey('content_type', 'object_id')
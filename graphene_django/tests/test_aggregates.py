@@ -0,0 +1,118 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+import graphene
+from graphene.relay import Node
+
+from ..fields import DjangoConnectionField
+from ..types import DjangoObjectType
+from .data import create_article
+from .models import Article, Reporter
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def articles():
+    reporter = Reporter.objects.create(first_name='John', last_name='Doe', email='')
+    return [
+        create_article(reporter, 'Article {}'.format(i), importance=importance, lang=lang)
+        for i, (importance, lang) in enumerate([(1, 'en'), (2, 'en'), (None, 'es'), (2, 'es')])
+    ]
+
+
+def get_schema():
+    class ArticleType(DjangoObjectType):
+        class Meta:
+            model = Article
+            interfaces = (Node, )
+            aggregate_fields = ('importance', )
+
+    class Query(graphene.ObjectType):
+        all_articles = DjangoConnectionField(ArticleType, lang=graphene.String())
+        article_list = DjangoConnectionField(ArticleType)
+
+        def resolve_all_articles(self, info, lang=None, **args):
+            if lang:
+                return Article.objects.filter(lang=lang)
+            return Article.objects.all()
+
+        def resolve_article_list(self, info, **args):
+            return list(Article.objects.all())
+
+    return graphene.Schema(query=Query)
+
+
+AGGREGATES_QUERY = '''
+    query Aggregates($lang: String) {
+      allArticles(first: 1, lang: $lang) {
+        edges {
+          node {
+            headline
+          }
+        }
+        aggregates {
+          count
+          sum {
+            importance
+          }
+          max {
+            importance
+          }
+        }
+      }
+    }
+'''
+
+
+def test_connection_aggregates(articles):
+    schema = get_schema()
+
+    with CaptureQueriesContext(connection) as queries:
+        result = schema.execute(AGGREGATES_QUERY)
+    assert not result.errors
+    assert result.data['allArticles'] == {
+        'edges': [{'node': {'headline': 'Article 0'}}],
+        'aggregates': {'count': 4, 'sum': {'importance': 5}, 'max': {'importance': 2}},
+    }
+    # The page and the aggregates, without counting the rows
+    assert len(queries) == 2
+    assert 'LIMIT' not in queries[1]['sql']
+
+    result = schema.execute(AGGREGATES_QUERY, variable_values={'lang': 'es'})
+    assert not result.errors
+    assert result.data['allArticles']['aggregates'] == {
+        'count': 2, 'sum': {'importance': 2}, 'max': {'importance': 2}
+    }
+
+
+def test_connection_aggregates_of_lists(articles):
+    schema = get_schema()
+
+    result = schema.execute('''
+        query {
+          articleList {
+            aggregates {
+              count
+              min {
+                importance
+              }
+            }
+          }
+        }
+    ''')
+    assert not result.errors
+    assert result.data['articleList']['aggregates'] == {'count': 4, 'min': {'importance': 1}}
+
+
+def test_aggregate_fields_must_be_numeric():
+    with pytest.raises(AssertionError) as excinfo:
+        class ArticleType(DjangoObjectType):
+            class Meta:
+                model = Article
+                interfaces = (Node, )
+                aggregate_fields = ('headline', )
+                skip_registry = True
+
+    assert 'is not a numeric field' in str(excinfo.value)
@@ -0,0 +1,228 @@
+import asyncio
+import json
+import threading
+import time
+
+import pytest
+from django.test import RequestFactory
+
+import graphene
+from graphene.relay import Node
+
+from ..async_views import AsyncGraphQLView
+from ..fields import DjangoConnectionField, DjangoListField
+from ..types import DjangoObjectType
+from .data import create_article
+from .models import Article, Reporter
+from .schema_view import schema as view_schema
+
+# The views close the old connections of the worker threads
+pytestmark = pytest.mark.django_db(transaction=True)
+
+
+def execute_view(view, request):
+    return asyncio.get_event_loop().run_until_complete(view(request))
+
+
+def response_json(response):
+    return json.loads(response.content.decode())
+
+
+def test_async_view_is_a_coroutine_function():
+    # The request handlers supporting async views only await coroutine functions
+    view = AsyncGraphQLView.as_view(schema=view_schema)
+    assert asyncio.iscoroutinefunction(view)
+
+
+def test_async_view_executes_queries():
+    view = AsyncGraphQLView.as_view(schema=view_schema)
+    request = RequestFactory().get('/graphql', {'query': '{test}'})
+
+    response = execute_view(view, request)
+    assert response.status_code == 200
+    assert response_json(response) == {
+        'data': {'test': 'Hello World'}
+    }
+
+
+def test_async_view_executes_batches():
+    view = AsyncGraphQLView.as_view(schema=view_schema, batch=True)
+    request = RequestFactory().post('/graphql', json.dumps([
+        {'id': 1, 'query': '{test}'},
+        {'id': 2, 'query': '{ unknown }'},
+    ]), 'application/json')
+
+    response = execute_view(view, request)
+    assert response.status_code == 400
+    results = response_json(response)
+    assert results[0] == {'id': 1, 'data': {'test': 'Hello World'}, 'status': 200}
+    assert results[1]['status'] == 400
+
+
+def test_async_view_rejects_mutations_in_get():
+    view = AsyncGraphQLView.as_view(schema=view_schema)
+    request = RequestFactory().get('/graphql', {'query': 'mutation { writeTest { test } }'})
+
+    response = execute_view(view, request)
+    assert response.status_code == 405
+
+
+def test_async_view_resolves_django_fields_in_thread_pool():
+    class ReporterType(DjangoObjectType):
+
+        class Meta:
+            model = Reporter
+            interfaces = (Node, )
+            only_fields = ('first_name', )
+
+    class ReporterListType(DjangoObjectType):
+
+        class Meta:
+            model = Reporter
+            only_fields = ('first_name', )
+            skip_registry = True
+
+    class Query(graphene.ObjectType):
+        all_reporters = DjangoConnectionField(ReporterType)
+        reporter_list = DjangoListField(ReporterListType)
+
+        async def resolve_all_reporters(self, info, **args):
+            await asyncio.sleep(0)
+            return Reporter.objects.order_by('first_name')
+
+        def resolve_reporter_list(self, info):
+            return Reporter.objects.order_by('-first_name')
+
+    Reporter.objects.create(first_name='ABA', last_name='X', email='aba@example.com', a_choice=1)
+    Reporter.objects.create(first_name='ABO', last_name='Y', email='abo@example.com', a_choice=1)
+
+    view = AsyncGraphQLView.as_view(schema=graphene.Schema(query=Query))
+    request = RequestFactory().get('/graphql', {'query': '''
+        query {
+          allReporters(first: 1) {
+            edges {
+              node {
+                firstName
+              }
+            }
+          }
+          reporterList {
+            firstName
+          }
+        }
+    '''})
+
+    response = execute_view(view, request)
+    assert response.status_code == 200
+    assert response_json(response) == {
+        'data': {
+            'allReporters': {
+                'edges': [{'node': {'firstName': 'ABA'}}]
+            },
+            'reporterList': [{'firstName': 'ABO'}, {'firstName': 'ABA'}],
+        }
+    }
+
+
+def test_async_view_loads_related_objects_in_thread_pool():
+    class ReporterType(DjangoObjectType):
+
+        class Meta:
+            model = Reporter
+            only_fields = ('first_name', )
+
+    class ArticleType(DjangoObjectType):
+
+        class Meta:
+            model = Article
+            only_fields = ('headline', 'reporter')
+
+    class Query(graphene.ObjectType):
+        articles = graphene.List(ArticleType)
+
+        def resolve_articles(self, info):
+            return list(Article.objects.order_by('headline'))
+
+    for first_name in ('ABA', 'ABO'):
+        reporter = Reporter.objects.create(first_name=first_name, last_name='X', email='', a_choice=1)
+        create_article(reporter, first_name.lower())
+
+    view = AsyncGraphQLView.as_view(schema=graphene.Schema(query=Query))
+    request = RequestFactory().get('/graphql', {'query': '{ articles { headline reporter { firstName } } }'})
+
+    response = execute_view(view, request)
+    assert response.status_code == 200
+    assert response_json(response) == {
+        'data': {
+            'articles': [
+                {'headline': 'aba', 'reporter': {'firstName': 'ABA'}},
+                {'headline': 'abo', 'reporter': {'firstName': 'ABO'}},
+            ]
+        }
+    }
+
+
+def test_async_view_resolves_sync_resolvers_in_thread_pool():
+    threads = {}
+
+    class Query(graphene.ObjectType):
+        sync_field = graphene.String()
+        async_field = graphene.String()
+
+        def resolve_sync_field(self, info):
+            threads['sync'] = threading.current_thread()
+            return 'sync'
+
+        async def resolve_async_field(self, info):
+            await asyncio.sleep(0)
+            threads['async'] = threading.current_thread()
+            return 'async'
+
+    class Mutation(graphene.ObjectType):
+        write = graphene.String()
+
+        def resolve_write(self, info):
+            threads['mutation'] = threading.current_thread()
+            return 'written'
+
+    view = AsyncGraphQLView.as_view(schema=graphene.Schema(query=Query, mutation=Mutation))
+    request = RequestFactory().post('/graphql', json.dumps({
+        'query': '{ syncField asyncField }',
+    }), 'application/json')
+    assert response_json(execute_view(view, request)) == {'data': {'syncField': 'sync', 'asyncField': 'async'}}
+
+    request = RequestFactory().post('/graphql', json.dumps({'query': 'mutation { write }'}), 'application/json')
+    assert response_json(execute_view(view, request)) == {'data': {'write': 'written'}}
+
+    assert threads['async'] is threading.main_thread()
+    assert threads['sync'] is not threading.main_thread()
+    assert threads['mutation'] is not threading.main_thread()
+
+
+def test_async_view_executes_the_mutations_of_batches_in_order():
+    calls = []
+
+    class Query(graphene.ObjectType):
+        read = graphene.String()
+
+        def resolve_read(self, info):
+            calls.append('read')
+            return 'read'
+
+    class Mutation(graphene.ObjectType):
+        write = graphene.String()
+
+        def resolve_write(self, info):
+            time.sleep(0.01)
+            calls.append('write')
+            return 'written'
+
+    view = AsyncGraphQLView.as_view(schema=graphene.Schema(query=Query, mutation=Mutation), batch=True)
+    request = RequestFactory().post('/graphql', json.dumps([
+        {'id': 1, 'query': 'mutation { write }'},
+        {'id': 2, 'query': '{ read }'},
+    ]), 'application/json')
+
+    response = execute_view(view, request)
+    assert response.status_code == 200
+    assert calls == ['write', 'read']
@@ -0,0 +1,114 @@
+import pytest
+from django.core.cache import cache
+
+import graphene
+from graphene.relay import Connection, Node
+
+from ..counting import CachedCount, CappedCount, ExactCount, PostgresEstimateCount, get_count_strategy
+from ..fields import DjangoConnectionField
+from ..settings import graphene_settings
+from ..types import DjangoObjectType
+from .models import Reporter
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def reporters():
+    return [
+        Reporter.objects.create(first_name='Reporter {}'.format(i), last_name=last_name, email='')
+        for i, last_name in enumerate(['Doe', 'Doe', 'Roe'])
+    ]
+
+
+def test_exact_and_capped_counts(reporters):
+    assert ExactCount().count(Reporter.objects.all()) == (3, True)
+    assert CappedCount(limit=2).count(Reporter.objects.all()) == (2, False)
+    assert CappedCount(limit=3).count(Reporter.objects.all()) == (3, True)
+    assert CappedCount(limit=2).count(Reporter.objects.filter(last_name='Roe')) == (1, True)
+
+
+def test_postgres_estimate_falls_back_on_other_databases(reporters):
+    assert PostgresEstimateCount(threshold=0).count(Reporter.objects.all()) == (3, True)
+
+
+def test_cached_count(reporters, django_assert_num_queries):
+    cache.clear()
+    strategy = CachedCount(timeout=None)
+
+    with django_assert_num_queries(1):
+        assert strategy.count(Reporter.objects.filter(last_name='Doe')) == (2, True)
+        assert strategy.count(Reporter.objects.filter(last_name='Doe').order_by('email')) == (2, True)
+
+    Reporter.objects.create(first_name='Reporter 3', last_name='Doe', email='')
+    with django_assert_num_queries(1):
+        assert strategy.count(Reporter.objects.filter(last_name='Doe')) == (2, True)
+        assert strategy.count(Reporter.objects.filter(last_name='Roe')) == (1, True)
+
+
+def test_cached_count_of_empty_querysets(reporters, django_assert_num_queries):
+    strategy = CachedCount(timeout=None)
+
+    with django_assert_num_queries(0):
+        assert strategy.count(Reporter.objects.filter(pk__in=[])) == (0, True)
+        assert strategy.count(Reporter.objects.none()) == (0, True)
+
+
+def test_count_strategy_from_settings():
+    assert isinstance(get_count_strategy(), ExactCount)
+
+    graphene_settings.RELAY_CONNECTION_COUNT_STRATEGY = CappedCount
+    try:
+        assert isinstance(get_count_strategy(), CappedCount)
+    finally:
+        graphene_settings.RELAY_CONNECTION_COUNT_STRATEGY = None
+
+    strategy = CappedCount(limit=5)
+    assert get_count_strategy(strategy) is strategy
+
+
+def test_connection_uses_count_strategy(reporters):
+    class CountedConnection(Connection):
+        total_count = graphene.Int()
+        total_count_is_exact = graphene.Boolean()
+
+        class Meta:
+            abstract = True
+
+        def resolve_total_count(self, info):
+            return self.length
+
+        def resolve_total_count_is_exact(self, info):
+            return self.length_is_exact
+
+    class ReporterType(DjangoObjectType):
+        class Meta:
+            model = Reporter
+            interfaces = (Node, )
+            connection_class = CountedConnection
+
+    class Query(graphene.ObjectType):
+        all_reporters = DjangoConnectionField(ReporterType, count_strategy=CappedCount(limit=2))
+
+    schema = graphene.Schema(query=Query)
+    result = schema.execute('''
+        query {
+          allReporters(first: 1) {
+            totalCount
+            totalCountIsExact
+            edges {
+              node {
+                firstName
+              }
+            }
+          }
+        }
+    ''')
+    assert not result.errors
+    assert result.data == {
+        'allReporters': {
+            'totalCount': 2,
+            'totalCountIsExact': False,
+            'edges': [{'node': {'firstName': 'Reporter 0'}}],
+        }
+    }
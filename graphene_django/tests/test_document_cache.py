@@ -0,0 +1,53 @@
+from graphql import get_default_backend
+
+from ..document_cache import DocumentCache
+from .schema_view import schema
+
+
+def test_document_cache_hits_and_misses():
+    cache = DocumentCache(maxsize=10)
+    backend = get_default_backend()
+
+    document = cache.get_document(backend, schema, '{test}')
+    assert cache.get_document(backend, schema, '{test}') is document
+    assert cache.misses == 1
+    assert cache.hits == 1
+    assert len(cache) == 1
+
+    result = document.execute()
+    assert not result.errors
+    assert result.data == {'test': 'Hello World'}
+
+
+def test_document_cache_evicts_least_recently_used():
+    cache = DocumentCache(maxsize=2)
+    backend = get_default_backend()
+
+    first = cache.get_document(backend, schema, '{ a: test }')
+    cache.get_document(backend, schema, '{ b: test }')
+    # Touch the first document, so the second one is evicted
+    cache.get_document(backend, schema, '{ a: test }')
+    cache.get_document(backend, schema, '{ c: test }')
+
+    assert len(cache) == 2
+    assert cache.get_document(backend, schema, '{ a: test }') is first
+    cache.get_document(backend, schema, '{ b: test }')
+    assert cache.misses == 4
+
+
+def test_document_cache_keeps_validation_errors():
+    cache = DocumentCache()
+    backend = get_default_backend()
+
+    document = cache.get_document(backend, schema, '{ unknown }')
+    result = document.execute(variables={'who': 'Dolly'})
+    assert result.invalid
+    assert result.errors[0].message == 'Cannot query field "unknown" on type "QueryRoot".'
+
+
+def test_document_cache_clear():
+    cache = DocumentCache()
+    cache.get_document(get_default_backend(), schema, '{test}')
+    cache.clear()
+    assert len(cache) == 0
+    assert cache.misses == 0
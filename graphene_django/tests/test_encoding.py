@@ -0,0 +1,66 @@
+import datetime
+import decimal
+import json
+import uuid
+
+import pytest
+
+from ..encoding import (json_decode, json_encode, json_encode_iter, orjson,
+                        stdlib_json_encode)
+
+VALUES = {
+    'decimal': decimal.Decimal('1.10'),
+    'datetime': datetime.datetime(2018, 1, 2, 3, 4, 5, 678000),
+    'date': datetime.date(2018, 1, 2),
+    'uuid': uuid.UUID('d3f8a9a1-c5a1-4a5c-9d89-3a6ab2c0e8c1'),
+}
+
+EXPECTED = {
+    'decimal': '1.10',
+    'datetime': '2018-01-02T03:04:05.678',
+    'date': '2018-01-02',
+    'uuid': 'd3f8a9a1-c5a1-4a5c-9d89-3a6ab2c0e8c1',
+}
+
+
+@pytest.mark.parametrize('encode', [json_encode, stdlib_json_encode])
+def test_encodes_django_values(encode):
+    assert json.loads(encode(VALUES)) == EXPECTED
+
+
+@pytest.mark.parametrize('encode', [json_encode, stdlib_json_encode])
+def test_encodes_pretty(encode):
+    assert encode({'data': {'b': 1, 'a': None}}, pretty=True) == (
+        '{\n'
+        '  "data": {\n'
+        '    "a": null,\n'
+        '    "b": 1\n'
+        '  }\n'
+        '}'
+    )
+
+
+def test_encodes_compact():
+    assert json_encode({'data': {'test': 'Hello World'}}) == '{"data":{"test":"Hello World"}}'
+
+
+@pytest.mark.skipif(orjson is None, reason="orjson should be installed")
+def test_falls_back_for_values_orjson_rejects():
+    assert json_encode({'big': 2 ** 70}) == '{"big":%d}' % 2 ** 70
+
+
+def test_decodes():
+    assert json_decode('{"query":"{test}"}') == {'query': '{test}'}
+    with pytest.raises(ValueError):
+        json_decode('[oh}')
+
+
+def test_encodes_incrementally():
+    data = {'data': {'allReporters': {'edges': [
+        {'node': {'id': str(i), 'name': 'Reporter {}'.format(i)}} for i in range(100)
+    ]}}}
+
+    chunks = list(json_encode_iter(data, chunk_size=256))
+    assert len(chunks) > 1
+    assert all(len(chunk) < 512 for chunk in chunks)
+    assert json.loads(''.join(chunks)) == data
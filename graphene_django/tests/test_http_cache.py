@@ -0,0 +1,49 @@
+import pytest
+
+from .test_views import j, response_json, url_string
+
+pytestmark = pytest.mark.urls('graphene_django.tests.urls_http_cache')
+
+
+def test_sets_cache_headers_on_get_queries(client):
+    response = client.get(url_string(query='{test}'))
+
+    assert response.status_code == 200
+    assert response['Cache-Control'] == 'private, max-age=30'
+    assert response['Vary'] == 'Accept, Authorization, Cookie'
+    assert response['ETag']
+
+
+def test_returns_not_modified_for_matching_etag(client):
+    response = client.get(url_string(query='{test}'))
+    etag = response['ETag']
+
+    response = client.get(url_string(query='{test}'), HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 304
+    assert response['ETag'] == etag
+    assert response['Cache-Control'] == 'private, max-age=30'
+    assert not response.content
+
+    response = client.get(url_string(query='{test(who: "Dolly")}'), HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert response_json(response) == {'data': {'test': 'Hello Dolly'}}
+
+
+def test_uses_max_age_of_the_operation(client):
+    response = client.get(url_string(query='query uncached { test }'))
+    assert response['Cache-Control'] == 'private, max-age=0'
+
+
+def test_uses_lowest_max_age_of_the_selected_types(client):
+    response = client.get(url_string('/graphql/types', query='{test}'))
+    assert response['Cache-Control'] == 'private, max-age=10'
+
+
+def test_does_not_cache_posts_or_errors(client):
+    response = client.post(url_string(), j(query='{test}'), 'application/json')
+    assert response.status_code == 200
+    assert not response.has_header('ETag')
+    assert not response.has_header('Cache-Control')
+
+    response = client.get(url_string(query='{thrower}'))
+    assert not response.has_header('ETag')
@@ -0,0 +1,704 @@
+import json
+
+import django
+import pytest
+from django.db.models.functions import Length
+from django.test import RequestFactory
+
+import graphene
+from graphene.relay import Connection, Node
+from graphql_relay import to_global_id
+
+from ..fields import DjangoConnectionField, DjangoListField, DjangoNodeField, load_node_from_global_id
+from ..loaders import release_identity_map
+from ..optimization import QueryOptimizer
+from ..registry import Registry
+from ..settings import graphene_settings
+from ..types import DjangoObjectType
+from ..views import GraphQLView
+from .data import create_article, create_reporters
+from .models import Article, Comment, Film, FilmDetails, Reporter
+
+pytestmark = pytest.mark.django_db
+
+
+class Context(object):
+    pass
+
+
+@pytest.fixture
+def articles():
+    reporters = create_reporters(3)
+    return [create_article(reporters[i % 3], 'Article {}'.format(i), editor=reporters[0]) for i in range(6)]
+
+
+def get_article_schema(**article_attrs):
+    class ReporterType(DjangoObjectType):
+        class Meta:
+            model = Reporter
+
+    ArticleType = type('ArticleType', (DjangoObjectType, ), dict(
+        article_attrs,
+        Meta=type('Meta', (), {'model': Article}),
+    ))
+
+    class Query(graphene.ObjectType):
+        articles = graphene.List(ArticleType)
+
+        def resolve_articles(self, info):
+            return Article.objects.order_by('pk')
+
+    return graphene.Schema(query=Query)
+
+
+ARTICLES_QUERY = '''
+    query {
+      articles {
+        headline
+        reporter {
+          firstName
+        }
+      }
+    }
+'''
+
+
+def test_foreign_keys_are_loaded_in_one_query(articles, django_assert_num_queries):
+    schema = get_article_schema()
+
+    with django_assert_num_queries(2):
+        result = schema.execute(ARTICLES_QUERY, context_value=Context())
+    assert not result.errors
+    assert result.data['articles'][4] == {
+        'headline': 'Article 4',
+        'reporter': {'firstName': 'Reporter 1'}
+    }
+
+
+def test_loaders_are_scoped_to_the_context(articles, django_assert_num_queries):
+    schema = get_article_schema()
+
+    context = {}
+    with django_assert_num_queries(2):
+        schema.execute(ARTICLES_QUERY, context_value=context)
+    assert list(context['graphene_loaders']) == [('related_object', Reporter, 'pk')]
+
+    # Without a context, the objects are loaded one by one
+    with django_assert_num_queries(7):
+        result = schema.execute(ARTICLES_QUERY)
+    assert not result.errors
+
+
+@pytest.mark.parametrize('identity_map', [False, True])
+def test_loaders_dont_cache_the_objects_changed_by_mutations(articles, identity_map):
+    class ReporterType(DjangoObjectType):
+        class Meta:
+            model = Reporter
+
+    class ArticleType(DjangoObjectType):
+        class Meta:
+            model = Article
+
+    class Query(graphene.ObjectType):
+        articles = graphene.List(ArticleType)
+
+        def resolve_articles(self, info):
+            return Article.objects.order_by('pk')[:1]
+
+    class RenameReporters(graphene.Mutation):
+        class Arguments:
+            first_name = graphene.String()
+
+        articles = graphene.List(ArticleType)
+
+        def mutate(self, info, first_name):
+            Reporter.objects.update(first_name=first_name)
+            return RenameReporters(articles=Article.objects.order_by('pk')[:1])
+
+    class Mutation(graphene.ObjectType):
+        rename_reporters = RenameReporters.Field()
+
+    query = '{ articles { reporter { firstName } } }'
+    mutation = '''
+        mutation {
+          first: renameReporters(firstName: "First") { articles { reporter { firstName } } }
+          second: renameReporters(firstName: "Second") { articles { reporter { firstName } } }
+        }
+    '''
+    view = GraphQLView.as_view(schema=graphene.Schema(query=Query, mutation=Mutation), batch=True)
+    request = RequestFactory().post('/graphql/batch', json.dumps([
+        {'id': 1, 'query': query},
+        {'id': 2, 'query': mutation},
+        {'id': 3, 'query': query},
+    ]), 'application/json')
+
+    graphene_settings.IDENTITY_MAP = identity_map
+    try:
+        results = json.loads(view(request).content.decode())
+    finally:
+        graphene_settings.IDENTITY_MAP = False
+    assert results[0]['data'] == {'articles': [{'reporter': {'firstName': 'Reporter 0'}}]}
+    assert results[1]['data'] == {
+        'first': {'articles': [{'reporter': {'firstName': 'First'}}]},
+        'second': {'articles': [{'reporter': {'firstName': 'Second'}}]},
+    }
+    assert results[2]['data'] == {'articles': [{'reporter': {'firstName': 'Second'}}]}
+
+
+def test_loaders_leave_custom_resolvers_alone(articles, django_assert_num_queries):
+    schema = get_article_schema(resolve_reporter=lambda root, info: Reporter(first_name='Anonymous'))
+
+    with django_assert_num_queries(1):
+        result = schema.execute(ARTICLES_QUERY, context_value=Context())
+    assert not result.errors
+    assert result.data['articles'][0]['reporter'] == {'firstName': 'Anonymous'}
+
+
+def test_loaders_can_be_disabled(articles, django_assert_num_queries):
+    schema = get_article_schema()
+
+    graphene_settings.BATCH_RELATED_OBJECTS = False
+    try:
+        with django_assert_num_queries(7):
+            result = schema.execute(ARTICLES_QUERY, context_value=Context())
+    finally:
+        graphene_settings.BATCH_RELATED_OBJECTS = True
+    assert not result.errors
+
+
+def test_reverse_one_to_one_relations_are_loaded_in_one_query(django_assert_num_queries):
+    class FilmDetailsType(DjangoObjectType):
+        class Meta:
+            model = FilmDetails
+
+    class FilmType(DjangoObjectType):
+        class Meta:
+            model = Film
+
+    class Query(graphene.ObjectType):
+        films = graphene.List(FilmType)
+
+        def resolve_films(self, info):
+            return Film.objects.order_by('pk')
+
+    for location in ('Paris', None, 'Berlin'):
+        film = Film.objects.create()
+        if location:
+            FilmDetails.objects.create(film=film, location=location)
+
+    schema = graphene.Schema(query=Query)
+    with django_assert_num_queries(2):
+        result = schema.execute('''
+            query {
+              films {
+                details {
+                  location
+                }
+              }
+            }
+        ''', context_value=Context())
+    assert not result.errors
+    assert result.data == {
+        'films': [
+            {'details': {'location': 'Paris'}},
+            {'details': None},
+            {'details': {'location': 'Berlin'}},
+        ]
+    }
+
+
+def get_reporter_schema(article_annotations=None):
+    class CountedConnection(Connection):
+        total_count = graphene.Int()
+
+        class Meta:
+            abstract = True
+
+        def resolve_total_count(self, info):
+            return self.length
+
+    class ArticleType(DjangoObjectType):
+        class Meta:
+            model = Article
+            interfaces = (Node, )
+            connection_class = CountedConnection
+            annotations = article_annotations
+
+    class ReporterType(DjangoObjectType):
+        class Meta:
+            model = Reporter
+            interfaces = (Node, )
+
+    class Query(graphene.ObjectType):
+        reporters = graphene.List(ReporterType)
+
+        def resolve_reporters(self, info):
+            return Reporter.objects.order_by('pk')
+
+    return graphene.Schema(query=Query)
+
+
+REPORTER_ARTICLES_QUERY = '''
+    query ReporterArticles($after: String) {
+      reporters {
+        articles(first: 1, after: $after) {
+          %s
+          pageInfo {
+            hasNextPage
+          }
+          edges {
+            node {
+              headline
+              reporter {
+                firstName
+              }
+            }
+          }
+        }
+      }
+    }
+'''
+
+
+def get_page(reporter):
+    return (
+        [edge['node']['headline'] for edge in reporter['articles']['edges']],
+        reporter['articles']['pageInfo']['hasNextPage'],
+    )
+
+
+def test_nested_connections_are_loaded_in_one_query(articles, django_assert_num_queries, monkeypatch):
+    schema = get_reporter_schema()
+
+    loaded_connections = []
+    create_loader = DjangoConnectionField.create_related_connection_loader.__func__
+
+    def record_create_loader(cls, *args, **kwargs):
+        loaded_connections.append(args)
+        return create_loader(cls, *args, **kwargs)
+
+    monkeypatch.setattr(DjangoConnectionField, 'create_related_connection_loader', classmethod(record_create_loader))
+    with django_assert_num_queries(2):
+        result = schema.execute(REPORTER_ARTICLES_QUERY % '', context_value=Context())
+    assert not result.errors
+    # The loader of the connections of the three reporters is created once
+    assert len(loaded_connections) == 1
+    assert [get_page(reporter) for reporter in result.data['reporters']] == [
+        (['Article 0'], True),
+        (['Article 1'], True),
+        (['Article 2'], True),
+    ]
+    assert result.data['reporters'][1]['articles']['edges'][0]['node']['reporter'] == {
+        'firstName': 'Reporter 1'
+    }
+
+    with django_assert_num_queries(3):
+        result = schema.execute(
+            REPORTER_ARTICLES_QUERY % 'totalCount',
+            variable_values={'after': 'YXJyYXljb25uZWN0aW9uOjA='},
+            context_value=Context()
+        )
+    assert not result.errors
+    assert [get_page(reporter) for reporter in result.data['reporters']] == [
+        (['Article 3'], False),
+        (['Article 4'], False),
+        (['Article 5'], False),
+    ]
+    assert [reporter['articles']['totalCount'] for reporter in result.data['reporters']] == [2, 2, 2]
+
+
+def test_nested_connections_are_loaded_with_their_annotations(articles, django_assert_num_queries):
+    schema = get_reporter_schema({'headline_length': Length('headline')})
+    Article.objects.filter(pk=articles[1].pk).update(headline='Article 10')
+
+    with django_assert_num_queries(3):
+        result = schema.execute('''
+            query {
+              reporters {
+                articles(first: 1) {
+                  totalCount
+                  edges {
+                    node {
+                      headline
+                      headlineLength
+                    }
+                  }
+                }
+              }
+            }
+        ''', context_value=Context())
+    assert not result.errors
+    assert [reporter['articles'] for reporter in result.data['reporters']] == [
+        {'totalCount': 2, 'edges': [{'node': {'headline': 'Article 0', 'headlineLength': 9}}]},
+        {'totalCount': 2, 'edges': [{'node': {'headline': 'Article 10', 'headlineLength': 10}}]},
+        {'totalCount': 2, 'edges': [{'node': {'headline': 'Article 2', 'headlineLength': 9}}]},
+    ]
+
+
+def test_nested_connections_can_be_loaded_one_by_one(articles, django_assert_num_queries):
+    schema = get_reporter_schema()
+
+    graphene_settings.BATCH_RELATED_CONNECTIONS = False
+    try:
+        with django_assert_num_queries(4):
+            result = schema.execute(REPORTER_ARTICLES_QUERY % '', context_value=Context())
+    finally:
+        graphene_settings.BATCH_RELATED_CONNECTIONS = True
+    assert not result.errors
+    assert get_page(result.data['reporters'][2]) == (['Article 2'], True)
+
+
+def test_nodes_are_loaded_in_one_query_per_type(articles, django_assert_num_queries):
+    class ReporterNode(DjangoObjectType):
+        class Meta:
+            model = Reporter
+            interfaces = (Node, )
+
+    class ArticleNode(DjangoObjectType):
+        class Meta:
+            model = Article
+            interfaces = (Node, )
+
+    class Query(graphene.ObjectType):
+        node = DjangoNodeField()
+        article = DjangoNodeField(ArticleNode)
+        nodes = graphene.List(Node, ids=graphene.List(graphene.ID))
+
+        def resolve_nodes(self, info, ids):
+            return [load_node_from_global_id(info, global_id) for global_id in ids]
+
+    schema = graphene.Schema(query=Query, types=[ReporterNode, ArticleNode])
+    ids = [
+        to_global_id('ArticleNode', articles[3].pk),
+        to_global_id('ReporterNode', articles[0].reporter_id),
+        to_global_id('ArticleNode', 100),
+        to_global_id('ArticleNode', articles[1].pk),
+    ]
+    with django_assert_num_queries(2):
+        result = schema.execute('''
+            query Nodes($ids: [ID]) {
+              nodes(ids: $ids) {
+                ... on ArticleNode {
+                  headline
+                }
+                ... on ReporterNode {
+                  firstName
+                }
+              }
+              first: node(id: "%s") {
+                ... on ArticleNode {
+                  headline
+                }
+              }
+              article(id: "%s") {
+                headline
+              }
+            }
+        ''' % (to_global_id('ArticleNode', articles[5].pk), to_global_id('ArticleNode', articles[2].pk)),
+            variable_values={'ids': ids}, context_value=Context())
+    assert not result.errors
+    assert result.data == {
+        'nodes': [
+            {'headline': 'Article 3'},
+            {'firstName': 'Reporter 0'},
+            None,
+            {'headline': 'Article 1'},
+        ],
+        'first': {'headline': 'Article 5'},
+        'article': {'headline': 'Article 2'},
+    }
+
+
+def test_get_node_returns_the_object(articles):
+    class ReporterNode(DjangoObjectType):
+        class Meta:
+            model = Reporter
+            interfaces = (Node, )
+
+    class Query(graphene.ObjectType):
+        reporter_name = graphene.String(id=graphene.ID())
+
+        def resolve_reporter_name(self, info, id):
+            return Node.get_node_from_global_id(info, id, only_type=ReporterNode).first_name
+
+    schema = graphene.Schema(query=Query, types=[ReporterNode])
+    result = schema.execute(
+        '{ reporterName(id: "%s") }' % to_global_id('ReporterNode', articles[0].reporter_id),
+        context_value=Context()
+    )
+    assert not result.errors
+    assert result.data == {'reporterName': 'Reporter 0'}
+    assert ReporterNode.get_node(None, 100) is None
+
+
+def test_identity_map_reuses_the_loaded_instances(articles, django_assert_num_queries):
+    class ReporterNode(DjangoObjectType):
+        class Meta:
+            model = Reporter
+            interfaces = (Node, )
+
+    class ArticleType(DjangoObjectType):
+        class Meta:
+            model = Article
+
+    class Query(graphene.ObjectType):
+        node = Node.Field()
+        reporters = DjangoListField(ReporterNode)
+        articles = graphene.List(ArticleType)
+
+        def resolve_reporters(self, info):
+            return Reporter.objects.order_by('pk')
+
+        def resolve_articles(self, info):
+            return Article.objects.order_by('pk')
+
+    schema = graphene.Schema(query=Query)
+    query = '''
+        query {
+          reporters {
+            firstName
+          }
+          articles {
+            reporter {
+              firstName
+            }
+          }
+          node(id: "%s") {
+            ... on ReporterNode {
+              firstName
+            }
+          }
+        }
+    ''' % to_global_id('ReporterNode', articles[1].reporter_id)
+
+    with django_assert_num_queries(4):
+        result = schema.execute(query, context_value={})
+    assert not result.errors
+
+    context = {}
+    graphene_settings.IDENTITY_MAP = True
+    try:
+        with django_assert_num_queries(2):
+            mapped_result = schema.execute(query, context_value=context)
+    finally:
+        graphene_settings.IDENTITY_MAP = False
+    assert mapped_result.data == result.data
+    assert mapped_result.data['node'] == {'firstName': 'Reporter 1'}
+
+    identity_map = context['graphene_identity_map']
+    assert len(identity_map) == 3
+    reporter = identity_map.get(Reporter, str(articles[1].reporter_id))
+    assert reporter is not None
+    assert identity_map.add(Reporter.objects.get(pk=reporter.pk)) is reporter
+    assert identity_map.get(Reporter, 'invalid') is None
+
+    release_identity_map(context)
+    assert 'graphene_identity_map' not in context
+
+
+def test_many_relations_are_loaded_in_one_query(django_assert_num_queries, monkeypatch):
+    class ReporterType(DjangoObjectType):
+        class Meta:
+            model = Reporter
+            only_fields = ('first_name', 'films')
+
+    class FilmType(DjangoObjectType):
+        class Meta:
+            model = Film
+            only_fields = ('id', 'reporters')
+
+    class Query(graphene.ObjectType):
+        films = graphene.List(FilmType)
+        reporters = graphene.List(ReporterType)
+
+        def resolve_films(self, info):
+            return Film.objects.order_by('pk')
+
+        def resolve_reporters(self, info):
+            return Reporter.objects.order_by('pk')
+
+    reporters = create_reporters(3)
+    films = [Film.objects.create() for i in range(3)]
+    films[0].reporters.add(reporters[0], reporters[1])
+    films[2].reporters.add(reporters[1])
+
+    schema = graphene.Schema(query=Query)
+    query = '''
+        query {
+          films {
+            reporters {
+              firstName
+            }
+          }
+          reporters {
+            films {
+              id
+            }
+          }
+        }
+    '''
+    optimized_models = []
+    optimize = QueryOptimizer.optimize
+
+    def record_optimize(self, queryset, *args, **kwargs):
+        optimized_models.append(queryset.model)
+        return optimize(self, queryset, *args, **kwargs)
+
+    monkeypatch.setattr(QueryOptimizer, 'optimize', record_optimize)
+    with django_assert_num_queries(4):
+        result = schema.execute(query, context_value=Context())
+    assert not result.errors
+    assert [[reporter['firstName'] for reporter in film['reporters']] for film in result.data['films']] == [
+        ['Reporter 0', 'Reporter 1'], [], ['Reporter 1']
+    ]
+    # The queryset of each field is optimized once, not once per parent
+    assert optimized_models.count(Reporter) == optimized_models.count(Film) == 1
+    assert [len(reporter['films']) for reporter in result.data['reporters']] == [1, 2, 0]
+
+    graphene_settings.BATCH_RELATED_LISTS = False
+    try:
+        with django_assert_num_queries(8):
+            result = schema.execute(query, context_value=Context())
+    finally:
+        graphene_settings.BATCH_RELATED_LISTS = True
+    assert not result.errors
+
+
+@pytest.mark.skipif(django.VERSION < (1, 9), reason='The generic relations are only batched from Django 1.9')
+def test_generic_relations_are_loaded_in_one_query_per_content_type(django_assert_num_queries):
+    comment_registry = Registry()
+
+    class ReporterType(DjangoObjectType):
+        class Meta:
+            model = Reporter
+            registry = comment_registry
+            only_fields = ('first_name', )
+
+    class FilmType(DjangoObjectType):
+        class Meta:
+            model = Film
+            registry = comment_registry
+            only_fields = ('genre', 'comments')
+
+    class CommentType(DjangoObjectType):
+        class Meta:
+            model = Comment
+            registry = comment_registry
+            generic_types = {'content_object': lambda: (ReporterType, FilmType)}
+
+    class Query(graphene.ObjectType):
+        comments = graphene.List(CommentType)
+        films = graphene.List(FilmType)
+
+        def resolve_comments(self, info):
+            return Comment.objects.order_by('pk')
+
+        def resolve_films(self, info):
+            return Film.objects.order_by('pk')
+
+    reporters = create_reporters(2)
+    films = [Film.objects.create(genre='do'), Film.objects.create()]
+    for i, content_object in enumerate(reporters + films + [films[0]]):
+        Comment.objects.create(text='Comment {}'.format(i), content_object=content_object)
+
+    schema = graphene.Schema(query=Query)
+    query = '''
+        query {
+          comments {
+            contentObject {
+              __typename
+              ... on ReporterType {
+                firstName
+              }
+              ... on FilmType {
+                genre
+              }
+            }
+          }
+          films {
+            comments {
+              text
+            }
+          }
+        }
+    '''
+    # The content types are cached by their manager
+    schema.execute(query, context_value=Context())
+    with django_assert_num_queries(5):
+        result = schema.execute(query, context_value=Context())
+    assert not result.errors
+    assert [comment['contentObject'] for comment in result.data['comments']] == [
+        {'__typename': 'ReporterType', 'firstName': 'Reporter 0'},
+        {'__typename': 'ReporterType', 'firstName': 'Reporter 1'},
+        {'__typename': 'FilmType', 'genre': 'DO'},
+        {'__typename': 'FilmType', 'genre': 'OT'},
+        {'__typename': 'FilmType', 'genre': 'DO'},
+    ]
+    assert [[comment['text'] for comment in film['comments']] for film in result.data['films']] == [
+        ['Comment 2', 'Comment 4'], ['Comment 3']
+    ]
+
+    graphene_settings.BATCH_RELATED_OBJECTS = False
+    try:
+        with django_assert_num_queries(8):
+            result = schema.execute(query, context_value=Context())
+    finally:
+        graphene_settings.BATCH_RELATED_OBJECTS = True
+    assert not result.errors
+
+
+def test_generic_types_limit_the_union(django_assert_num_queries):
+    comment_registry = Registry()
+
+    class ReporterType(DjangoObjectType):
+        class Meta:
+            model = Reporter
+            registry = comment_registry
+            only_fields = ('first_name', )
+
+    class CommentType(DjangoObjectType):
+        class Meta:
+            model = Comment
+            registry = comment_registry
+            generic_types = {'content_object': lambda: (FilmType, )}
+
+    class FilmType(DjangoObjectType):
+        class Meta:
+            model = Film
+            registry = comment_registry
+            only_fields = ('genre', )
+
+    class CommentWithoutGenericTypes(DjangoObjectType):
+        class Meta:
+            model = Comment
+            registry = Registry()
+
+    class Query(graphene.ObjectType):
+        comments = graphene.List(CommentType)
+        comments_without_generic_types = graphene.List(CommentWithoutGenericTypes)
+
+        def resolve_comments(self, info):
+            return Comment.objects.order_by('pk')
+
+    reporter = Reporter.objects.create(first_name='Reporter', last_name='Doe', email='')
+    Comment.objects.create(text='Reporter comment', content_object=reporter)
+    Comment.objects.create(text='Film comment', content_object=Film.objects.create(genre='do'))
+
+    schema = graphene.Schema(query=Query)
+    assert [member.name for member in schema.get_type('CommentContentObject').types] == ['FilmType']
+    # The GenericForeignKeys of the other types aren't converted
+    assert 'contentObject' not in schema.get_type('CommentWithoutGenericTypes').fields
+    for context in (Context(), None):
+        result = schema.execute('''
+            query {
+              comments {
+                contentObject {
+                  ... on FilmType {
+                    genre
+                  }
+                }
+              }
+            }
+        ''', context_value=context)
+        assert not result.errors
+        assert result.data == {'comments': [{'contentObject': None}, {'contentObject': {'genre': 'DO'}}]}
@@ -0,0 +1,488 @@
+import datetime
+
+import django
+import pytest
+from django.db import connection
+from django.db.models import Count, Max
+from django.test.utils import CaptureQueriesContext
+
+import graphene
+from graphene.relay import Node
+from graphql_relay import to_global_id
+
+from ..compat import MissingType, ValuesIterable
+from ..fields import DjangoConnectionField, DjangoListField
+from ..settings import graphene_settings
+from ..types import DjangoObjectType
+from .data import create_reporters, get_relay_schema
+from .models import Article, Film, FilmDetails, Reporter
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def reporters():
+    return create_reporters(3, articles_per_reporter=2)
+
+
+def test_connection_selects_related_objects(reporters, django_assert_num_queries):
+    schema = get_relay_schema()
+    query = '''
+        query {
+          allArticles {
+            edges {
+              node {
+                headline
+                ...ArticleReporter
+              }
+            }
+          }
+        }
+        fragment ArticleReporter on ArticleType {
+          reporter {
+            firstName
+          }
+        }
+    '''
+    with django_assert_num_queries(1):
+        result = schema.execute(query)
+    assert not result.errors
+    assert len(result.data['allArticles']['edges']) == 6
+    assert result.data['allArticles']['edges'][0]['node'] == {
+        'headline': 'Article 0 0',
+        'reporter': {'firstName': 'Reporter 0'}
+    }
+
+
+def test_connection_prefetches_nested_connections(reporters, django_assert_num_queries):
+    schema = get_relay_schema()
+    query = '''
+        query {
+          allReporters(first: 2) {
+            edges {
+              node {
+                firstName
+                articles(first: 1) {
+                  edges {
+                    node {
+                      headline
+                      reporter {
+                        firstName
+                      }
+                    }
+                  }
+                }
+              }
+            }
+          }
+        }
+    '''
+    with django_assert_num_queries(2):
+        result = schema.execute(query)
+    assert not result.errors
+    assert result.data['allReporters']['edges'][1]['node'] == {
+        'firstName': 'Reporter 1',
+        'articles': {
+            'edges': [{'node': {'headline': 'Article 1 0', 'reporter': {'firstName': 'Reporter 1'}}}]
+        }
+    }
+
+
+def test_connection_loads_pages_of_nested_connections(reporters):
+    schema = get_relay_schema()
+    query = '''
+        query {
+          allReporters(first: 2) {
+            edges {
+              node {
+                articles(first: 1) {
+                  edges {
+                    node {
+                      headline
+                    }
+                  }
+                }
+              }
+            }
+          }
+        }
+    '''
+    with CaptureQueriesContext(connection) as queries:
+        result = schema.execute(query, context_value={})
+    assert not result.errors
+    assert result.data['allReporters']['edges'][1]['node']['articles']['edges'] == [
+        {'node': {'headline': 'Article 1 0'}}
+    ]
+    # Only the first article of each reporter is fetched, instead of prefetching all of them
+    assert len(queries) == 2
+    assert 'ROW_NUMBER() OVER' in queries[1]['sql']
+
+
+def test_list_field_prefetches_many_relations(django_assert_num_queries):
+    class FilmDetailsType(DjangoObjectType):
+        class Meta:
+            model = FilmDetails
+
+    class FilmType(DjangoObjectType):
+        class Meta:
+            model = Film
+
+    class ReporterType(DjangoObjectType):
+        class Meta:
+            model = Reporter
+            only_fields = ('first_name', 'films')
+
+    class Query(graphene.ObjectType):
+        films = DjangoListField(FilmType)
+
+        def resolve_films(self, info):
+            return Film.objects.order_by('pk')
+
+    reporter = Reporter.objects.create(first_name='John', last_name='Doe', email='')
+    for location in ('Paris', 'Berlin'):
+        film = Film.objects.create()
+        film.reporters.add(reporter)
+        FilmDetails.objects.create(film=film, location=location)
+
+    schema = graphene.Schema(query=Query)
+    query = '''
+        query {
+          films {
+            details {
+              location
+            }
+            reporters {
+              firstName
+            }
+          }
+        }
+    '''
+    with django_assert_num_queries(2):
+        result = schema.execute(query)
+    assert not result.errors
+    assert result.data == {
+        'films': [
+            {'details': {'location': 'Paris'}, 'reporters': [{'firstName': 'John'}]},
+            {'details': {'location': 'Berlin'}, 'reporters': [{'firstName': 'John'}]},
+        ]
+    }
+
+
+def test_optimizer_skips_custom_resolvers(reporters, django_assert_num_queries):
+    class ReporterType(DjangoObjectType):
+        class Meta:
+            model = Reporter
+            interfaces = (Node, )
+
+    class ArticleType(DjangoObjectType):
+        class Meta:
+            model = Article
+            interfaces = (Node, )
+
+        def resolve_reporter(self, info):
+            return Reporter(first_name='Anonymous')
+
+    class Query(graphene.ObjectType):
+        all_articles = DjangoConnectionField(ArticleType)
+
+    schema = graphene.Schema(query=Query)
+    query = '''
+        query {
+          allArticles(first: 1) {
+            edges {
+              node {
+                reporter {
+                  firstName
+                }
+              }
+            }
+          }
+        }
+    '''
+    with django_assert_num_queries(1):
+        result = schema.execute(query)
+    assert not result.errors
+    assert result.data['allArticles']['edges'][0]['node']['reporter'] == {'firstName': 'Anonymous'}
+
+
+def test_optimizer_can_be_disabled(reporters, django_assert_num_queries):
+    schema = get_relay_schema()
+    query = '''
+        query {
+          allArticles {
+            edges {
+              node {
+                reporter {
+                  firstName
+                }
+              }
+            }
+          }
+        }
+    '''
+    graphene_settings.OPTIMIZE_QUERIES = False
+    try:
+        with django_assert_num_queries(7):
+            result = schema.execute(query)
+    finally:
+        graphene_settings.OPTIMIZE_QUERIES = True
+    assert not result.errors
+
+
+@pytest.fixture
+def optimize_columns():
+    graphene_settings.OPTIMIZE_COLUMNS = True
+    yield
+    graphene_settings.OPTIMIZE_COLUMNS = False
+
+
+def test_connection_only_fetches_selected_columns(reporters, optimize_columns):
+    # The Reporter model reads reporter_type when instantiated
+    schema = get_relay_schema(reporter_meta={'required_columns': ('reporter_type', )})
+    query = '''
+        query {
+          allArticles(first: 2) {
+            edges {
+              node {
+                headline
+                reporter {
+                  firstName
+                }
+              }
+            }
+          }
+        }
+    '''
+    with CaptureQueriesContext(connection) as queries:
+        result = schema.execute(query)
+    assert not result.errors
+    assert result.data['allArticles']['edges'][1]['node'] == {
+        'headline': 'Article 0 1',
+        'reporter': {'firstName': 'Reporter 0'}
+    }
+    assert len(queries) == 1
+    sql = queries[0]['sql']
+    assert '"tests_article"."headline"' in sql
+    assert '"tests_article"."reporter_id"' in sql
+    assert '"tests_reporter"."first_name"' in sql
+    assert '"tests_reporter"."reporter_type"' in sql
+    assert '"tests_article"."pub_date"' not in sql
+    assert '"tests_reporter"."email"' not in sql
+
+
+def test_prefetched_objects_fetch_their_foreign_key(reporters, optimize_columns):
+    schema = get_relay_schema(reporter_meta={'required_columns': '__all__'})
+    query = '''
+        query {
+          allReporters {
+            edges {
+              node {
+                articles {
+                  edges {
+                    node {
+                      headline
+                    }
+                  }
+                }
+              }
+            }
+          }
+        }
+    '''
+    with CaptureQueriesContext(connection) as queries:
+        result = schema.execute(query)
+    assert not result.errors
+    assert result.data['allReporters']['edges'][2]['node']['articles']['edges'] == [
+        {'node': {'headline': 'Article 2 0'}},
+        {'node': {'headline': 'Article 2 1'}},
+    ]
+    assert len(queries) == 2
+    assert '"tests_reporter"."email"' in queries[0]['sql']
+    assert '"tests_article"."reporter_id"' in queries[1]['sql']
+    assert '"tests_article"."editor_id"' not in queries[1]['sql']
+
+
+@pytest.fixture
+def optimize_values():
+    if ValuesIterable is MissingType:
+        pytest.skip('The rows are only fetched as values from Django 1.9')
+    graphene_settings.OPTIMIZE_VALUES = True
+    yield
+    graphene_settings.OPTIMIZE_VALUES = False
+
+
+def test_connection_fetches_plain_fields_as_values(reporters, optimize_values):
+    schema = get_relay_schema()
+    query = '''
+        query {
+          allArticles(first: 3) {
+            edges {
+              node {
+                __typename
+                id
+                headline
+                pubDate
+                %s
+              }
+            }
+          }
+        }
+    '''
+    with CaptureQueriesContext(connection) as queries:
+        result = schema.execute(query % '')
+    assert not result.errors
+    assert result.data['allArticles']['edges'][2]['node'] == {
+        '__typename': 'ArticleType',
+        'id': to_global_id('ArticleType', Article.objects.get(headline='Article 1 0').pk),
+        'headline': 'Article 1 0',
+        'pubDate': datetime.date.today().isoformat(),
+    }
+    assert len(queries) == 1
+    assert queries[0]['sql'].startswith(
+        'SELECT "tests_article"."id", "tests_article"."headline", "tests_article"."pub_date" FROM'
+    )
+
+    # Relations need instances
+    with CaptureQueriesContext(connection) as queries:
+        result = schema.execute(query % 'reporter { firstName }')
+    assert not result.errors
+    assert result.data['allArticles']['edges'][2]['node']['reporter'] == {'firstName': 'Reporter 1'}
+    assert '"tests_article"."editor_id"' in queries[0]['sql']
+
+
+def test_list_field_fetches_plain_fields_as_values(reporters, optimize_values):
+    class ReporterType(DjangoObjectType):
+        class Meta:
+            model = Reporter
+
+        def resolve_email(self, info):
+            return self.email.upper()
+
+    class Query(graphene.ObjectType):
+        reporters = DjangoListField(ReporterType)
+
+        def resolve_reporters(self, info):
+            return Reporter.objects.order_by('pk')
+
+    schema = graphene.Schema(query=Query)
+    with CaptureQueriesContext(connection) as queries:
+        result = schema.execute('query { reporters { firstName lastName } }')
+    assert not result.errors
+    assert result.data['reporters'][1] == {'firstName': 'Reporter 1', 'lastName': 'Doe'}
+    assert '"tests_reporter"."email"' not in queries[0]['sql']
+
+    # Fields with custom resolvers need instances
+    with CaptureQueriesContext(connection) as queries:
+        result = schema.execute('query { reporters { firstName email } }')
+    assert not result.errors
+    assert '"tests_reporter"."reporter_type"' in queries[0]['sql']
+
+
+def test_list_field_iterates_in_chunks(reporters, django_assert_num_queries):
+    class ArticleType(DjangoObjectType):
+        class Meta:
+            model = Article
+
+    class ReporterType(DjangoObjectType):
+        class Meta:
+            model = Reporter
+
+    class Query(graphene.ObjectType):
+        reporters = DjangoListField(ReporterType, chunk_size=2)
+
+        def resolve_reporters(self, info):
+            return Reporter.objects.order_by('pk')
+
+    schema = graphene.Schema(query=Query)
+    # The articles are prefetched for each chunk of reporters
+    with django_assert_num_queries(3):
+        result = schema.execute('query { reporters { firstName articles { headline } } }')
+    assert not result.errors
+    assert [reporter['firstName'] for reporter in result.data['reporters']] == [
+        'Reporter 0', 'Reporter 1', 'Reporter 2'
+    ]
+    assert result.data['reporters'][2]['articles'] == [{'headline': 'Article 2 0'}, {'headline': 'Article 2 1'}]
+
+
+def get_annotated_schema():
+    return get_relay_schema(reporter_meta={
+        'annotations': {
+            'article_count': Count('articles'),
+            'last_pub_date': Max('articles__pub_date'),
+        },
+    })
+
+
+ANNOTATED_QUERY = '''
+    query {
+      allReporters(first: 3) {
+        edges {
+          node {
+            firstName
+            articleCount
+            %s
+          }
+        }
+      }
+    }
+'''
+
+
+def test_connection_annotates_selected_fields(reporters, django_assert_num_queries):
+    schema = get_annotated_schema()
+    Article.objects.filter(reporter=reporters[1]).delete()
+
+    with CaptureQueriesContext(connection) as queries:
+        result = schema.execute(ANNOTATED_QUERY % 'lastPubDate')
+    assert not result.errors
+    assert [edge['node'] for edge in result.data['allReporters']['edges']] == [
+        {'firstName': 'Reporter 0', 'articleCount': 2, 'lastPubDate': datetime.date.today().isoformat()},
+        {'firstName': 'Reporter 1', 'articleCount': 0, 'lastPubDate': None},
+        {'firstName': 'Reporter 2', 'articleCount': 2, 'lastPubDate': datetime.date.today().isoformat()},
+    ]
+    assert len(queries) == 1
+    assert 'COUNT("tests_article"."id") AS "article_count"' in queries[0]['sql']
+    assert 'MAX("tests_article"."pub_date") AS "last_pub_date"' in queries[0]['sql']
+
+    # Without the optimizer, the rows are annotated one by one
+    graphene_settings.OPTIMIZE_QUERIES = False
+    try:
+        with django_assert_num_queries(4):
+            result = schema.execute(ANNOTATED_QUERY % '')
+    finally:
+        graphene_settings.OPTIMIZE_QUERIES = True
+    assert not result.errors
+    assert result.data['allReporters']['edges'][2]['node']['articleCount'] == 2
+
+
+@pytest.mark.skipif(django.VERSION < (1, 11), reason='Subquery is only available from Django 1.11')
+def test_aggregates_over_different_relations_are_not_multiplied(reporters):
+    for i in range(3):
+        Film.objects.create().reporters.add(reporters[0])
+    schema = get_relay_schema(reporter_meta={
+        'annotations': {
+            'article_count': Count('articles'),
+            'film_count': Count('films'),
+        },
+    })
+
+    with CaptureQueriesContext(connection) as queries:
+        result = schema.execute('query { allReporters(first: 2) { edges { node { articleCount filmCount } } } }')
+    assert not result.errors
+    assert [edge['node'] for edge in result.data['allReporters']['edges']] == [
+        {'articleCount': 2, 'filmCount': 3},
+        {'articleCount': 2, 'filmCount': 0},
+    ]
+    assert len(queries) == 1
+
+
+def test_annotations_are_fetched_with_values(reporters, optimize_values):
+    schema = get_annotated_schema()
+
+    with CaptureQueriesContext(connection) as queries:
+        result = schema.execute(ANNOTATED_QUERY % '')
+    assert not result.errors
+    assert result.data['allReporters']['edges'][0]['node'] == {'firstName': 'Reporter 0', 'articleCount': 2}
+    assert queries[0]['sql'].startswith(
+        'SELECT "tests_reporter"."id", "tests_reporter"."first_name", COUNT("tests_article"."id") AS "article_count"'
+    )
@@ -0,0 +1,145 @@
+import datetime
+
+import pytest
+from django.db import connection
+from django.db.models import F
+from django.test.utils import CaptureQueriesContext
+
+from ..pagination import get_keyset_ordering
+from .data import create_article, get_relay_schema
+from .models import Article, Reporter
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def articles():
+    reporter = Reporter.objects.create(first_name='John', last_name='Doe', email='')
+    headlines = ['B', 'A', 'C', 'A', 'B', 'A']
+    return [
+        create_article(
+            reporter,
+            headline,
+            pub_date=datetime.date(2018, 1, i + 1),
+            pub_date_time=datetime.datetime(2018, 1, i + 1)
+        )
+        for i, headline in enumerate(headlines)
+    ]
+
+
+def get_schema(order_by=None):
+    def resolve_all_articles(root, info, **args):
+        if order_by:
+            return Article.objects.order_by(order_by)
+        return Article.objects.all()
+
+    return get_relay_schema(resolve_all_articles=resolve_all_articles, keyset_pagination=True)
+
+
+PAGE_QUERY = '''
+    query ArticlePage($first: Int, $after: String, $last: Int, $before: String) {
+      allArticles(first: $first, after: $after, last: $last, before: $before) {
+        pageInfo {
+          startCursor
+          endCursor
+          hasNextPage
+          hasPreviousPage
+        }
+        edges {
+          node {
+            headline
+            pubDate
+          }
+        }
+      }
+    }
+'''
+
+
+def get_page(schema, **variables):
+    with CaptureQueriesContext(connection) as queries:
+        result = schema.execute(PAGE_QUERY, variable_values=variables)
+    assert not result.errors
+    assert len(queries) == 1
+    assert 'OFFSET' not in queries[0]['sql']
+    page = result.data['allArticles']
+    return page['pageInfo'], [(edge['node']['headline'], edge['node']['pubDate']) for edge in page['edges']]
+
+
+def test_keyset_ordering():
+    assert get_keyset_ordering(Article.objects.all()) == [
+        ('headline', Article._meta.get_field('headline'), False),
+        ('id', Article._meta.pk, False),
+    ]
+    assert get_keyset_ordering(Article.objects.order_by('-pk')) == [
+        ('pk', Article._meta.pk, True),
+    ]
+    assert get_keyset_ordering(Article.objects.order_by('reporter__first_name'))[0] == (
+        'reporter__first_name', Reporter._meta.get_field('first_name'), False
+    )
+    assert get_keyset_ordering(Article.objects.order_by('?')) is None
+    assert get_keyset_ordering(Article.objects.order_by('reporter')) is None
+    assert get_keyset_ordering(Article.objects.order_by(F('headline').desc())) is None
+    assert get_keyset_ordering(Article.objects.order_by('importance')) is None
+    assert get_keyset_ordering(Article.objects.order_by('importance'), allow_null=True)[0] == (
+        'importance', Article._meta.get_field('importance'), False
+    )
+
+
+def test_keyset_pagination_forward(articles):
+    schema = get_schema()
+
+    page_info, nodes = get_page(schema, first=4)
+    assert nodes == [('A', '2018-01-02'), ('A', '2018-01-04'), ('A', '2018-01-06'), ('B', '2018-01-01')]
+    assert page_info['hasNextPage'] is True
+    assert page_info['hasPreviousPage'] is False
+
+    page_info, nodes = get_page(schema, first=4, after=page_info['endCursor'])
+    assert nodes == [('B', '2018-01-05'), ('C', '2018-01-03')]
+    assert page_info['hasNextPage'] is False
+
+
+def test_keyset_pagination_backward(articles):
+    schema = get_schema('-pub_date')
+
+    page_info, nodes = get_page(schema, last=2)
+    assert nodes == [('A', '2018-01-02'), ('B', '2018-01-01')]
+    assert page_info['hasPreviousPage'] is True
+    assert page_info['hasNextPage'] is False
+
+    page_info, nodes = get_page(schema, last=3, before=page_info['startCursor'])
+    assert nodes == [('B', '2018-01-05'), ('A', '2018-01-04'), ('C', '2018-01-03')]
+    assert page_info['hasPreviousPage'] is True
+
+    page_info, nodes = get_page(schema, first=1, after=page_info['startCursor'])
+    assert nodes == [('A', '2018-01-04')]
+    assert page_info['hasNextPage'] is True
+
+
+def test_keyset_pagination_falls_back_to_offsets(articles):
+    schema = get_schema('?')
+
+    result = schema.execute(PAGE_QUERY, variable_values={'first': 2})
+    assert not result.errors
+    assert len(result.data['allArticles']['edges']) == 2
+    assert result.data['allArticles']['pageInfo']['endCursor'] == 'YXJyYXljb25uZWN0aW9uOjE='
+
+
+def test_keyset_pagination_falls_back_to_offsets_for_nullable_columns(articles):
+    for article, importance in zip(articles, [None, 1, None, 1, None, 2]):
+        article.importance = importance
+        article.save()
+    schema = get_schema('importance')
+
+    headlines = []
+    after = None
+    while True:
+        result = schema.execute(PAGE_QUERY, variable_values={'first': 1, 'after': after})
+        assert not result.errors
+        page = result.data['allArticles']
+        headlines.extend(edge['node']['headline'] for edge in page['edges'])
+        assert page['pageInfo']['endCursor'].startswith('YXJyYXljb25uZWN0aW9u')
+        if not page['pageInfo']['hasNextPage']:
+            break
+        after = page['pageInfo']['endCursor']
+    assert sorted(headlines) == sorted(article.headline for article in articles)
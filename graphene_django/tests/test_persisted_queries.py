@@ -0,0 +1,113 @@
+import json
+
+import pytest
+
+from ..document_cache import get_query_hash
+from ..persisted_queries import (DjangoCachePersistedQueryStore,
+                                 InMemoryPersistedQueryStore,
+                                 ManifestPersistedQueryStore)
+from .test_views import batch_url_string, response_json, url_string
+
+QUERY = '{test}'
+QUERY_HASH = get_query_hash(QUERY)
+
+
+def persisted_query_extensions(query_hash=QUERY_HASH):
+    return {'persistedQuery': {'version': 1, 'sha256Hash': query_hash}}
+
+
+def test_in_memory_store_evicts_old_queries():
+    store = InMemoryPersistedQueryStore(maxsize=1)
+    store.set('a', '{ a: test }')
+    store.set('b', '{ b: test }')
+    assert store.get('a') is None
+    assert store.get('b') == '{ b: test }'
+
+
+def test_django_cache_store():
+    store = DjangoCachePersistedQueryStore()
+    assert store.get(QUERY_HASH) is None
+    store.set(QUERY_HASH, QUERY)
+    assert store.get(QUERY_HASH) == QUERY
+
+
+def test_manifest_store(tmpdir):
+    manifest = tmpdir.join('manifest.json')
+    manifest.write(json.dumps({QUERY_HASH: QUERY}))
+
+    store = ManifestPersistedQueryStore(str(manifest))
+    store.set('unknown', '{ unknown: test }')
+    assert store.get(QUERY_HASH) == QUERY
+    assert store.get('unknown') is None
+
+
+@pytest.mark.urls('graphene_django.tests.urls_persisted_queries')
+def test_unknown_persisted_query_hash(client):
+    response = client.get(url_string(extensions=json.dumps(persisted_query_extensions())))
+
+    assert response.status_code == 400
+    assert response_json(response) == {
+        'errors': [{
+            'message': 'PersistedQueryNotFound',
+            'extensions': {'code': 'PERSISTED_QUERY_NOT_FOUND'},
+        }]
+    }
+
+
+@pytest.mark.urls('graphene_django.tests.urls_persisted_queries')
+def test_registers_and_reuses_persisted_query(client):
+    response = client.post(url_string(), json.dumps({
+        'query': QUERY,
+        'extensions': persisted_query_extensions(),
+    }), 'application/json')
+    assert response.status_code == 200
+    assert response_json(response) == {'data': {'test': 'Hello World'}}
+
+    response = client.get(url_string(extensions=json.dumps(persisted_query_extensions())))
+    assert response.status_code == 200
+    assert response_json(response) == {'data': {'test': 'Hello World'}}
+
+
+@pytest.mark.urls('graphene_django.tests.urls_persisted_queries')
+def test_rejects_persisted_query_with_wrong_hash(client):
+    response = client.post(url_string(), json.dumps({
+        'query': QUERY,
+        'extensions': persisted_query_extensions('not-the-hash'),
+    }), 'application/json')
+
+    assert response.status_code == 400
+    assert response_json(response) == {
+        'errors': [{
+            'message': 'provided sha does not match query',
+            'extensions': {'code': 'PERSISTED_QUERY_HASH_MISMATCH'},
+        }]
+    }
+
+
+@pytest.mark.urls('graphene_django.tests.urls_persisted_queries')
+def test_batch_resolves_persisted_query_by_id(client):
+    client.post(batch_url_string(), json.dumps([{
+        'query': QUERY,
+        'extensions': persisted_query_extensions(),
+    }]), 'application/json')
+
+    response = client.post(batch_url_string(), json.dumps([{'id': QUERY_HASH}]), 'application/json')
+    assert response.status_code == 200
+    assert response_json(response) == [{
+        'id': QUERY_HASH,
+        'data': {'test': 'Hello World'},
+        'status': 200,
+    }]
+
+
+def test_default_store_is_instantiated_once():
+    from ..settings import graphene_settings
+    from ..persisted_queries import get_default_persisted_query_store
+
+    graphene_settings.PERSISTED_QUERY_STORE = InMemoryPersistedQueryStore
+    try:
+        store = get_default_persisted_query_store()
+        assert isinstance(store, InMemoryPersistedQueryStore)
+        assert get_default_persisted_query_store() is store
+    finally:
+        graphene_settings.PERSISTED_QUERY_STORE = None
@@ -9,6 +9,7 @@ from django.db.models import Q
 
 import graphene
 from graphene.relay import Node
+from graphql_relay.connection.arrayconnection import offset_to_cursor
 
 from ..utils import DJANGO_FILTER_INSTALLED
 from ..compat import MissingType, JSONField
@@ -866,6 +867,91 @@ def test_should_query_connectionfields_with_manager():
     assert result.data == expected
 
 
+def test_should_query_connectionfields_with_manager_and_last():
+    Reporter.objects.create(first_name='John', last_name='NotDoe', email='johndoe@example.com', a_choice=1)
+    Reporter.objects.create(first_name='John', last_name='Doe', email='johndoe@example.com', a_choice=1)
+
+    class ReporterType(DjangoObjectType):
+
+        class Meta:
+            model = Reporter
+            interfaces = (Node, )
+
+    class Query(graphene.ObjectType):
+        all_reporters = DjangoConnectionField(ReporterType, on='doe_objects')
+
+        def resolve_all_reporters(self, info, **args):
+            return Reporter.objects.all()
+
+    schema = graphene.Schema(query=Query)
+    query = '''
+        query ReporterLastQuery {
+            allReporters(last: 10) {
+                edges {
+                    node {
+                        lastName
+                    }
+                }
+            }
+        }
+    '''
+
+    result = schema.execute(query)
+    assert not result.errors
+    assert result.data == {'allReporters': {'edges': [{'node': {'lastName': 'Doe'}}]}}
+
+
+def test_should_query_connectionfields_with_a_custom_connection_resolver():
+    Reporter.objects.create(first_name='John', last_name='Doe', email='johndoe@example.com', a_choice=1)
+    Reporter.objects.create(first_name='Jane', last_name='Doe', email='janedoe@example.com', a_choice=1)
+
+    class ReporterType(DjangoObjectType):
+
+        class Meta:
+            model = Reporter
+            interfaces = (Node, )
+
+    class JohnConnectionField(DjangoConnectionField):
+
+        @classmethod
+        def connection_resolver(cls, resolver, connection, default_manager, max_limit,
+                                enforce_first_or_last, root, info, **args):
+            return super(JohnConnectionField, cls).connection_resolver(
+                resolver,
+                connection,
+                default_manager.filter(first_name='John'),
+                max_limit,
+                enforce_first_or_last,
+                root,
+                info,
+                **args
+            )
+
+    class Query(graphene.ObjectType):
+        all_reporters = JohnConnectionField(ReporterType, keyset_pagination=True)
+
+    schema = graphene.Schema(query=Query)
+    query = '''
+        query {
+            allReporters(first: 1) {
+                edges {
+                    cursor
+                    node {
+                        firstName
+                    }
+                }
+            }
+        }
+    '''
+
+    result = schema.execute(query)
+    assert not result.errors
+    edge, = result.data['allReporters']['edges']
+    assert edge['node'] == {'firstName': 'John'}
+    # The keyset cursors aren't offsets
+    assert edge['cursor'] != offset_to_cursor(0)
+
+
 def test_should_query_dataloader_fields():
     from promise import Promise
     from promise.dataloader import DataLoader
@@ -1136,3 +1222,94 @@ def test_proxy_model_fails():
 
     result = schema.execute(query)
     assert result.errors
+
+
+def test_should_not_count_connection_without_selected_count(django_assert_num_queries):
+    class ReporterType(DjangoObjectType):
+
+        class Meta:
+            model = Reporter
+            interfaces = (Node, )
+
+    class Query(graphene.ObjectType):
+        all_reporters = DjangoConnectionField(ReporterType)
+
+    for i in range(3):
+        Reporter.objects.create(first_name='Reporter {}'.format(i), last_name='Doe', email='', a_choice=1)
+
+    schema = graphene.Schema(query=Query)
+    query = '''
+        query ReporterPage($after: String) {
+            allReporters(first: 2, after: $after) {
+                pageInfo {
+                    hasNextPage
+                    endCursor
+                }
+                edges {
+                    node {
+                        firstName
+                    }
+                }
+            }
+        }
+    '''
+
+    with django_assert_num_queries(1):
+        result = schema.execute(query)
+    assert not result.errors
+    page = result.data['allReporters']
+    assert page['pageInfo']['hasNextPage'] is True
+    assert [edge['node']['firstName'] for edge in page['edges']] == ['Reporter 0', 'Reporter 1']
+
+    with django_assert_num_queries(1):
+        result = schema.execute(query, variable_values={'after': page['pageInfo']['endCursor']})
+    assert not result.errors
+    page = result.data['allReporters']
+    assert page['pageInfo']['hasNextPage'] is False
+    assert [edge['node']['firstName'] for edge in page['edges']] == ['Reporter 2']
+
+
+def test_should_count_connection_with_selected_count(django_assert_num_queries):
+    class CountedConnection(graphene.relay.Connection):
+        total_count = graphene.Int()
+
+        class Meta:
+            abstract = True
+
+        def resolve_total_count(self, info):
+            return self.length
+
+    class ReporterType(DjangoObjectType):
+
+        class Meta:
+            model = Reporter
+            interfaces = (Node, )
+            connection_class = CountedConnection
+
+    class Query(graphene.ObjectType):
+        all_reporters = DjangoConnectionField(ReporterType)
+
+    for i in range(3):
+        Reporter.objects.create(first_name='Reporter {}'.format(i), last_name='Doe', email='', a_choice=1)
+
+    schema = graphene.Schema(query=Query)
+    query = '''
+        query {
+            allReporters(first: 1) {
+                totalCount
+                pageInfo {
+                    hasNextPage
+                }
+            }
+        }
+    '''
+
+    with django_assert_num_queries(2):
+        result = schema.execute(query)
+    assert not result.errors
+    assert result.data == {
+        'allReporters': {
+            'totalCount': 3,
+            'pageInfo': {'hasNextPage': True},
+        }
+    }
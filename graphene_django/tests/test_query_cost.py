@@ -0,0 +1,118 @@
+import json
+
+import pytest
+from django.test import RequestFactory
+from graphql import get_default_backend
+
+import graphene
+from graphene.relay import Node
+
+from ..fields import DjangoConnectionField
+from ..query_cost import QueryCostError, get_query_cost, validate_query_cost
+from ..types import DjangoObjectType
+from ..views import GraphQLView
+from .models import Article as ArticleModel
+from .models import Reporter as ReporterModel
+
+
+class ArticleType(DjangoObjectType):
+
+    class Meta:
+        model = ArticleModel
+        interfaces = (Node, )
+        only_fields = ('headline', )
+        skip_registry = True
+
+
+class ReporterType(DjangoObjectType):
+
+    class Meta:
+        model = ReporterModel
+        interfaces = (Node, )
+        only_fields = ('first_name', )
+        skip_registry = True
+
+    articles = DjangoConnectionField(ArticleType, max_limit=50)
+
+
+class Query(graphene.ObjectType):
+    all_reporters = DjangoConnectionField(ReporterType)
+
+
+schema = graphene.Schema(query=Query)
+
+QUERY = '''
+    query Reporters($articles: Int) {
+      allReporters(first: 10) {
+        edges {
+          node {
+            firstName
+            ...ReporterArticles
+          }
+        }
+      }
+    }
+
+    fragment ReporterArticles on ReporterType {
+      articles(first: $articles) {
+        edges {
+          node {
+            headline
+          }
+        }
+      }
+    }
+'''
+
+
+def get_document(query):
+    return get_default_backend().document_from_string(schema, query)
+
+
+def test_multiplies_nested_connections():
+    document = get_document(QUERY)
+
+    # allReporters, then 10 times edges, node and articles, then 10 * 5 times edges and node
+    assert get_query_cost(document, variables={'articles': 5}) == (1 + 10 * 3 + 50 * 2, 7)
+    # Without the variable, the max_limit of the articles connection is used
+    assert get_query_cost(document, variables={}) == (1 + 10 * 3 + 500 * 2, 7)
+
+
+def test_uses_the_max_limit_without_pagination():
+    document = get_document('{ allReporters { edges { node { articles { edges { node { headline } } } } } } }')
+
+    # The allReporters connection falls back to RELAY_CONNECTION_MAX_LIMIT
+    assert get_query_cost(document) == (1 + 100 * 3 + 5000 * 2, 7)
+
+
+def test_uses_weights():
+    document = get_document('{ allReporters(first: 2) { edges { node { firstName } } } }')
+
+    assert get_query_cost(document, weights={'ReporterType.firstName': 5}) == (1 + 2 * 2 + 2 * 5, 4)
+
+
+def test_rejects_expensive_and_deep_queries():
+    document = get_document(QUERY)
+
+    with pytest.raises(QueryCostError) as error:
+        validate_query_cost(document, variables={'articles': 50}, max_cost=100)
+    assert str(error.value) == 'The query has a cost of 1031, which exceeds the maximum cost of 100.'
+
+    with pytest.raises(QueryCostError):
+        validate_query_cost(document, max_depth=5)
+
+    validate_query_cost(document, variables={'articles': 1}, max_cost=100, max_depth=7)
+
+
+def test_view_rejects_expensive_queries():
+    view = GraphQLView.as_view(schema=schema, max_query_cost=10)
+    request = RequestFactory().post('/graphql', json.dumps({
+        'query': QUERY,
+        'variables': {'articles': 10},
+    }), 'application/json')
+
+    response = view(request)
+    assert response.status_code == 400
+    assert json.loads(response.content.decode()) == {
+        'errors': [{'message': 'The query has a cost of 231, which exceeds the maximum cost of 10.'}]
+    }
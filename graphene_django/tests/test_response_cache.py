@@ -0,0 +1,213 @@
+import json
+
+import pytest
+from django.core.cache import cache
+from django.db.models import Count
+from django.test import RequestFactory
+from graphql import get_default_backend
+from graphql.execution import ExecutionResult
+
+import graphene
+from graphene.relay import Node
+from graphql_relay import to_global_id
+
+from ..fields import DjangoConnectionField
+from ..registry import Registry
+from ..response_cache import ResponseCache
+from ..types import DjangoObjectType
+from ..views import GraphQLView
+from .data import create_article
+from .models import Article, Reporter
+
+pytestmark = pytest.mark.django_db
+
+
+class ReporterType(DjangoObjectType):
+
+    class Meta:
+        model = Reporter
+        only_fields = ('first_name', )
+
+
+class Query(graphene.ObjectType):
+    reporters = graphene.List(ReporterType)
+    resolved = 0
+
+    def resolve_reporters(self, info):
+        Query.resolved += 1
+        return Reporter.objects.order_by('first_name')
+
+
+schema = graphene.Schema(query=Query)
+
+
+def execute(view, query, variables=None):
+    request = RequestFactory().post('/graphql', json.dumps({
+        'query': query,
+        'variables': variables,
+    }), 'application/json')
+    response = view(request)
+    return json.loads(response.content.decode())
+
+
+def schema_document(query):
+    return get_default_backend().document_from_string(schema, query)
+
+
+def failed_result():
+    return ExecutionResult(data={'reporters': None}, errors=[Exception('Failed')])
+
+
+@pytest.fixture
+def view():
+    cache.clear()
+    Query.resolved = 0
+    return GraphQLView.as_view(schema=schema, response_cache=ResponseCache(timeout=60))
+
+
+def test_caches_query_responses(view):
+    Reporter.objects.create(first_name='John', last_name='Doe', email='john@example.com', a_choice=1)
+    query = '{ reporters { firstName } }'
+
+    assert execute(view, query) == {'data': {'reporters': [{'firstName': 'John'}]}}
+    assert execute(view, query) == {'data': {'reporters': [{'firstName': 'John'}]}}
+    assert Query.resolved == 1
+
+
+def test_invalidates_on_model_changes(view):
+    reporter = Reporter.objects.create(first_name='John', last_name='Doe', email='john@example.com', a_choice=1)
+    query = '{ reporters { firstName } }'
+    execute(view, query)
+
+    reporter.first_name = 'Jane'
+    reporter.save()
+    assert execute(view, query) == {'data': {'reporters': [{'firstName': 'Jane'}]}}
+
+    reporter.delete()
+    assert execute(view, query) == {'data': {'reporters': []}}
+    assert Query.resolved == 3
+
+
+def test_does_not_cache_errors(view):
+    execute(view, '{ reporters { firstName } unknown }')
+    assert Query.resolved == 0
+
+    response_cache = ResponseCache()
+    request = RequestFactory().get('/graphql')
+    document = schema_document('{ reporters { firstName } }')
+
+    result = response_cache.get_or_execute(request, document, None, None, failed_result)
+    assert result.errors
+    assert response_cache.cache.get(response_cache.get_key(request, document, None, None)) is None
+
+
+def test_waits_for_the_request_holding_the_lock(view):
+    response_cache = ResponseCache(lock_timeout=0.2, lock_poll_interval=0.01)
+    request = RequestFactory().get('/graphql')
+    document = schema_document('{ reporters { firstName } }')
+    key = response_cache.get_key(request, document, None, None)
+    response_cache.cache.add(key + ':lock', 1)
+
+    # The lock is never released, so the request executes on its own after waiting
+    result = response_cache.get_or_execute(request, document, None, None, lambda: document.execute())
+    assert result.data == {'reporters': []}
+    assert Query.resolved == 1
+
+
+def test_varies_on_user(view):
+    response_cache = ResponseCache(vary_on=lambda request: request.GET.get('tenant'))
+    document = schema_document('{ reporters { firstName } }')
+    factory = RequestFactory()
+
+    assert response_cache.get_key(factory.get('/graphql', {'tenant': 'a'}), document, None, None) != \
+        response_cache.get_key(factory.get('/graphql', {'tenant': 'b'}), document, None, None)
+
+
+def test_invalidates_types_selected_through_interfaces():
+    class ReporterNode(DjangoObjectType):
+
+        class Meta:
+            model = Reporter
+            interfaces = (Node, )
+            only_fields = ('first_name', )
+
+    class NodeQuery(graphene.ObjectType):
+        node = Node.Field()
+
+    cache.clear()
+    node_schema = graphene.Schema(query=NodeQuery, types=[ReporterNode])
+    view = GraphQLView.as_view(schema=node_schema, response_cache=ResponseCache(timeout=60))
+    reporter = Reporter.objects.create(first_name='John', last_name='Doe', email='john@example.com', a_choice=1)
+    query = '{ node(id: "%s") { ... on ReporterNode { firstName } } }' % to_global_id('ReporterNode', reporter.pk)
+    assert execute(view, query) == {'data': {'node': {'firstName': 'John'}}}
+
+    reporter.first_name = 'Jane'
+    reporter.save()
+    assert execute(view, query) == {'data': {'node': {'firstName': 'Jane'}}}
+
+
+def test_keys_include_the_schema(view):
+    class OtherReporterType(DjangoObjectType):
+
+        class Meta:
+            model = Reporter
+            registry = Registry()
+            only_fields = ('first_name', )
+
+    class OtherQuery(graphene.ObjectType):
+        reporters = graphene.List(OtherReporterType)
+
+        def resolve_reporters(self, info):
+            return [Reporter(first_name='Other')]
+
+    other_view = GraphQLView.as_view(schema=graphene.Schema(query=OtherQuery), response_cache=ResponseCache())
+    query = '{ reporters { firstName } }'
+    assert execute(view, query) == {'data': {'reporters': []}}
+    assert execute(other_view, query) == {'data': {'reporters': [{'firstName': 'Other'}]}}
+
+
+def test_invalidates_the_models_joined_by_annotations():
+    class AnnotatedReporterType(DjangoObjectType):
+
+        class Meta:
+            model = Reporter
+            only_fields = ('first_name', )
+            annotations = {'article_count': Count('articles')}
+
+    class AnnotatedQuery(graphene.ObjectType):
+        reporters = graphene.List(AnnotatedReporterType)
+
+        def resolve_reporters(self, info):
+            return Reporter.objects.all()
+
+    cache.clear()
+    annotated_schema = graphene.Schema(query=AnnotatedQuery)
+    view = GraphQLView.as_view(schema=annotated_schema, response_cache=ResponseCache(timeout=60))
+    reporter = Reporter.objects.create(first_name='John', last_name='Doe', email='john@example.com', a_choice=1)
+    query = '{ reporters { articleCount } }'
+    assert execute(view, query) == {'data': {'reporters': [{'articleCount': 0}]}}
+
+    create_article(reporter, 'First')
+    assert execute(view, query) == {'data': {'reporters': [{'articleCount': 1}]}}
+
+
+def test_invalidates_the_models_of_the_connection_aggregates():
+    class ArticleNode(DjangoObjectType):
+
+        class Meta:
+            model = Article
+            interfaces = (Node, )
+            aggregate_fields = ('importance', )
+
+    class AggregatesQuery(graphene.ObjectType):
+        all_articles = DjangoConnectionField(ArticleNode)
+
+    cache.clear()
+    aggregates_schema = graphene.Schema(query=AggregatesQuery)
+    view = GraphQLView.as_view(schema=aggregates_schema, response_cache=ResponseCache(timeout=60))
+    reporter = Reporter.objects.create(first_name='John', last_name='Doe', email='john@example.com', a_choice=1)
+    query = '{ allArticles { aggregates { count } } }'
+    assert execute(view, query) == {'data': {'allArticles': {'aggregates': {'count': 0}}}}
+
+    create_article(reporter, 'First')
+    assert execute(view, query) == {'data': {'allArticles': {'aggregates': {'count': 1}}}}
@@ -0,0 +1,66 @@
+import json
+
+import pytest
+
+from ..timing import RequestTiming
+from .test_views import response_json, url_string
+from .urls_timing import timings
+
+
+def test_request_timing_adds_up_phases():
+    timing = RequestTiming()
+    with timing.measure('execute'):
+        pass
+    with timing.measure('execute'):
+        pass
+    with timing.measure('encode'):
+        pass
+    timing.operation_names.extend(['first', None, 'second'])
+    timing.finish()
+
+    assert list(timing.durations) == ['execute', 'encode']
+    assert timing.operation_name == 'first,second'
+    assert timing.total >= sum(timing.durations.values())
+    header = timing.get_server_timing_header()
+    assert header.startswith('execute;dur=')
+    assert ', encode;dur=' in header
+    assert ', total;dur=' in header
+
+
+def test_view_does_not_time_requests_by_default(client):
+    response = client.get(url_string(query='{test}'))
+    assert response.status_code == 200
+    assert not response.has_header('Server-Timing')
+
+
+@pytest.mark.urls('graphene_django.tests.urls_timing')
+def test_view_sets_server_timing_header(client):
+    del timings[:]
+    response = client.get(url_string(query='query helloQuery { test }'))
+
+    assert response.status_code == 200
+    assert response_json(response) == {'data': {'test': 'Hello World'}}
+    phases = [metric.split(';')[0] for metric in response['Server-Timing'].split(', ')]
+    assert phases == ['parse_body', 'document', 'execute', 'encode', 'total']
+
+    timing, = timings
+    assert timing.operation_name == 'helloQuery'
+    assert timing.end is not None
+
+
+@pytest.mark.urls('graphene_django.tests.urls_timing')
+def test_view_times_errors_and_batches(client):
+    del timings[:]
+    response = client.post(url_string('/graphql/batch'), json.dumps([
+        {'id': 1, 'query': 'query first { test }'},
+        {'id': 2, 'query': '{ thrower }'},
+    ]), 'application/json')
+
+    assert response.status_code == 200
+    assert 'format_errors;dur=' in response['Server-Timing']
+    timing, = timings
+    assert timing.operation_name == 'first'
+
+    response = client.put(url_string(query='{test}'))
+    assert response.status_code == 405
+    assert response['Server-Timing'].startswith('total;dur=')
@@ -1,6 +1,13 @@
 import json
+import threading
+import time
 
+import graphene
 import pytest
+from django.db import connections
+from django.test import RequestFactory
+
+from ..views import GraphQLView
 
 try:
     from urllib import urlencode
@@ -559,3 +566,127 @@ def test_passes_request_into_context_request(client):
             'request': 'testing'
         }
     }
+
+
+def test_reuses_cached_documents(client):
+    from ..document_cache import get_default_document_cache
+    document_cache = get_default_document_cache()
+    document_cache.clear()
+
+    for _ in range(2):
+        response = client.get(url_string(query='{test}'))
+        assert response.status_code == 200
+        assert response_json(response) == {
+            'data': {'test': "Hello World"}
+        }
+
+    assert document_cache.misses == 1
+    assert document_cache.hits == 1
+
+
+@pytest.mark.urls('graphene_django.tests.urls_parallel_batch')
+def test_batch_executes_operations_in_parallel(client):
+    response = client.post(batch_url_string(), json.dumps([
+        dict(id=i, query='query helloWho($who: String){ test(who: $who) }', variables={'who': str(i)})
+        for i in range(10)
+    ] + [dict(id=10, query='{ unknown }')]), 'application/json')
+
+    assert response.status_code == 400
+    results = response_json(response)
+    assert [result['id'] for result in results] == list(range(11))
+    assert results[3] == {
+        'id': 3,
+        'data': {'test': 'Hello 3'},
+        'status': 200,
+    }
+    assert results[10]['status'] == 400
+
+
+class ThreadQuery(graphene.ObjectType):
+    thread = graphene.String()
+    concurrent = graphene.Boolean()
+    arrived = []
+
+    def resolve_thread(self, info):
+        return threading.current_thread().name
+
+    def resolve_concurrent(self, info):
+        # Only returns True when another operation runs at the same time
+        ThreadQuery.arrived.append(1)
+        deadline = time.time() + 0.5
+        while len(ThreadQuery.arrived) < 2 and time.time() < deadline:
+            time.sleep(0.01)
+        return len(ThreadQuery.arrived) >= 2
+
+
+class ThreadMutation(graphene.ObjectType):
+    thread = graphene.String()
+
+    def resolve_thread(self, info):
+        return threading.current_thread().name
+
+
+thread_schema = graphene.Schema(query=ThreadQuery, mutation=ThreadMutation)
+
+
+def execute_thread_batch(operations):
+    ThreadQuery.arrived = []
+    view = GraphQLView.as_view(schema=thread_schema, batch=True, batch_max_workers=2)
+    request = RequestFactory().post('/graphql/batch', json.dumps([
+        dict(id=i, query=query) for i, query in enumerate(operations)
+    ]), 'application/json')
+    return [result['data'] for result in response_json(view(request))]
+
+
+def test_batch_executes_queries_in_parallel(monkeypatch):
+    closed = []
+    connection_class = type(connections['default'])
+    close = connection_class.close
+
+    def record_close(self):
+        closed.append(threading.current_thread().name)
+        close(self)
+
+    monkeypatch.setattr(connection_class, 'close', record_close)
+    results = execute_thread_batch(['{ concurrent thread }', '{ concurrent thread }'])
+    assert results[0]['concurrent'] and results[1]['concurrent']
+    threads = {results[0]['thread'], results[1]['thread']}
+    assert threading.current_thread().name not in threads
+    # The connections of the worker threads are closed
+    assert threads <= set(closed)
+
+
+def test_batch_executes_mutations_in_order():
+    results = execute_thread_batch(['mutation { thread }', '{ concurrent thread }', '{ concurrent }'])
+    assert results[0]['thread'] == results[1]['thread'] == threading.current_thread().name
+    assert results[1]['concurrent'] is False
+
+
+@pytest.mark.django_db
+def test_batch_executes_in_the_transaction_of_the_request():
+    # Like with ATOMIC_REQUESTS, the operations run in the open transaction
+    results = execute_thread_batch(['{ thread }', '{ thread }'])
+    assert results[0]['thread'] == results[1]['thread'] == threading.current_thread().name
+
+
+@pytest.mark.urls('graphene_django.tests.urls_streaming')
+def test_streams_responses(client):
+    response = client.get(url_string(query='{test, other: test(who: "Dolly")}'))
+
+    assert response.status_code == 200
+    assert response.streaming
+    assert b''.join(response.streaming_content).decode() == (
+        '{"data":{"test":"Hello World","other":"Hello Dolly"}}'
+    )
+
+
+@pytest.mark.urls('graphene_django.tests.urls_streaming')
+def test_batch_streams_responses(client):
+    response = client.post(batch_url_string(), jl(id=1, query='{test}'), 'application/json')
+
+    assert response.status_code == 200
+    assert json.loads(b''.join(response.streaming_content).decode()) == [{
+        'id': 1,
+        'data': {'test': "Hello World"},
+        'status': 200,
+    }]
@@ -0,0 +1,21 @@
+from django.conf.urls import url
+
+from ..views import GraphQLView
+from .schema_view import schema
+
+
+class CachedGraphQLView(GraphQLView):
+    schema = schema
+    http_cache = True
+    cache_max_age = 30
+    cache_max_age_by_operation = {'uncached': 0}
+
+
+class TypeCachedGraphQLView(CachedGraphQLView):
+    cache_max_age_by_type = {'QueryRoot': 20, 'String': 10}
+
+
+urlpatterns = [
+    url(r'^graphql/types', TypeCachedGraphQLView.as_view()),
+    url(r'^graphql', CachedGraphQLView.as_view()),
+]
@@ -0,0 +1,8 @@
+from django.conf.urls import url
+
+from ..views import GraphQLView
+from .schema_view import schema
+
+urlpatterns = [
+    url(r'^graphql/batch', GraphQLView.as_view(schema=schema, batch=True, batch_max_workers=4)),
+]
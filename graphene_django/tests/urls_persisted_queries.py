@@ -0,0 +1,12 @@
+from django.conf.urls import url
+
+from ..persisted_queries import InMemoryPersistedQueryStore
+from ..views import GraphQLView
+from .schema_view import schema
+
+urlpatterns = [
+    url(r'^graphql/batch', GraphQLView.as_view(
+        schema=schema, batch=True, persisted_query_store=InMemoryPersistedQueryStore())),
+    url(r'^graphql', GraphQLView.as_view(
+        schema=schema, persisted_query_store=InMemoryPersistedQueryStore())),
+]
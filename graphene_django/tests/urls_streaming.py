@@ -0,0 +1,9 @@
+from django.conf.urls import url
+
+from ..views import GraphQLView
+from .schema_view import schema
+
+urlpatterns = [
+    url(r'^graphql/batch', GraphQLView.as_view(schema=schema, batch=True, streaming=True)),
+    url(r'^graphql', GraphQLView.as_view(schema=schema, streaming=True)),
+]
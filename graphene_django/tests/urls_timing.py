@@ -0,0 +1,22 @@
+from django.conf.urls import url
+
+from ..views import GraphQLView
+from .schema_view import schema
+
+timings = []
+
+
+def record_timing(request, timing):
+    timings.append(timing)
+
+
+class TimedGraphQLView(GraphQLView):
+    schema = schema
+    server_timing = True
+    timing_hook = staticmethod(record_timing)
+
+
+urlpatterns = [
+    url(r'^graphql/batch', TimedGraphQLView.as_view(batch=True)),
+    url(r'^graphql', TimedGraphQLView.as_view()),
+]
@@ -0,0 +1,52 @@
+from collections import OrderedDict
+from contextlib import contextmanager
+from threading import Lock
+from timeit import default_timer
+
+
+class RequestTiming(object):
+    """
+    Collects the time spent (in milliseconds) in each phase of a request:
+    parse_body, document, execute, format_errors and encode.
+    Phases happening more than once, like in batch requests, add up.
+    """
+
+    def __init__(self):
+        self.start = default_timer()
+        self.end = None
+        self.durations = OrderedDict()
+        self.operation_names = []
+        self._lock = Lock()
+
+    @property
+    def operation_name(self):
+        return ','.join(name for name in self.operation_names if name) or None
+
+    @property
+    def total(self):
+        return ((self.end or default_timer()) - self.start) * 1000
+
+    @contextmanager
+    def measure(self, phase):
+        start = default_timer()
+        try:
+            yield
+        finally:
+            duration = (default_timer() - start) * 1000
+            # Batch operations may be executed by concurrent threads
+            with self._lock:
+                self.durations[phase] = self.durations.get(phase, 0) + duration
+
+    def finish(self):
+        self.end = default_timer()
+
+    def as_dict(self):
+        return {
+            'operation_name': self.operation_name,
+            'durations': dict(self.durations),
+            'total': self.total,
+        }
+
+    def get_server_timing_header(self):
+        durations = list(self.durations.items()) + [('total', self.total)]
+        return ', '.join('{};dur={:.3f}'.format(phase, duration) for phase, duration in durations)
@@ -1,13 +1,21 @@
 from collections import OrderedDict
+from copy import copy
+from functools import partial
 
+from django.core.exceptions import ValidationError
 from django.utils.functional import SimpleLazyObject
 from graphene import Field
 from graphene.relay import Connection, Node
 from graphene.types.objecttype import ObjectType, ObjectTypeOptions
 from graphene.types.utils import yank_fields_from_attrs
+from promise import Promise
 
-from .converter import convert_django_field_with_choices
+from .aggregates import construct_aggregates_type, get_aggregate_columns, resolve_aggregates
+from .converter import convert_django_field, convert_django_field_with_choices
+from .loaders import NodeLoader, get_identity_map, get_loader
+from .optimization import ModelValues
 from .registry import Registry, get_global_registry
+from .settings import graphene_settings
 from .utils import (DJANGO_FILTER_INSTALLED, get_model_fields,
                     is_valid_django_model)
 
@@ -33,19 +41,54 @@ def construct_fields(model, registry, only_fields, exclude_fields):
     return fields
 
 
+def resolve_annotation(name, expression, root, info, **args):
+    if isinstance(root, dict):
+        return root.get(name)
+    if not hasattr(root, name):
+        # Rows not fetched by an optimized queryset are annotated one by one
+        value = type(root)._base_manager.filter(pk=root.pk).annotate(
+            **{name: expression}
+        ).values_list(name, flat=True).first()
+        setattr(root, name, value)
+    return getattr(root, name)
+
+
+def construct_annotation_fields(model, annotations, registry):
+    fields = OrderedDict()
+    for name, expression in annotations.items():
+        assert name not in dict(get_model_fields(model)), (
+            'The annotation {} of {} clashes with a field of the model.'
+        ).format(name, model.__name__)
+
+        query = model._base_manager.annotate(**{name: expression}).query
+        output_field = copy(query.annotations[name].output_field)
+        # Aggregates over no rows, like Max, return null
+        output_field.null = True
+        field = convert_django_field(output_field, registry).mount_as(Field)
+        field.resolver = partial(resolve_annotation, name, expression)
+        fields[name] = field
+    return fields
+
+
 class DjangoObjectTypeOptions(ObjectTypeOptions):
     model = None  # type: Model
     registry = None  # type: Registry
     connection = None  # type: Type[Connection]
 
     filter_fields = ()
+    required_columns = ()
+    annotations = None
+    aggregate_fields = ()
+    generic_types = None
 
 
 class DjangoObjectType(ObjectType):
     @classmethod
     def __init_subclass_with_meta__(cls, model=None, registry=None, skip_registry=False,
                                     only_fields=(), exclude_fields=(), filter_fields=None, connection=None,
-                                    connection_class=None, use_connection=None, interfaces=(), _meta=None, **options):
+                                    connection_class=None, use_connection=None, interfaces=(), required_columns=(),
+                                    annotations=None, aggregate_fields=(), generic_types=None, _meta=None,
+                                    **options):
         assert is_valid_django_model(model), (
             'You need to pass a valid Django Model in {}.Meta, received "{}".'
         ).format(cls.__name__, model)
@@ -65,17 +108,41 @@ class DjangoObjectType(ObjectType):
             construct_fields(model, registry, only_fields, exclude_fields),
             _as=Field,
         )
+        if annotations:
+            django_fields.update(construct_annotation_fields(model, annotations, registry))
+        if generic_types:
+            # The contenttypes models can only be imported when the app is installed
+            from .generic_relations import construct_generic_fields
+            generic_fields = construct_generic_fields(model, generic_types, registry)
+            django_fields.update(
+                (name, field) for name, field in generic_fields.items()
+                if not (only_fields and name not in only_fields) and name not in exclude_fields
+            )
 
         if use_connection is None and interfaces:
             use_connection = any((issubclass(interface, Node) for interface in interfaces))
 
+        if aggregate_fields:
+            assert use_connection and not connection, (
+                'The aggregate_fields of {} need the connection created by DjangoObjectType.'
+            ).format(cls.__name__)
+            aggregate_fields = get_aggregate_columns(model, aggregate_fields)
+
         if use_connection and not connection:
             # We create the connection automatically
             if not connection_class:
                 connection_class = Connection
 
-            connection = connection_class.create_type(
-                '{}Connection'.format(cls.__name__), node=cls)
+            connection_attrs = {'Meta': type('Meta', (), {'node': cls})}
+            if aggregate_fields:
+                aggregates_type = construct_aggregates_type(
+                    '{}Aggregates'.format(cls.__name__), model, aggregate_fields, registry)
+                connection_attrs['aggregates'] = Field(
+                    aggregates_type,
+                    description='Aggregates computed over all the rows of the connection.',
+                    resolver=partial(resolve_aggregates, aggregates_type)
+                )
+            connection = type('{}Connection'.format(cls.__name__), (connection_class, ), connection_attrs)
 
         if connection is not None:
             assert issubclass(connection, Connection), (
@@ -90,6 +157,10 @@ class DjangoObjectType(ObjectType):
         _meta.filter_fields = filter_fields
         _meta.fields = django_fields
         _meta.connection = connection
+        _meta.required_columns = required_columns
+        _meta.annotations = annotations
+        _meta.aggregate_fields = aggregate_fields
+        _meta.generic_types = generic_types
 
         super(DjangoObjectType, cls).__init_subclass_with_meta__(_meta=_meta, interfaces=interfaces, **options)
 
@@ -106,6 +177,8 @@ class DjangoObjectType(ObjectType):
             root = root._wrapped
         if isinstance(root, cls):
             return True
+        if isinstance(root, ModelValues):
+            return root.model._meta.concrete_model == cls._meta.model
         if not is_valid_django_model(type(root)):
             raise Exception((
                 'Received incompatible instance "{}".'
@@ -116,7 +189,44 @@ class DjangoObjectType(ObjectType):
 
     @classmethod
     def get_node(cls, info, id):
+        model = cls._meta.model
+        identity_map = get_identity_map(info.context) if info is not None else None
+        instance = identity_map.get(model, id) if identity_map is not None else None
+        if instance is not None:
+            return instance
         try:
-            return cls._meta.model.objects.get(pk=id)
-        except cls._meta.model.DoesNotExist:
+            instance = model.objects.get(pk=id)
+        except model.DoesNotExist:
             return None
+        return identity_map.add(instance) if identity_map is not None else instance
+
+    @classmethod
+    def load_node(cls, info, id):
+        """
+        Returns a promise of the object, loaded along with the other objects
+        of the type requested in the same execution tick.
+        """
+        # Overridden get_node methods are left alone
+        if cls.get_node.__func__ is not DjangoObjectType.get_node.__func__:
+            return Promise.resolve(cls.get_node(info, id))
+
+        loader = None
+        if graphene_settings.BATCH_NODE_LOOKUPS:
+            model = cls._meta.model
+            loader = get_loader(
+                info,
+                ('node', model),
+                NodeLoader,
+                model.objects.all(),
+                identity_map=get_identity_map(info.context)
+            )
+        if loader is None:
+            return Promise.resolve(cls.get_node(info, id))
+
+        try:
+            pk = cls._meta.model._meta.pk.to_python(id)
+        except ValidationError:
+            return Promise.resolve(None)
+        if pk is None:
+            return Promise.resolve(None)
+        return loader.load(pk)
@@ -1,5 +1,6 @@
 import inspect
 
+from django.apps import apps
 from django.db import models
 from django.db.models.manager import Manager
 
@@ -39,6 +40,21 @@ def maybe_queryset(value):
     return value
 
 
+def get_generic_fields(model):
+    # Django < 1.10 names them virtual fields
+    private_fields = getattr(model._meta, 'private_fields', None) or getattr(model._meta, 'virtual_fields', ())
+    # The contenttypes models can only be imported when the app is installed
+    if not private_fields or not apps.is_installed('django.contrib.contenttypes'):
+        return []
+
+    from .generic_relations import GENERIC_FIELDS
+    return [
+        (field.name, field)
+        for field in private_fields
+        if isinstance(field, GENERIC_FIELDS)
+    ]
+
+
 def get_model_fields(model):
     local_fields = [
         (field.name, field)
@@ -51,7 +67,7 @@ def get_model_fields(model):
     local_field_names = [field[0] for field in local_fields]
     reverse_fields = get_reverse_fields(model, local_field_names)
 
-    all_fields = local_fields + list(reverse_fields)
+    all_fields = local_fields + list(reverse_fields) + get_generic_fields(model)
 
     return all_fields
 
@@ -1,9 +1,14 @@
 import inspect
 import json
 import re
+from contextlib import contextmanager
+from functools import partial
+from multiprocessing.pool import ThreadPool
+from threading import Lock
 
 import six
-from django.http import HttpResponse, HttpResponseNotAllowed
+from django.db import connections
+from django.http import HttpResponse, HttpResponseNotAllowed, StreamingHttpResponse
 from django.http.response import HttpResponseBadRequest
 from django.shortcuts import render
 from django.utils.decorators import method_decorator
@@ -15,8 +20,18 @@ from graphql.error import format_error as format_graphql_error
 from graphql.error import GraphQLError
 from graphql.execution import ExecutionResult
 from graphql.type.schema import GraphQLSchema
-
+from promise import Promise
+
+from .document_cache import get_default_document_cache, get_query_hash
+from .encoding import json_encode_iter
+from .http_cache import get_cache_max_age, patch_http_cache_headers
+from .loaders import ClearIdentityMapMiddleware, clear_identity_map, release_identity_map
+from .persisted_queries import (PersistedQueryError, PersistedQueryHashMismatch,
+                                PersistedQueryNotFound, get_default_persisted_query_store)
+from .query_cost import QueryCostError, validate_query_cost
+from .response_cache import get_default_response_cache
 from .settings import graphene_settings
+from .timing import RequestTiming
 
 
 class HttpError(Exception):
@@ -51,6 +66,19 @@ def instantiate_middleware(middlewares):
         yield middleware
 
 
+batch_pools = {}
+batch_pools_lock = Lock()
+
+
+def get_batch_pool(max_workers):
+    # Views are instantiated on every request, so the pools
+    # are shared by all the views using the same number of workers
+    with batch_pools_lock:
+        if max_workers not in batch_pools:
+            batch_pools[max_workers] = ThreadPool(max_workers)
+        return batch_pools[max_workers]
+
+
 class GraphQLView(View):
     graphiql_version = '0.11.10'
     graphiql_template = 'graphene/graphiql.html'
@@ -63,9 +91,31 @@ class GraphQLView(View):
     root_value = None
     pretty = False
     batch = False
+    document_cache = None
+    persisted_query_store = None
+    response_cache = None
+    max_query_cost = None
+    max_query_depth = None
+    batch_max_workers = None
+    streaming = False
+    http_cache = False
+    cache_max_age = 0
+    cache_max_age_by_operation = None
+    cache_max_age_by_type = None
+    cache_public = False
+    cache_vary_headers = ('Accept', 'Authorization', 'Cookie')
+    server_timing = False
+    timing_hook = None
+
+    # Max-age of the GET query being executed, if it can be cached
+    operation_max_age = None
+    # Timing of the request phases, when server_timing or timing_hook are set
+    request_timing = None
 
     def __init__(self, schema=None, executor=None, middleware=None, root_value=None, graphiql=False, pretty=False,
-                 batch=False, backend=None):
+                 batch=False, backend=None, document_cache=None, persisted_query_store=None, batch_max_workers=None,
+                 streaming=False, http_cache=False, response_cache=None, max_query_cost=None, max_query_depth=None,
+                 server_timing=False, timing_hook=None):
         if not schema:
             schema = graphene_settings.SCHEMA
 
@@ -75,6 +125,27 @@ class GraphQLView(View):
         if middleware is None:
             middleware = graphene_settings.MIDDLEWARE
 
+        if document_cache is None:
+            document_cache = get_default_document_cache()
+
+        if persisted_query_store is None:
+            persisted_query_store = get_default_persisted_query_store()
+
+        if response_cache is None:
+            response_cache = get_default_response_cache()
+
+        if max_query_cost is None:
+            max_query_cost = graphene_settings.QUERY_MAX_COST
+
+        if max_query_depth is None:
+            max_query_depth = graphene_settings.QUERY_MAX_DEPTH
+
+        if batch_max_workers is None:
+            batch_max_workers = graphene_settings.BATCH_MAX_WORKERS
+
+        if timing_hook is None:
+            timing_hook = graphene_settings.TIMING_HOOK
+
         self.schema = self.schema or schema
         if middleware is not None:
             self.middleware = list(instantiate_middleware(middleware))
@@ -83,7 +154,20 @@ class GraphQLView(View):
         self.pretty = self.pretty or pretty
         self.graphiql = self.graphiql or graphiql
         self.batch = self.batch or batch
+        self.batch_max_workers = self.batch_max_workers or batch_max_workers
+        self.streaming = self.streaming or streaming
+        self.http_cache = self.http_cache or http_cache
         self.backend = backend
+        if self.document_cache is None:
+            self.document_cache = document_cache
+        if self.persisted_query_store is None:
+            self.persisted_query_store = persisted_query_store
+        if self.response_cache is None:
+            self.response_cache = response_cache
+        self.max_query_cost = self.max_query_cost or max_query_cost
+        self.max_query_depth = self.max_query_depth or max_query_depth
+        self.server_timing = self.server_timing or server_timing or graphene_settings.SERVER_TIMING
+        self.timing_hook = self.timing_hook or timing_hook
 
         assert isinstance(
             self.schema, GraphQLSchema), 'A Schema is required to be provided to GraphQLView.'
@@ -103,71 +187,146 @@ class GraphQLView(View):
     def get_backend(self, request):
         return self.backend
 
+    def get_document(self, request, query):
+        backend = self.get_backend(request)
+        if self.document_cache is None:
+            return backend.document_from_string(self.schema, query)
+        return self.document_cache.get_document(backend, self.schema, query)
+
     @method_decorator(ensure_csrf_cookie)
     def dispatch(self, request, *args, **kwargs):
+        self.start_timing(request)
         try:
             if request.method.lower() not in ('get', 'post'):
                 raise HttpError(HttpResponseNotAllowed(
                     ['GET', 'POST'], 'GraphQL only supports GET and POST requests.'))
 
-            data = self.parse_body(request)
+            with self.measure('parse_body'):
+                data = self.parse_body(request)
             show_graphiql = self.graphiql and self.can_display_graphiql(
                 request, data)
 
             if self.batch:
-                responses = [self.get_response(request, entry) for entry in data]
-                result = '[{}]'.format(','.join([response[0] for response in responses]))
+                responses = self.get_batch_responses(request, data)
+                response_data = [response[0] for response in responses]
                 status_code = responses and max(responses, key=lambda response: response[1])[1] or 200
             else:
-                result, status_code = self.get_response(
+                response_data, status_code = self.get_response_data(
                     request, data, show_graphiql)
 
-            if show_graphiql:
-                query, variables, operation_name, id = self.get_graphql_params(
-                    request, data)
-                return self.render_graphiql(
-                    request,
-                    graphiql_version=self.graphiql_version,
-                    query=query or '',
-                    variables=json.dumps(variables) or '',
-                    operation_name=operation_name or '',
-                    result=result or ''
-                )
+            response = self.get_http_response(request, data, response_data, status_code, show_graphiql)
+
+        except HttpError as e:
+            response = self.get_error_response(request, e)
+
+        release_identity_map(self.get_context(request))
+        return self.finish_timing(request, response)
+
+    def start_timing(self, request):
+        if self.server_timing or self.timing_hook:
+            self.request_timing = RequestTiming()
+
+    def finish_timing(self, request, response):
+        if self.request_timing is None:
+            return response
 
-            return HttpResponse(
+        self.request_timing.finish()
+        if self.server_timing:
+            response['Server-Timing'] = self.request_timing.get_server_timing_header()
+        if self.timing_hook:
+            self.timing_hook(request, self.request_timing)
+        return response
+
+    @contextmanager
+    def measure(self, phase):
+        if self.request_timing is None:
+            yield
+        else:
+            with self.request_timing.measure(phase):
+                yield
+
+    def get_http_response(self, request, data, response_data, status_code, show_graphiql=False):
+        if show_graphiql:
+            query, variables, operation_name, id = self.get_graphql_params(
+                request, data)
+            return self.render_graphiql(
+                request,
+                graphiql_version=self.graphiql_version,
+                query=query or '',
+                variables=json.dumps(variables) or '',
+                operation_name=operation_name or '',
+                result=response_data and self.json_encode(request, response_data, pretty=True) or ''
+            )
+
+        if self.streaming:
+            response = StreamingHttpResponse(
+                status=status_code,
+                streaming_content=self.json_encode_iter(request, response_data),
+                content_type='application/json'
+            )
+        else:
+            with self.measure('encode'):
+                content = self.json_encode(request, response_data)
+            response = HttpResponse(
                 status=status_code,
-                content=result,
+                content=content,
                 content_type='application/json'
             )
 
-        except HttpError as e:
-            response = e.response
-            response['Content-Type'] = 'application/json'
-            response.content = self.json_encode(request, {
-                'errors': [self.format_error(e)]
-            })
-            return response
+        if self.operation_max_age is not None and not response_data.get('errors'):
+            response = patch_http_cache_headers(
+                request,
+                response,
+                self.operation_max_age,
+                public=self.cache_public,
+                vary_headers=self.cache_vary_headers
+            )
+        return response
+
+    def get_error_response(self, request, error):
+        response = error.response
+        response['Content-Type'] = 'application/json'
+        response.content = self.json_encode(request, {
+            'errors': [self.format_error(error)]
+        })
+        return response
 
     def get_response(self, request, data, show_graphiql=False):
+        response, status_code = self.get_response_data(request, data, show_graphiql)
+        if response is None:
+            return None, status_code
+
+        return self.json_encode(request, response, pretty=show_graphiql), status_code
+
+    def get_response_data(self, request, data, show_graphiql=False):
         query, variables, operation_name, id = self.get_graphql_params(
             request, data)
 
-        execution_result = self.execute_graphql_request(
-            request,
-            data,
-            query,
-            variables,
-            operation_name,
-            show_graphiql
-        )
+        try:
+            query = self.get_persisted_query(request, data, query, id)
+        except PersistedQueryError as e:
+            execution_result = ExecutionResult(errors=[e], invalid=True)
+        else:
+            execution_result = self.execute_graphql_request(
+                request,
+                data,
+                query,
+                variables,
+                operation_name,
+                show_graphiql
+            )
+
+        return self.get_execution_response_data(execution_result, id)
 
+    def get_execution_response_data(self, execution_result, id=None):
         status_code = 200
         if execution_result:
             response = {}
 
             if execution_result.errors:
-                response['errors'] = [self.format_error(
-                    e) for e in execution_result.errors]
+                with self.measure('format_errors'):
+                    response['errors'] = [self.format_error(
+                        e) for e in execution_result.errors]
 
             if execution_result.invalid:
                 status_code = 400
@@ -177,22 +336,60 @@ class GraphQLView(View):
             if self.batch:
                 response['id'] = id
                 response['status'] = status_code
-
-            result = self.json_encode(request, response, pretty=show_graphiql)
         else:
-            result = None
+            response = None
+
+        return response, status_code
 
-        return result, status_code
+    def get_batch_responses(self, request, data):
+        if not self.can_execute_in_parallel(request, data):
+            return [self.get_response_data(request, entry) for entry in data]
+
+        pool = get_batch_pool(self.batch_max_workers)
+        return pool.map(partial(self.get_batch_entry_response, request), data)
+
+    def can_execute_in_parallel(self, request, data):
+        if not self.batch_max_workers or len(data) < 2:
+            return False
+        # The worker threads don't share the transactions of the request
+        # (ATOMIC_REQUESTS), and mutations must run in order
+        if any(connection.in_atomic_block for connection in connections.all()):
+            return False
+        # The entries that can't be parsed only return their errors
+        return all(self.get_entry_operation_type(request, entry) in ('query', None) for entry in data)
+
+    def get_entry_operation_type(self, request, entry):
+        query, _, operation_name, id = self.get_graphql_params(request, entry)
+        try:
+            query = self.get_persisted_query(request, entry, query, id)
+            document = self.get_document(request, query)
+        except Exception:
+            return None
+        return document.get_operation_type(operation_name)
+
+    def get_batch_entry_response(self, request, entry):
+        # Each worker thread has its own database connections,
+        # that we close as soon as the operation is resolved
+        try:
+            return self.get_response_data(request, entry)
+        finally:
+            for connection in connections.all():
+                connection.close()
 
     def render_graphiql(self, request, **data):
         return render(request, self.graphiql_template, data)
 
     def json_encode(self, request, d, pretty=False):
-        if not (self.pretty or pretty) and not request.GET.get('pretty'):
-            return json.dumps(d, separators=(',', ':'))
+        pretty = bool(self.pretty or pretty or request.GET.get('pretty'))
+        return graphene_settings.JSON_ENCODER(d, pretty=pretty)
+
+    def json_encode_iter(self, request, d):
+        if self.pretty or request.GET.get('pretty'):
+            return iter([self.json_encode(request, d)])
+        return json_encode_iter(d, encode=graphene_settings.JSON_ENCODER)
 
-        return json.dumps(d, sort_keys=True,
-                          indent=2, separators=(',', ': '))
+    def json_decode(self, request, body):
+        return graphene_settings.JSON_DECODER(body)
 
     def parse_body(self, request):
         content_type = self.get_content_type(request)
@@ -208,7 +405,7 @@ class GraphQLView(View):
                 raise HttpError(HttpResponseBadRequest(str(e)))
 
             try:
-                request_json = json.loads(body)
+                request_json = self.json_decode(request, body)
                 if self.batch:
                     assert isinstance(request_json, list), (
                         'Batch requests should receive a list, but received {}.'
@@ -240,13 +437,19 @@ class GraphQLView(View):
                 'Must provide query string.'))
 
         try:
-            backend = self.get_backend(request)
-            document = backend.document_from_string(self.schema, query)
+            with self.measure('document'):
+                document = self.get_document(request, query)
         except Exception as e:
             return ExecutionResult(errors=[e], invalid=True)
 
+        if self.request_timing is not None:
+            if operation_name is None and len(document.operations_map) == 1:
+                self.request_timing.operation_names.append(next(iter(document.operations_map)))
+            else:
+                self.request_timing.operation_names.append(operation_name)
+
+        operation_type = document.get_operation_type(operation_name)
         if request.method.lower() == 'get':
-            operation_type = document.get_operation_type(operation_name)
             if operation_type and operation_type != 'query':
                 if show_graphiql:
                     return None
@@ -256,24 +459,86 @@ class GraphQLView(View):
                         operation_type)
                 ))
 
+            if self.http_cache and operation_type == 'query' and not self.batch:
+                self.operation_max_age = get_cache_max_age(
+                    document,
+                    operation_name,
+                    default=self.cache_max_age,
+                    by_operation=self.cache_max_age_by_operation,
+                    by_type=self.cache_max_age_by_type
+                )
+
         try:
-            extra_options = {}
-            if self.executor:
-                # We only include it optionally since
-                # executor is not a valid argument in all backends
-                extra_options['executor'] = self.executor
+            validate_query_cost(
+                document,
+                operation_name,
+                variables,
+                max_cost=self.max_query_cost,
+                max_depth=self.max_query_depth,
+                weights=graphene_settings.QUERY_COST_WEIGHTS
+            )
+        except QueryCostError as e:
+            return ExecutionResult(errors=[e], invalid=True)
 
-            return document.execute(
+        try:
+            extra_options = self.get_execute_options(request)
+            execute = partial(
+                document.execute,
                 root=self.get_root_value(request),
                 variables=variables,
                 operation_name=operation_name,
                 context=self.get_context(request),
-                middleware=self.get_middleware(request),
+                middleware=(
+                    self.get_mutation_middleware(request) if operation_type == 'mutation'
+                    else self.get_middleware(request)
+                ),
                 **extra_options
             )
+            if self.response_cache is not None and operation_type == 'query':
+                return self.response_cache.get_or_execute(
+                    request,
+                    document,
+                    variables,
+                    operation_name,
+                    execute,
+                    # Async views don't hold a worker of their thread pool while waiting for another request
+                    wait=not getattr(self, 'view_is_async', False)
+                )
+            if operation_type == 'mutation':
+                return self.execute_mutation(request, execute)
+            with self.measure('execute'):
+                return execute()
         except Exception as e:
             return ExecutionResult(errors=[e], invalid=True)
 
+    def get_mutation_middleware(self, request):
+        middleware = self.get_middleware(request)
+        if not graphene_settings.IDENTITY_MAP:
+            return middleware
+        return list(middleware or []) + [ClearIdentityMapMiddleware()]
+
+    def execute_mutation(self, request, execute):
+        # The next operations of a batch don't reuse the rows mapped before the mutation
+        clear = partial(self.clear_identity_map, self.get_context(request))
+        with self.measure('execute'):
+            result = execute()
+        if Promise.is_thenable(result):
+            return Promise.resolve(result).then(clear)
+        return clear(result)
+
+    @staticmethod
+    def clear_identity_map(context, result=None):
+        clear_identity_map(context)
+        return result
+
+    def get_execute_options(self, request):
+        extra_options = {}
+        if self.executor:
+            # We only include it optionally since
+            # executor is not a valid argument in all backends
+            extra_options['executor'] = self.executor
+        return extra_options
+
     @classmethod
     def can_display_graphiql(cls, request, data):
         raw = 'raw' in request.GET or 'raw' in data
@@ -298,7 +563,7 @@ class GraphQLView(View):
 
         if variables and isinstance(variables, six.text_type):
             try:
-                variables = json.loads(variables)
+                variables = graphene_settings.JSON_DECODER(variables)
             except Exception:
                 raise HttpError(HttpResponseBadRequest(
                     'Variables are invalid JSON.'))
@@ -310,6 +575,46 @@ class GraphQLView(View):
 
         return query, variables, operation_name, id
 
+    def get_persisted_query(self, request, data, query, id):
+        store = self.persisted_query_store
+        if store is None:
+            return query
+
+        query_hash = self.get_persisted_query_hash(request, data)
+        if not query_hash:
+            # Relay style persisted queries are only sent by their id
+            if query or not id:
+                return query
+            query_hash = id
+
+        if query:
+            if get_query_hash(query) != query_hash:
+                raise PersistedQueryHashMismatch()
+            store.set(query_hash, query)
+            return query
+
+        query = store.get(query_hash)
+        if query is None:
+            raise PersistedQueryNotFound()
+        return query
+
+    @staticmethod
+    def get_persisted_query_hash(request, data):
+        extensions = request.GET.get('extensions') or data.get('extensions')
+        if extensions and isinstance(extensions, six.text_type):
+            try:
+                extensions = graphene_settings.JSON_DECODER(extensions)
+            except Exception:
+                raise HttpError(HttpResponseBadRequest(
+                    'Extensions are invalid JSON.'))
+
+        if not isinstance(extensions, dict):
+            return None
+        persisted_query = extensions.get('persistedQuery')
+        if not isinstance(persisted_query, dict):
+            return None
+        return persisted_query.get('sha256Hash')
+
     @staticmethod
     def format_error(error):
         if isinstance(error, GraphQLError):